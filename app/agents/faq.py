@@ -4,18 +4,46 @@ Agente FAQ - Responde preguntas frecuentes usando búsqueda vectorial
 
 import logging
 import os
-from typing import Any
+import time
+from typing import Any, Optional
 
 import numpy as np
 from langchain_core.messages import AIMessage
-from openai import AsyncOpenAI
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db.config.database import get_async_session
+from ..db.config.database import SessionLocal, get_async_session
+from ..graph.context_window import current_user_message
+from ..graph.prefetch_store import current_message_id, faq_prefetch_store
 from ..graph.state import ConversationState
-from ..services.embedding_service import embedding_service
+from ..graph.streaming import new_message_id, stream_chat_completion
+from ..services.embedding_service import embedding_service, lexical_results_as_faqs
+from ..services.faq_context import create_context_builder_from_env
+from ..services.faq_fallbacks import create_fallback_library_from_env
+from ..services.faq_response_cache import create_response_cache_from_env
+from ..services.llm_gateway import llm_gateway
+from ..services.text_normalization import normalize_text
 
 logger = logging.getLogger(__name__)
 
+# System prompt fijo: el contexto de cada consulta va en el mensaje del usuario
+CONTEXTUAL_SYSTEM_PROMPT = """Eres el asistente virtual oficial de Ithaka, centro de emprendimiento de la UCU. Respondes consultas de manera amigable y precisa, de la manera más útil posible, usando la información relevante encontrada en las FAQs.
+
+INSTRUCCIONES INTELIGENTES:
+1. **Flexibilidad**: Interpreta la intención aunque haya errores de tipeo ("corsos" = "cursos", "ithaka" mal escrito, etc.)
+2. **Contextualidad**: Si preguntan sobre temas relacionados a emprendimiento/universidad, conecta con lo que ofrece Ithaka
+3. **Inteligencia**: Aunque la pregunta no sea exacta, infiere qué información necesita (ej: "qué hacen" → explica programas y servicios)
+4. **Completitud**: Da información útil incluso si no hay coincidencia perfecta
+5. **Natural**: Responde conversacionalmente, como si fueras un consejero experto
+6. **Proactivo**: Sugiere recursos adicionales y próximos pasos
+7. **Amigable**: Termina invitando a hacer más preguntas
+
+CONTEXTO ITHAKA:
+- Centro de emprendimiento de la Universidad Católica del Uruguay
+- Ofrece: cursos, minor de emprendimiento, programa Fellows, incubadora
+- Todo gratuito para comunidad UCU
+- Abierto también a emprendedores externos
+- Foco en innovación, emprendimiento e impacto social"""
+
 
 def to_serializable(obj):
     if isinstance(obj, np.floating):
@@ -35,50 +63,94 @@ class FAQAgent:
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required")
 
-        self.client = AsyncOpenAI(api_key=api_key)
+        self.llm = llm_gateway
         self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         self.max_results = int(os.getenv("MAX_FAQ_RESULTS", "5"))
         self.similarity_threshold = float(
             os.getenv("SIMILARITY_THRESHOLD", "0.4"))
+        # Por encima de este umbral se devuelve la respuesta curada sin pasar por el LLM
+        self.direct_answer_threshold = float(
+            os.getenv("FAQ_DIRECT_ANSWER_THRESHOLD", "0.9"))
+        self.direct_answer_preamble = os.getenv("FAQ_DIRECT_ANSWER_PREAMBLE", "")
+        self.tier_stats = {
+            tier: {"count": 0, "total_ms": 0.0}
+            for tier in ("direct", "llm", "single_shot", "no_results", "error")
+        }
+        self.context_builder = create_context_builder_from_env(self.model)
+        self.fallback_library = create_fallback_library_from_env()
+        self.no_results_llm_enabled = os.getenv(
+            "FAQ_NO_RESULTS_LLM_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.response_cache = create_response_cache_from_env()
+        if self.response_cache:
+            embedding_service.add_corpus_listener(self.response_cache.invalidate)
 
     async def handle_faq_query(self, state: ConversationState) -> ConversationState:
         """Procesa una consulta FAQ del usuario"""
 
-        user_message = [m.content for m in state["messages"] if m.type == "human"][-1]
+        user_message = current_user_message(state)
+        # Mismo id para los tokens streameados y el mensaje final (el frontend los une)
+        message_id = new_message_id()
+        started = time.perf_counter()
 
         try:
+            # Modo single-shot: el supervisor ya respondió en la misma llamada de routing
+            single_shot = state.get("single_shot_answer")
+            if single_shot and single_shot.get("query") == user_message:
+                self._record_tier("single_shot", started)
+                state["agent_context"] = {
+                    "response": single_shot["response"],
+                    "found_faqs": len(single_shot["faqs"]),
+                    "answer_tier": "single_shot",
+                    "query_processed": True
+                }
+                return {
+                    "agent_context": state["agent_context"],
+                    "faq_results": single_shot["faqs"],
+                    "next_action": "send_response",
+                    "should_continue": False,
+                    "single_shot_answer": None,
+                    "messages": [AIMessage(content=single_shot["response"], id=message_id)]
+                }
+
             # Obtener sesión de base de datos
             async for session in get_async_session():
-                # Buscar FAQs similares
-                similar_faqs = await embedding_service.search_similar_faqs(
-                    query=user_message,
-                    session=session,
-                    limit=self.max_results,
-                    similarity_threshold=self.similarity_threshold
-                )
+                if self.response_cache:
+                    await self.response_cache.ensure_fresh(session, embedding_service)
+
+                # Buscar FAQs similares (o usar las que el supervisor ya recuperó)
+                prefetched = faq_prefetch_store.pop(current_message_id(state))
+                if prefetched and prefetched.get("query") == user_message:
+                    similar_faqs = prefetched["faqs"]
+                    query_embedding = prefetched["query_embedding"]
+                else:
+                    similar_faqs, query_embedding = await self._retrieve_faqs(
+                        user_message, session)
 
-                if similar_faqs:
+                tier = self._confidence_tier(user_message, similar_faqs)
+
+                if tier == "direct":
+                    # Coincidencia casi exacta: la respuesta curada no necesita reescritura
+                    response = self._direct_answer(similar_faqs[0])
+                elif tier == "llm":
                     # Generar respuesta contextualizada con las FAQs encontradas
-                    response = await self._generate_contextual_response(
-                        user_message, similar_faqs
+                    response = await self._answer_with_cache(
+                        user_message, query_embedding, similar_faqs, message_id
                     )
-
-                    state["faq_results"] = to_serializable(similar_faqs)
-                    state["next_action"] = "send_response"
-                    state["should_continue"] = False
-
                 else:
                     # No se encontraron FAQs relevantes
-                    response = await self._generate_no_results_response(user_message)
+                    response = await self._generate_no_results_response(
+                        user_message, message_id)
 
-                    state["faq_results"] = []
-                    state["next_action"] = "send_response"
-                    state["should_continue"] = False
+                state["faq_results"] = to_serializable(similar_faqs)
+                state["next_action"] = "send_response"
+                state["should_continue"] = False
+                self._record_tier(tier, started)
 
                 # Actualizar estado con la respuesta
                 state["agent_context"] = {
                     "response": response,
                     "found_faqs": len(similar_faqs),
+                    "answer_tier": tier,
                     "query_processed": True
                 }
 
@@ -88,11 +160,13 @@ class FAQAgent:
                     "faq_results": state.get("faq_results", []),
                     "next_action": state["next_action"],
                     "should_continue": state["should_continue"],
-                    "messages": [AIMessage(content=response)]
+                    "single_shot_answer": None,
+                    "messages": [AIMessage(content=response, id=message_id)]
                 }
 
         except Exception as e:
             logger.error(f"Error in FAQ query processing: {e}")
+            self._record_tier("error", started)
 
             # Respuesta de fallback en caso de error
             fallback_response = """
@@ -117,76 +191,192 @@ Mientras tanto, puedes:
                 "agent_context": state["agent_context"],
                 "next_action": state["next_action"],
                 "should_continue": state["should_continue"],
-                "messages": [AIMessage(content=fallback_response)]
+                "messages": [AIMessage(content=fallback_response, id=message_id)]
             }
 
+    def _confidence_tier(self, user_query: str, similar_faqs: list[dict[str, Any]]) -> str:
+        """direct / llm / no_results según la confianza del mejor resultado"""
+        if not similar_faqs:
+            return "no_results"
+
+        best_faq = similar_faqs[0]
+        if normalize_text(user_query).strip("¿?¡! ") == normalize_text(
+                best_faq["question"]).strip("¿?¡! "):
+            return "direct"
+
+        # Los resultados solo léxicos no tienen una similitud coseno comparable
+        if (best_faq.get("source") != "lexical"
+                and best_faq["similarity"] >= self.direct_answer_threshold):
+            return "direct"
+
+        return "llm"
+
+    def _direct_answer(self, faq: dict[str, Any]) -> str:
+        """Respuesta curada con el preámbulo configurado (si hay)"""
+        answer = faq["answer"].strip()
+        if not self.direct_answer_preamble:
+            return answer
+        return self.direct_answer_preamble.format(question=faq["question"]) + "\n\n" + answer
+
+    def _record_tier(self, tier: str, started: float) -> None:
+        stats = self.tier_stats[tier]
+        stats["count"] += 1
+        stats["total_ms"] += (time.perf_counter() - started) * 1000
+
+    def get_tier_stats(self) -> dict:
+        """Contadores y latencia promedio por nivel de confianza"""
+        return {
+            "direct_answer_threshold": self.direct_answer_threshold,
+            "similarity_threshold": self.similarity_threshold,
+            "tiers": {
+                tier: {
+                    "count": stats["count"],
+                    "avg_ms": stats["total_ms"] / stats["count"] if stats["count"] else 0.0
+                }
+                for tier, stats in self.tier_stats.items()
+            }
+        }
+
+    async def prefetch_faqs(self, user_query: str) -> dict[str, Any]:
+        """Recupera FAQs en su propia sesión, para correr en paralelo con el routing"""
+        async with SessionLocal() as session:
+            similar_faqs, query_embedding = await self._retrieve_faqs(user_query, session)
+        return {
+            "query": user_query,
+            "faqs": to_serializable(similar_faqs),
+            "query_embedding": query_embedding
+        }
+
+    async def lexical_presearch(self, user_query: str) -> list[dict[str, Any]]:
+        """FAQs por BM25 (sin embeddings) como contexto barato para el modo single-shot"""
+        async with SessionLocal() as session:
+            results = await embedding_service.lexical_search(
+                user_query, session, limit=self.max_results)
+        return lexical_results_as_faqs(results)
+
+    async def single_shot_context(self, user_query: str) -> dict[str, Any]:
+        """
+        Material para que el supervisor responda en la misma llamada que clasifica:
+        FAQs de la búsqueda léxica, su contexto renderizado y el system prompt de respuesta
+        """
+        similar_faqs = await self.lexical_presearch(user_query)
+        return {
+            "faqs": similar_faqs,
+            "context": (self.context_builder.build(similar_faqs)
+                        if similar_faqs else "(sin coincidencias)"),
+            "system_prompt": CONTEXTUAL_SYSTEM_PROMPT
+        }
+
+    async def _retrieve_faqs(
+            self,
+            user_query: str,
+            session: AsyncSession
+    ) -> tuple[list[dict[str, Any]], Optional[list[float]]]:
+        """Recupera FAQs relevantes y el embedding de la consulta (si se calculó)"""
+        try:
+            if embedding_service.retrieval_mode == "hybrid":
+                return await embedding_service.hybrid_search(
+                    query=user_query,
+                    session=session,
+                    limit=self.max_results,
+                    similarity_threshold=self.similarity_threshold
+                )
+
+            # Embedding de la consulta (cacheado), reutilizado por búsqueda y cache
+            query_embedding = await embedding_service.generate_embedding(user_query)
+        except Exception as e:
+            logger.error(f"Error retrieving FAQs: {e}")
+            return [], None
+
+        similar_faqs = await embedding_service.search_similar_faqs(
+            query=user_query,
+            session=session,
+            limit=self.max_results,
+            similarity_threshold=self.similarity_threshold,
+            query_embedding=query_embedding
+        )
+        return similar_faqs, query_embedding
+
+    async def _answer_with_cache(
+            self,
+            user_query: str,
+            query_embedding: Optional[list[float]],
+            similar_faqs: list[dict[str, Any]],
+            message_id: Optional[str] = None
+    ) -> str:
+        """Responde desde el cache semántico o genera y cachea la respuesta"""
+        if not self.response_cache:
+            return await self._generate_contextual_response(
+                user_query, similar_faqs, message_id)
+
+        cached = self.response_cache.lookup(user_query, query_embedding, similar_faqs)
+        if cached is not None:
+            logger.info("FAQ response served from semantic cache")
+            return cached
+
+        try:
+            response = await self._request_contextual_response(
+                user_query, similar_faqs, message_id)
+        except Exception as e:
+            logger.error(f"Error generating contextual response: {e}")
+            return self._fallback_contextual_response(similar_faqs)
+
+        self.response_cache.store(user_query, query_embedding, similar_faqs, response)
+        return response
+
     async def _generate_contextual_response(
             self,
             user_query: str,
-            similar_faqs: list[dict[str, Any]]
+            similar_faqs: list[dict[str, Any]],
+            message_id: Optional[str] = None
     ) -> str:
         """Genera una respuesta contextualizada basada en FAQs similares"""
 
         try:
-            # Preparar contexto de FAQs
-            faq_context = ""
-            for i, faq in enumerate(similar_faqs, 1):
-                faq_context += f"""
-FAQ {i} (similitud: {faq['similarity']:.2f}):
-Pregunta: {faq['question']}
-Respuesta: {faq['answer']}
-"""
+            return await self._request_contextual_response(
+                user_query, similar_faqs, message_id)
+        except Exception as e:
+            logger.error(f"Error generating contextual response: {e}")
+            return self._fallback_contextual_response(similar_faqs)
 
-            prompt = f"""
-Eres el asistente virtual inteligente de Ithaka (centro de emprendimiento UCU). Tu misión es ayudar de la manera más útil posible.
+    async def _request_contextual_response(
+            self,
+            user_query: str,
+            similar_faqs: list[dict[str, Any]],
+            message_id: Optional[str] = None
+    ) -> str:
+        """Llama al LLM con el contexto de FAQs en streaming (propaga errores)"""
 
-CONSULTA DEL USUARIO:
+        # Contexto compacto; las instrucciones fijas van en el prefijo de sistema
+        faq_context = self.context_builder.build(similar_faqs)
+
+        prompt = f"""CONSULTA DEL USUARIO:
 "{user_query}"
 
 INFORMACIÓN RELEVANTE ENCONTRADA:
 {faq_context}
 
-INSTRUCCIONES INTELIGENTES:
-1. **Flexibilidad**: Interpreta la intención aunque haya errores de tipeo ("corsos" = "cursos", "ithaka" mal escrito, etc.)
-2. **Contextualidad**: Si preguntan sobre temas relacionados a emprendimiento/universidad, conecta con lo que ofrece Ithaka
-3. **Inteligencia**: Aunque la pregunta no sea exacta, infiere qué información necesita (ej: "qué hacen" → explica programas y servicios)
-4. **Completitud**: Da información útil incluso si no hay coincidencia perfecta
-5. **Natural**: Responde conversacionalmente, como si fueras un consejero experto
-6. **Proactivo**: Sugiere recursos adicionales y próximos pasos
-7. **Amigable**: Termina invitando a hacer más preguntas
-
-CONTEXTO ITHAKA:
-- Centro de emprendimiento de la Universidad Católica del Uruguay
-- Ofrece: cursos, minor de emprendimiento, programa Fellows, incubadora
-- Todo gratuito para comunidad UCU
-- Abierto también a emprendedores externos
-- Foco en innovación, emprendimiento e impacto social
-
-RESPUESTA INTELIGENTE:
-"""
-
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Eres el asistente virtual oficial de Ithaka, centro de emprendimiento de la UCU. Respondes consultas de manera amigable y precisa."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=400
-            )
-
-            return response.choices[0].message.content
-
-        except Exception as e:
-            logger.error(f"Error generating contextual response: {e}")
-
-            # Respuesta básica usando la FAQ más similar
-            best_faq = similar_faqs[0] if similar_faqs else None
-            if best_faq:
-                return f"""
+RESPUESTA INTELIGENTE:"""
+
+        return await stream_chat_completion(
+            self.llm,
+            caller="faq",
+            message_id=message_id,
+            name="faq_contextual_response",
+            model=self.model,
+            messages=[
+                {"role": "system", "content": CONTEXTUAL_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,
+            max_tokens=400
+        )
+
+    def _fallback_contextual_response(self, similar_faqs: list[dict[str, Any]]) -> str:
+        """Respuesta básica usando la FAQ más similar"""
+        best_faq = similar_faqs[0] if similar_faqs else None
+        if best_faq:
+            return f"""
 Basándome en tu consulta, creo que esto te puede ayudar:
 
 **{best_faq['question']}**
@@ -196,10 +386,17 @@ Basándome en tu consulta, creo que esto te puede ayudar:
 ¿Esto responde a tu pregunta o necesitas información adicional?
 """
 
-            return "Lo siento, no pude procesar tu consulta correctamente. ¿Podrías reformularla?"
+        return "Lo siento, no pude procesar tu consulta correctamente. ¿Podrías reformularla?"
+
+    async def _generate_no_results_response(
+            self,
+            user_query: str,
+            message_id: Optional[str] = None
+    ) -> str:
+        """Respuesta precalculada por tema; el LLM solo si está habilitado"""
 
-    async def _generate_no_results_response(self, user_query: str) -> str:
-        """Genera respuesta cuando no se encuentran FAQs relevantes"""
+        if not self.no_results_llm_enabled:
+            return self.fallback_library.get_response(user_query)
 
         try:
             prompt = f"""
@@ -225,7 +422,11 @@ GENERA UNA RESPUESTA INTELIGENTE QUE:
 Respuesta útil e inteligente:
 """
 
-            response = await self.client.chat.completions.create(
+            return await stream_chat_completion(
+                self.llm,
+                caller="faq",
+                message_id=message_id,
+                name="faq_no_results_response",
                 model=self.model,
                 messages=[
                     {
@@ -238,20 +439,9 @@ Respuesta útil e inteligente:
                 max_tokens=200
             )
 
-            return response.choices[0].message.content
-
         except Exception as e:
             logger.error(f"Error generating no results response: {e}")
-            return """
-No encontré información específica sobre tu consulta en nuestras FAQs.
-
-Te sugiero:
-• Contactar directamente al equipo de Ithaka
-• Revisar nuestro sitio web oficial
-• Seguirnos en redes sociales para estar al día
-
-¿Hay algo más sobre emprendimiento o nuestros programas en lo que pueda ayudarte?
-"""
+            return self.fallback_library.get_response(user_query)
 
 
 # Instancia global del agente
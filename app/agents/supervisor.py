@@ -3,31 +3,71 @@ Agente Supervisor - Router principal del sistema
 Analiza la intención del usuario y decide a qué agente derivar
 """
 
+import asyncio
+import json
 import logging
 import os
+from collections.abc import Awaitable, Callable
+from typing import Any, Optional
 
-from openai import AsyncOpenAI
-
+from ..graph.context_window import ensure_context_window
+from ..graph.prefetch_store import current_message_id, faq_prefetch_store
 from ..graph.state import ConversationState
+from ..services.intent_classifier import intent_classifier
+from ..services.llm_gateway import llm_gateway
+from ..services.routing_cache import create_routing_cache_from_env
 
 logger = logging.getLogger(__name__)
 
+# Recuperación de FAQs que el supervisor recibe inyectada (la provee el agente FAQ)
+FAQRetrieval = Callable[[str], Awaitable[dict[str, Any]]]
 
-class SupervisorAgent:
-    """Agente supervisor que analiza intenciones y rutea conversaciones"""
 
-    def __init__(self):
+class SupervisorAgent:
+    """
+    Agente supervisor que analiza intenciones y rutea conversaciones.
+
+    prefetch_faqs: búsqueda de FAQs para correr en paralelo con el routing por LLM
+    single_shot_context: FAQs, contexto y system prompt para el modo single_shot
+    Sin ellas, la especulación queda apagada y single_shot usa el routing estándar.
+    """
+
+    def __init__(
+            self,
+            prefetch_faqs: Optional[FAQRetrieval] = None,
+            single_shot_context: Optional[FAQRetrieval] = None
+    ):
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required")
 
-        self.client = AsyncOpenAI(api_key=api_key)
+        self.llm = llm_gateway
         self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self.intent_classifier = intent_classifier
+        # Cache de decisiones del LLM (None si está deshabilitado)
+        self.routing_cache = create_routing_cache_from_env()
+        # Recuperar FAQs en paralelo con el routing por LLM (se descartan si no es "faq")
+        self.prefetch_faqs = prefetch_faqs
+        self.speculative_faq_retrieval = prefetch_faqs is not None and os.getenv(
+            "SPECULATIVE_FAQ_RETRIEVAL", "true").lower() in ("1", "true", "yes")
+        self.speculation_stats = {"used": 0, "discarded": 0, "failed": 0}
+        # "standard" (routing y respuesta por separado) o "single_shot" (una llamada JSON
+        # que clasifica y, si es faq, responde con contexto de una búsqueda léxica)
+        self.routing_mode = os.getenv("SUPERVISOR_ROUTING_MODE", "standard").lower()
+        if self.routing_mode not in ("standard", "single_shot"):
+            logger.warning(f"Unknown SUPERVISOR_ROUTING_MODE '{self.routing_mode}', using standard")
+            self.routing_mode = "standard"
+        self.single_shot_context = single_shot_context
+        if self.routing_mode == "single_shot" and single_shot_context is None:
+            logger.warning("single_shot routing needs FAQ context, using standard")
+            self.routing_mode = "standard"
 
     async def route_message(self, state: ConversationState) -> ConversationState:
         """Analiza el mensaje del usuario y decide el routing"""
-        chat_history = [m.content for m in state["messages"] if m.type == "human"]
-        user_message = chat_history[-1].strip()
+        # Ventana de contexto (incremental): mensaje actual y fragmento ya renderizado
+        context_window = ensure_context_window(state)
+        user_message = context_window.last_user_message
+        conversation_context = context_window.render()
 
         # SIMPLE FIX: Si hay wizard_state ACTIVO, mantener wizard
         wizard_state_obj = state.get("wizard_state")
@@ -41,12 +81,28 @@ class SupervisorAgent:
                 logger.info("Manteniendo wizard activo - session detectada")
                 return self._route_to_wizard(state)
 
-        # Análisis de intención usando patrones simples primero
+        # Análisis de intención local primero (reglas + modelo)
         intention = self._analyze_intention_simple(user_message)
 
-        # Si no hay claridad, usar IA para análisis más profundo
+        # Solo si la confianza local es baja, usar IA para análisis más profundo
+        # (una sola vez por mensaje y contexto si el cache está habilitado)
         if intention == "unclear":
-            intention = await self._analyze_intention_with_ai(user_message, chat_history)
+            cache_key = None
+            if self.routing_cache is not None:
+                cache_key = self.routing_cache.make_key(
+                    user_message, self.routing_cache.context_signature(state))
+                intention = await self.routing_cache.get(cache_key) or "unclear"
+            if intention == "unclear" and self.routing_mode == "single_shot":
+                intention, answer = await self._classify_and_answer(
+                    user_message, conversation_context, cache_key)
+                if answer is not None:
+                    state["single_shot_answer"] = answer
+            elif intention == "unclear":
+                intention, prefetch = await self._route_with_speculation(
+                    user_message, conversation_context, cache_key)
+                if prefetch is not None:
+                    # Fuera del estado: se checkpointearía y emitiría con el embedding
+                    faq_prefetch_store.put(current_message_id(state), prefetch)
 
         # Actualizar estado según la intención
         state["supervisor_decision"] = intention
@@ -58,63 +114,121 @@ class SupervisorAgent:
         return state
 
     def _analyze_intention_simple(self, message: str) -> str:
-        """Análisis simple de intención basado en palabras clave"""
-
-        # Patrones para wizard cuando esté disponible
-        wizard_keywords = [
-            # Acciones directas
-            "postular", "postulación", "inscribirme", "inscripcion", "inscripción",
-            # Intenciones naturales
-            "me quiero postular", "quiero postularme", "tengo una idea", "presentar una idea",
-            "tengo un proyecto", "quiero presentar un proyecto", "quiero aplicar",
-            # Contexto de emprendimiento
-            "emprender", "emprendimiento", "incubadora", "startup", "negocio",
-            # Formularios
-            "formulario"
-        ]
-
-        # Patrones para FAQ
-        faq_keywords = [
-            "pregunta", "consulta", "información", "qué es", "cómo",
-            "cuándo", "dónde", "programa", "curso", "fellows", "minor",
-            "actividades", "contacto", "campus", "costo"
-        ]
-
-        # Comandos del wizard cuando esté disponible
-        wizard_commands = ["volver", "cancelar"]
-
-        # Verificar comandos del wizard cuando esté disponible
-        if any(cmd in message for cmd in wizard_commands):
-            return "wizard"
-
-        # Verificar patrones de postulación cuando wizard esté disponible
-        if any(keyword in message for keyword in wizard_keywords):
-            return "wizard"
-
-        # Verificar patrones de FAQ
-        if any(keyword in message for keyword in faq_keywords):
-            return "faq"
-
-        # Si no match, necesita análisis más profundo
-        return "unclear"
-
-    async def _analyze_intention_with_ai(self, message: str, history: list) -> str:
-        """Análisis de intención usando IA cuando no hay claridad"""
+        """Análisis local de intención: reglas compiladas y modelo con umbral de confianza"""
+        prediction = self.intent_classifier.classify(message)
+        logger.debug(
+            f"Local intent {prediction.intent} ({prediction.source}, "
+            f"confidence {prediction.confidence:.2f})")
+        return prediction.intent
+
+    async def _route_with_speculation(
+            self,
+            message: str,
+            context: str,
+            cache_key: Optional[str] = None
+    ) -> tuple[str, Optional[dict]]:
+        """
+        Routing por LLM; en modo especulativo la búsqueda de FAQs corre en paralelo
+        y su resultado se devuelve solo si la decisión es "faq"
+        """
+        if not self.speculative_faq_retrieval:
+            return await self._analyze_intention_with_ai(message, context, cache_key), None
+
+        prefetch_task = asyncio.create_task(self.prefetch_faqs(message))
+        try:
+            intention = await self._analyze_intention_with_ai(message, context, cache_key)
+        except BaseException:
+            prefetch_task.cancel()
+            raise
+
+        if intention != "faq":
+            prefetch_task.cancel()
+            self.speculation_stats["discarded"] += 1
+            return intention, None
 
         try:
-            # Construir contexto de la conversación
-            context = ""
-            if history:
-                # Últimos 3 mensajes para contexto
-                last_messages = history[-3:]
-                context = "\n".join(
-                    [f"{msg.role}: {msg.content}" for msg in last_messages])
+            prefetch = await prefetch_task
+        except Exception as e:
+            logger.warning(f"Speculative FAQ retrieval failed: {e}")
+            self.speculation_stats["failed"] += 1
+            return intention, None
+
+        self.speculation_stats["used"] += 1
+        return intention, prefetch
+
+    async def _classify_and_answer(
+            self,
+            message: str,
+            context: str,
+            cache_key: Optional[str] = None
+    ) -> tuple[str, Optional[dict]]:
+        """
+        Una sola llamada con salida JSON: ruta y, si es faq, la respuesta basada en
+        las FAQs de la búsqueda léxica. Sin respuesta, el nodo FAQ sigue el camino normal.
+        """
+        try:
+            material = await self.single_shot_context(message)
+            similar_faqs = material["faqs"]
+            faq_context = material["context"]
+            prompt = f"""CONTEXTO DE CONVERSACIÓN:
+{context or "(sin mensajes previos)"}
 
+CONSULTA DEL USUARIO:
+"{message}"
+
+INFORMACIÓN RELEVANTE ENCONTRADA:
+{faq_context}
+
+Clasifica la intención y responde en JSON con las claves "route" y "answer":
+- "route": "wizard" si el usuario quiere postular una idea o proyecto, completar el formulario o inscribirse; "faq" para cualquier otra consulta o mensaje
+- "answer": si route es "faq" y la información encontrada alcanza, la respuesta al usuario siguiendo las instrucciones; en cualquier otro caso null"""
+
+            response = await self.llm.chat_completion(
+                caller="supervisor",
+                call_type="chat",
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": material["system_prompt"]},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.3,
+                max_tokens=450
+            )
+
+            result = json.loads(response.choices[0].message.content)
+            intention = str(result.get("route", "")).strip().lower()
+            if intention not in ["faq", "wizard"]:
+                logger.warning(f"Invalid single-shot route: {intention}")
+                return "faq", None
+
+            if cache_key is not None:
+                await self.routing_cache.set(cache_key, intention)
+
+            answer = result.get("answer")
+            if intention != "faq" or not isinstance(answer, str) or not answer.strip():
+                return intention, None
+            return intention, {"query": message, "response": answer.strip(), "faqs": similar_faqs}
+
+        except Exception as e:
+            logger.error(f"Error in single-shot routing: {e}")
+            return "faq", None  # Safe fallback: el nodo FAQ recupera y responde
+
+    async def _analyze_intention_with_ai(
+            self,
+            message: str,
+            context: str,
+            cache_key: Optional[str] = None
+    ) -> str:
+        """Análisis de intención usando IA cuando no hay claridad"""
+
+        try:
+            # El contexto llega ya renderizado desde la ventana de la conversación
             prompt = f"""
 Analiza la intención del usuario en este mensaje y determina a qué agente debe dirigirse.
 
 CONTEXTO DE CONVERSACIÓN:
-{context}
+{context or "(sin mensajes previos)"}
 
 MENSAJE ACTUAL DEL USUARIO:
 "{message}"
@@ -134,7 +248,9 @@ EJEMPLOS:
 Responde ÚNICAMENTE con una palabra: faq
 """
 
-            response = await self.client.chat.completions.create(
+            response = await self.llm.chat_completion(
+                caller="supervisor",
+                call_type="routing",
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "Eres un router experto que analiza intenciones del usuario."},
@@ -146,8 +262,10 @@ Responde ÚNICAMENTE con una palabra: faq
 
             intention = response.choices[0].message.content.strip().lower()
 
-            # Validar respuesta
+            # Validar respuesta (solo las decisiones válidas se cachean)
             if intention in ["faq", "wizard"]:
+                if cache_key is not None:
+                    await self.routing_cache.set(cache_key, intention)
                 return intention
             else:
                 logger.warning(f"Invalid AI intention response: {intention}")
@@ -175,17 +293,3 @@ Responde ÚNICAMENTE con una palabra: faq
 
         # Si no hay decisión clara, ir a FAQ como default
         return "faq"
-
-
-# Instancia global del agente
-supervisor_agent = SupervisorAgent()
-
-
-async def route_message(state: ConversationState) -> ConversationState:
-    """Función wrapper para LangGraph"""
-    return await supervisor_agent.route_message(state)
-
-
-def decide_next_agent_wrapper(state: ConversationState) -> str:
-    """Función wrapper para routing condicional en LangGraph"""
-    return supervisor_agent.decide_next_agent(state)
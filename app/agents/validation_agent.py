@@ -9,16 +9,25 @@ from typing import Optional, Tuple
 
 from copilotkit import CopilotKitState
 from copilotkit.langgraph import interrupt
-from openai import AsyncOpenAI
+
+from ..services.llm_gateway import llm_gateway
+from ..services.text_matching import KeywordMatcher
 
 logger = logging.getLogger(__name__)
 
+# Pregunta 13 (composición del equipo) y respuestas de proyecto individual
+TEAM_QUESTION_KEYWORDS = KeywordMatcher(["composición del equipo", "equipo de trabajo"])
+INDIVIDUAL_PROJECT_KEYWORDS = KeywordMatcher([
+    "no tengo equipo", "proyecto solitario", "proyecto individual", "emprender solo",
+    "trabajo solo", "sin equipo", "trabajo individual"
+])
+
 
 class ValidationAgent:
     """Agente para validar y formatear respuestas del usuario"""
 
     def __init__(self, copilot_state: CopilotKitState = None):
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.llm = llm_gateway
         self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         self.copilot_state = copilot_state or CopilotKitState()
 
@@ -29,12 +38,8 @@ class ValidationAgent:
         """
         try:
             # Detectar si es la pregunta 13 (composición del equipo) y si es un proyecto individual
-            if "composición del equipo" in validation_prompt.lower() or "equipo de trabajo" in validation_prompt.lower():
-                user_input_lower = user_input.lower()
-                individual_keywords = ["no tengo equipo", "proyecto solitario", "proyecto individual", "emprender solo",
-                                       "trabajo solo", "sin equipo", "trabajo individual"]
-
-                if any(keyword in user_input_lower for keyword in individual_keywords):
+            if TEAM_QUESTION_KEYWORDS.match_any(validation_prompt):
+                if INDIVIDUAL_PROJECT_KEYWORDS.match_any(user_input):
                     # Es un proyecto individual, validar que tenga suficiente información
                     if len(user_input.strip()) < 20:
                         return None, "Por favor proporciona más detalles sobre tu proyecto individual. Explica tu experiencia y por qué decides emprender solo."
@@ -66,7 +71,9 @@ class ValidationAgent:
                         RESPUESTA:
                         """
 
-            response = await self.client.chat.completions.create(
+            response = await self.llm.chat_completion(
+                caller="validation",
+                call_type="validation",
                 model=self.model,
                 messages=[
                     {"role": "system",
@@ -7,12 +7,13 @@ import os
 from typing import Dict, Any, Optional, List
 
 from langchain_core.messages import AIMessage
-from openai import AsyncOpenAI
 
 from .validation_agent import ValidationAgent
 from .validator import validator_agent
 from ..config.questions import get_question, is_conditional_question, should_continue_after_question_11
 from ..graph.state import ConversationState
+from ..services.llm_gateway import llm_gateway
+from ..services.text_matching import best_option
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +22,7 @@ class WizardAgent:
 
     # Inicializa el agente
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.llm = llm_gateway
         self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         self.validation = ValidationAgent()
         self._initialize_nodes()
@@ -424,16 +425,8 @@ class WizardAgent:
             if not node["options"]:
                 return {"error": "Opciones no definidas"}
 
-            # Buscar opción seleccionada
-            selected_option = None
-            user_input_lower = user_input.lower().strip()
-
-            for option in node["options"]:
-                if (user_input_lower == option["value"].lower() or
-                        user_input_lower == option["label"].lower() or
-                        user_input_lower in option["label"].lower()):
-                    selected_option = option
-                    break
+            # Buscar opción seleccionada (sin distinguir mayúsculas ni tildes)
+            selected_option = best_option(user_input, node["options"])
 
             if not selected_option:
                 # Mostrar opciones disponibles
@@ -487,16 +480,13 @@ class WizardAgent:
                 return {"error": "Opciones no definidas"}
 
             # Parsear selecciones múltiples
-            selections = [s.strip().lower() for s in user_input.split(",")]
+            selections = user_input.split(",")
             selected_values = []
 
             for selection in selections:
-                for option in node["options"]:
-                    if (selection == option["value"].lower() or
-                            selection == option["label"].lower() or
-                            selection in option["label"].lower()):
-                        selected_values.append(option["value"])
-                        break
+                option = best_option(selection, node["options"])
+                if option is not None:
+                    selected_values.append(option["value"])
 
             if not selected_values and node["required"]:
                 options_text = "\n".join([f"• {opt['label']}" for opt in node["options"]])
@@ -716,7 +706,8 @@ INSTRUCCIONES:
 RESUMEN:
 """
 
-            response = await self.client.chat.completions.create(
+            response = await self.llm.chat_completion(
+                caller="wizard",
                 model=self.model,
                 messages=[
                     {"role": "system",
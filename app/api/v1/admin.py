@@ -0,0 +1,52 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.config.database import get_async_session
+from app.services.llm_gateway import llm_gateway
+from app.services.usage_accounting import GROUP_BY_COLUMNS, usage_accountant
+
+router = APIRouter()
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Exige el header X-Admin-Token igual a ADMIN_API_TOKEN. Sin token configurado
+    los endpoints de admin no existen (404): nunca quedan abiertos por defecto.
+    """
+    expected = os.getenv("ADMIN_API_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # Comparación en tiempo constante
+    if not x_admin_token or not hmac.compare_digest(
+            x_admin_token.encode("utf-8"), expected.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.get("/admin/usage", dependencies=[Depends(require_admin_token)])
+async def get_llm_usage(
+        group_by: str = Query("agent", pattern=f"^({'|'.join(GROUP_BY_COLUMNS)})$"),
+        days: int = Query(30, ge=1, le=365),
+        session: AsyncSession = Depends(get_async_session)
+) -> dict:
+    """
+    Tokens (prompt/cacheados/completion) y costo estimado en USD de las llamadas
+    a OpenAI, agrupados por agente, conversación, día o modelo.
+    """
+    try:
+        # Incluir lo acumulado en memoria que todavía no se volcó
+        await usage_accountant.flush()
+        report = await usage_accountant.get_report(session, group_by=group_by, days=days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving LLM usage: {e}")
+
+    return {
+        **report,
+        "process": {
+            "accounting": usage_accountant.get_stats(),
+            "gateway": llm_gateway.get_stats()
+        }
+    }
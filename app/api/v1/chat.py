@@ -0,0 +1,52 @@
+"""
+Endpoint de chat con streaming de tokens vía Server-Sent Events
+"""
+
+import json
+import logging
+from typing import Any, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.services.chat_service import chat_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class ChatRequest(BaseModel):
+    message: str
+    conversation_id: Optional[int] = None
+    user_email: Optional[str] = None
+
+
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/chat/stream")
+async def stream_chat(request: ChatRequest) -> StreamingResponse:
+    """
+    Emite eventos `token` ({"content": ...}) mientras se genera la respuesta y un
+    evento final `done` con la respuesta completa ya persistida en `messages`.
+    """
+
+    async def event_stream():
+        async for kind, payload in chat_service.stream_message(
+                user_message=request.message,
+                user_email=request.user_email,
+                conversation_id=request.conversation_id
+        ):
+            if kind == "token":
+                yield _sse_event("token", {"content": payload})
+            else:
+                yield _sse_event("done", payload)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -8,12 +8,10 @@ from copilotkit import CopilotKitRemoteEndpoint, LangGraphAgent
 from copilotkit.integrations.fastapi import add_fastapi_endpoint
 from fastapi import APIRouter
 
-from app.graph.workflow import IthakaWorkflow
+from app.graph.workflow import ithaka_workflow
 
 logger = logging.getLogger(__name__)
 
-ithaka_workflow = IthakaWorkflow()
-
 
 def create_copilotkit_sdk():
     """Crea el SDK de CopilotKit con el agente de LangGraph"""
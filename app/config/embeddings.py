@@ -0,0 +1,19 @@
+"""
+Configuración de embeddings compartida por el modelo de datos y los backends
+"""
+
+import os
+
+# Dimensión por defecto de cada backend de embeddings
+DEFAULT_EMBEDDING_DIMENSIONS = {
+    "openai": 1536,  # text-embedding-3-small
+    "local": 384,  # paraphrase-multilingual-MiniLM-L12-v2
+}
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai").lower()
+
+# Dimensión de la columna vector y de los embeddings generados
+EMBEDDING_DIMENSION = int(os.getenv(
+    "EMBEDDING_DIMENSION",
+    str(DEFAULT_EMBEDDING_DIMENSIONS.get(EMBEDDING_BACKEND, 1536))
+))
@@ -1,11 +1,20 @@
 import asyncio
 
 from app.db.config.database import Base, engine
+from app.db.config.faq_schema import (
+    check_embedding_dimension,
+    ensure_faq_embedding_schema,
+)
+from app.db.config.message_schema import ensure_message_schema
 
 
 async def create_tables():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # create_all no agrega columnas nuevas a tablas existentes
+        await ensure_faq_embedding_schema(conn)
+        await ensure_message_schema(conn)
+        await check_embedding_dimension(conn)
 
 if __name__ == "__main__":
-    asyncio.run(create_tables())
\ No newline at end of file
+    asyncio.run(create_tables())
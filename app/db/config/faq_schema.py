@@ -0,0 +1,98 @@
+"""
+Migración de esquema de faq_embeddings para bases existentes: create_all no agrega
+columnas a tablas que ya existen. La parte no destructiva corre en cada arranque
+(create_tables); el cambio de dimensión y el re-embebido quedan en
+scripts/migrate_faq_embeddings.py.
+"""
+
+import logging
+
+from sqlalchemy import bindparam, inspect, select, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from ...config.embeddings import EMBEDDING_DIMENSION
+from ...services.embedding_service import faq_content_hash
+from ..models import FAQEmbedding
+
+logger = logging.getLogger(__name__)
+
+TABLE = FAQEmbedding.__tablename__
+
+# Columnas agregadas después de la versión inicial de la tabla
+ADDED_COLUMNS = {
+    "content_hash": "VARCHAR(64)",
+    "embedding_model": "VARCHAR(100)",
+    "embedding_dimension": "INTEGER",
+    "updated_at": "TIMESTAMPTZ DEFAULT now()"
+}
+
+
+class EmbeddingDimensionMismatch(RuntimeError):
+    """La columna vector tiene otra dimensión que EMBEDDING_DIMENSION"""
+
+
+async def ensure_faq_embedding_schema(conn: AsyncConnection) -> list[str]:
+    """
+    Agrega las columnas faltantes, completa hashes, elimina duplicados y crea el
+    índice único por hash. Idempotente; devuelve las columnas agregadas.
+    """
+    if conn.dialect.name != "postgresql":
+        return []
+
+    existing = await conn.run_sync(
+        lambda sync_conn: {c["name"] for c in inspect(sync_conn).get_columns(TABLE)})
+    missing = [name for name in ADDED_COLUMNS if name not in existing]
+    if missing:
+        await conn.execute(text(
+            f"ALTER TABLE {TABLE} "
+            + ", ".join(f"ADD COLUMN IF NOT EXISTS {name} {ADDED_COLUMNS[name]}" for name in missing)
+        ))
+        logger.info(f"Added columns to {TABLE}: {', '.join(missing)}")
+
+    # Completar hashes faltantes
+    rows = (await conn.execute(
+        select(FAQEmbedding.id, FAQEmbedding.question, FAQEmbedding.answer)
+        .where(FAQEmbedding.content_hash.is_(None))
+    )).all()
+    if rows:
+        await conn.execute(
+            update(FAQEmbedding.__table__)
+            .where(FAQEmbedding.__table__.c.id == bindparam("row_id"))
+            .values(content_hash=bindparam("hash")),
+            [{"row_id": row.id, "hash": faq_content_hash(row.question, row.answer)}
+             for row in rows]
+        )
+        logger.info(f"Filled {len(rows)} missing FAQ content hashes")
+
+    # Eliminar duplicados conservando la FAQ más antigua
+    deleted = await conn.execute(text(
+        f"DELETE FROM {TABLE} a USING {TABLE} b "
+        "WHERE a.content_hash = b.content_hash AND a.id > b.id"
+    ))
+    if deleted.rowcount:
+        logger.info(f"Deleted {deleted.rowcount} duplicated FAQs")
+
+    await conn.execute(text(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{TABLE}_content_hash "
+        f"ON {TABLE} (content_hash)"
+    ))
+    return missing
+
+
+async def get_embedding_column_dimension(conn: AsyncConnection) -> int:
+    """Dimensión declarada de la columna vector (atttypmod en pg_attribute)"""
+    return (await conn.execute(text(
+        "SELECT atttypmod FROM pg_attribute "
+        f"WHERE attrelid = '{TABLE}'::regclass AND attname = 'embedding'"
+    ))).scalar_one()
+
+
+async def check_embedding_dimension(conn: AsyncConnection) -> None:
+    """Falla si la columna vector no coincide con EMBEDDING_DIMENSION"""
+    if conn.dialect.name != "postgresql":
+        return
+    current = await get_embedding_column_dimension(conn)
+    if current != EMBEDDING_DIMENSION:
+        raise EmbeddingDimensionMismatch(
+            f"{TABLE}.embedding is vector({current}) but EMBEDDING_DIMENSION is "
+            f"{EMBEDDING_DIMENSION}; run python scripts/migrate_faq_embeddings.py")
@@ -0,0 +1,33 @@
+"""
+Migración de esquema de messages para bases existentes: create_all no agrega
+columnas a tablas que ya existen. Corre en cada arranque (create_tables).
+"""
+
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from ..models import Message
+
+logger = logging.getLogger(__name__)
+
+TABLE = Message.__tablename__
+
+# Columnas agregadas después de la versión inicial de la tabla
+ADDED_COLUMNS = {
+    "agent": "VARCHAR(50)"
+}
+
+
+async def ensure_message_schema(conn: AsyncConnection) -> list[str]:
+    """Agrega las columnas faltantes (PostgreSQL y SQLite); devuelve las agregadas"""
+    existing = await conn.run_sync(
+        lambda sync_conn: {c["name"] for c in inspect(sync_conn).get_columns(TABLE)})
+    missing = [name for name in ADDED_COLUMNS if name not in existing]
+    for name in missing:
+        # SQLite no admite varias columnas en un mismo ALTER TABLE
+        await conn.execute(text(f"ALTER TABLE {TABLE} ADD COLUMN {name} {ADDED_COLUMNS[name]}"))
+    if missing:
+        logger.info(f"Added columns to {TABLE}: {', '.join(missing)}")
+    return missing
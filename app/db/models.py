@@ -1,7 +1,11 @@
-from sqlalchemy import Column, Float, Integer, String, DateTime, ForeignKey, JSON, func, Text
+from sqlalchemy import Column, Date, Float, Integer, String, DateTime, ForeignKey, JSON, func, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector
 from .config.database import Base
+from ..config.embeddings import EMBEDDING_DIMENSION
+
+# Índice ANN sobre faq_embeddings.embedding (ver scripts/rebuild_faq_index.py)
+FAQ_EMBEDDING_INDEX_NAME = "ix_faq_embeddings_embedding_ann"
 
 
 class Conversation(Base):
@@ -22,6 +26,8 @@ class Message(Base):
     conv_id = Column(Integer, ForeignKey("conversations.id"), index=True)
     role = Column(String(50), nullable=False)
     content = Column(String, nullable=False)
+    # Agente que generó la respuesta (solo mensajes del asistente)
+    agent = Column(String(50), nullable=True)
     ts = Column(DateTime(timezone=True), server_default=func.now())
 
     conversation = relationship("Conversation", back_populates="messages")
@@ -45,7 +51,34 @@ class FAQEmbedding(Base):
     id = Column(Integer, primary_key=True, index=True)
     question = Column(String, nullable=False)
     answer = Column(Text, nullable=False)
-    embedding = Column(Vector(1536))  # OpenAI embeddings dimension
+    # Dimensión configurable (ver scripts/migrate_faq_embeddings.py si cambia)
+    embedding = Column(Vector(EMBEDDING_DIMENSION))
+    # sha256 de pregunta + respuesta, para upserts idempotentes
+    content_hash = Column(String(64), unique=True, index=True, nullable=True)
+    # Modelo y dimensión con los que se generó el embedding (detecta filas viejas)
+    embedding_model = Column(String(100), nullable=True)
+    embedding_dimension = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Cambia con cada re-embebido o upsert (entra en la firma del corpus)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index(
+            FAQ_EMBEDDING_INDEX_NAME,
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
+
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+    # sha256 de modelo + texto normalizado
+    cache_key = Column(String(64), primary_key=True)
+    model = Column(String(100), nullable=False)
+    embedding = Column(Vector())  # Sin dimensión fija: depende del modelo
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
@@ -63,3 +96,32 @@ class WizardSession(Base):
 
     conversation = relationship(
         "Conversation", back_populates="wizard_sessions")
+
+
+class RoutingCacheEntry(Base):
+    __tablename__ = "routing_cache"
+    # sha256 de mensaje normalizado + firma de contexto
+    cache_key = Column(String(64), primary_key=True)
+    decision = Column(String(50), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Tokens consumidos por día, conversación, agente y modelo (una fila por combinación)
+class LLMUsage(Base):
+    __tablename__ = "llm_usage"
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    # 0 = llamadas sin conversación asociada (CopilotKit, scripts)
+    conversation_id = Column(Integer, nullable=False, default=0, index=True)
+    agent = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    calls = Column(Integer, nullable=False, default=0)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    cached_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True),
+                        server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("day", "conversation_id", "agent", "model", name="uq_llm_usage_key"),
+    )
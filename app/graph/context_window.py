@@ -0,0 +1,159 @@
+"""
+Ventana de contexto de la conversación: ring buffer con los últimos N mensajes
+(usuario/asistente) y el fragmento de prompt ya renderizado. Viaja en
+ConversationState como dict serializable, así los nodos no reconstruyen listas
+a partir de state["messages"] en cada paso.
+"""
+
+import logging
+import os
+from collections import deque
+from collections.abc import Iterable, Sequence
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Roles de LangChain ("human"/"ai") y de la tabla messages ("user"/"assistant")
+ROLE_LABELS = {
+    "human": "usuario",
+    "user": "usuario",
+    "ai": "asistente",
+    "assistant": "asistente"
+}
+
+USER_LABEL = "usuario"
+
+
+class ConversationWindow:
+    """Últimos max_messages mensajes tipados (rol, contenido)"""
+
+    def __init__(
+            self,
+            max_messages: int = 6,
+            max_chars: int = 300,
+            messages: Iterable[Sequence[str]] = (),
+            consumed: int = 0,
+            rendered: Optional[str] = None,
+            last_agent: Optional[str] = None
+    ):
+        self.max_messages = max_messages
+        self.max_chars = max_chars
+        self._messages: deque[tuple[str, str]] = deque(
+            ((role, content) for role, content in messages), maxlen=max_messages)
+        # Cantidad de mensajes de state["messages"] ya incorporados
+        self.consumed = consumed
+        self._rendered = rendered
+        # Agente que generó la última respuesta del asistente (None si no se sabe)
+        self.last_agent = last_agent
+
+    def append(self, role: str, content: Any, agent: Optional[str] = None) -> None:
+        """Agrega un mensaje; los roles que no son usuario/asistente se ignoran"""
+        label = ROLE_LABELS.get(role)
+        if label is None or not isinstance(content, str) or not content.strip():
+            return
+        self._messages.append((label, content.strip()))
+        if label != USER_LABEL:
+            self.last_agent = agent
+        self._rendered = None
+
+    def extend_from_history(self, history: Iterable[dict[str, Any]]) -> "ConversationWindow":
+        """
+        Incorpora el historial persistido (dicts con role, content y, en las
+        respuestas, agent; del más viejo al más nuevo)
+        """
+        for message in history:
+            self.append(message.get("role", ""), message.get("content"), message.get("agent"))
+        return self
+
+    def sync(self, messages: Sequence[Any]) -> "ConversationWindow":
+        """Incorpora solo los mensajes de state["messages"] posteriores al último sync"""
+        if self.consumed > len(messages):
+            # La lista fue reemplazada: reconstruir desde cero
+            self._messages.clear()
+            self.consumed = 0
+            self._rendered = None
+        for message in messages[self.consumed:]:
+            self.append(getattr(message, "type", ""), getattr(message, "content", None))
+        self.consumed = len(messages)
+        return self
+
+    @property
+    def last_user_message(self) -> str:
+        """Último mensaje del usuario (vacío si no hay)"""
+        for role, content in reversed(self._messages):
+            if role == USER_LABEL:
+                return content
+        return ""
+
+    def render(self) -> str:
+        """
+        Fragmento compacto "rol: contenido" de los mensajes previos al mensaje
+        actual del usuario; cada mensaje se recorta a max_chars
+        """
+        if self._rendered is None:
+            previous = list(self._messages)
+            if previous and previous[-1][0] == USER_LABEL:
+                previous = previous[:-1]
+            self._rendered = "\n".join(
+                f"{role}: {self._truncate(content)}" for role, content in previous)
+        return self._rendered
+
+    def _truncate(self, content: str) -> str:
+        text = " ".join(content.split())
+        if len(text) <= self.max_chars:
+            return text
+        return text[:self.max_chars - 1].rstrip() + "…"
+
+    def to_state(self) -> dict[str, Any]:
+        """Representación serializable para ConversationState (incluye el fragmento renderizado)"""
+        return {
+            "max_messages": self.max_messages,
+            "max_chars": self.max_chars,
+            "messages": [list(message) for message in self._messages],
+            "consumed": self.consumed,
+            "rendered": self.render(),
+            "last_user_message": self.last_user_message,
+            "last_agent": self.last_agent
+        }
+
+    @classmethod
+    def from_state(cls, data: dict[str, Any]) -> "ConversationWindow":
+        return cls(
+            max_messages=data["max_messages"],
+            max_chars=data["max_chars"],
+            messages=data["messages"],
+            consumed=data["consumed"],
+            rendered=data.get("rendered"),
+            last_agent=data.get("last_agent")
+        )
+
+
+def create_context_window_from_env() -> ConversationWindow:
+    """Crea una ventana vacía según CONTEXT_WINDOW_*"""
+    return ConversationWindow(
+        max_messages=int(os.getenv("CONTEXT_WINDOW_MAX_MESSAGES", "6")),
+        max_chars=int(os.getenv("CONTEXT_WINDOW_MAX_CHARS", "300"))
+    )
+
+
+def ensure_context_window(state: dict[str, Any]) -> ConversationWindow:
+    """
+    Ventana del estado actualizada con los mensajes nuevos (la crea si no existe)
+    y guardada de vuelta en state["context_window"]
+    """
+    data = state.get("context_window")
+    if data and data.get("consumed") == len(state["messages"]):
+        return ConversationWindow.from_state(data)
+
+    window = ConversationWindow.from_state(data) if data else create_context_window_from_env()
+    window.sync(state["messages"])
+    state["context_window"] = window.to_state()
+    return window
+
+
+def current_user_message(state: dict[str, Any]) -> str:
+    """Mensaje actual del usuario, desde la ventana si ya está al día"""
+    data = state.get("context_window")
+    if data and data.get("consumed") == len(state["messages"]):
+        return data["last_user_message"]
+    return ensure_context_window(state).last_user_message
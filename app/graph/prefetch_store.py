@@ -0,0 +1,49 @@
+"""
+Canal lateral por turno para resultados especulativos (FAQs recuperadas por el
+supervisor mientras decide el routing). No viajan en ConversationState: el estado
+se checkpointea y se emite en cada chunk "values", y el embedding de la consulta
+son ~1536 floats. Se indexan por el id del mensaje del usuario.
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TurnPrefetchStore:
+    """Dict acotado id de mensaje → resultado; los más viejos se descartan (turnos abortados)"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+    def put(self, message_id: Optional[str], value: dict[str, Any]) -> None:
+        if not message_id:
+            return
+        self._entries[message_id] = value
+        self._entries.move_to_end(message_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, message_id: Optional[str]) -> Optional[dict[str, Any]]:
+        """Resultado del turno (una sola vez), None si no hay"""
+        if not message_id:
+            return None
+        return self._entries.pop(message_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def current_message_id(state: dict[str, Any]) -> Optional[str]:
+    """Id del último mensaje del usuario en state["messages"] (LangGraph lo asigna)"""
+    for message in reversed(state.get("messages", [])):
+        if getattr(message, "type", None) == "human":
+            return message.id
+    return None
+
+
+# Instancia global compartida por el supervisor y el agente FAQ
+faq_prefetch_store = TurnPrefetchStore()
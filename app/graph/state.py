@@ -38,3 +38,7 @@ class ConversationState(TypedDict):
     agent_context: Dict[str, Any]
     # Referencia al wizard state, no los campos del wizard
     wizard_state: Optional[WizardState]
+    # Ventana con los últimos mensajes y su fragmento de prompt (ver context_window.py)
+    context_window: Optional[dict[str, Any]]
+    # Ruta y respuesta de una sola llamada al LLM (SUPERVISOR_ROUTING_MODE=single_shot)
+    single_shot_answer: Optional[dict[str, Any]]
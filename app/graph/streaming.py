@@ -0,0 +1,80 @@
+"""
+Streaming de completions de OpenAI dentro de nodos LangGraph.
+Los tokens se reportan como un run de chat model de LangChain, así llegan tanto a
+astream_events (CopilotKit) como a stream_mode="messages" (endpoint SSE).
+"""
+
+import logging
+import uuid
+from contextlib import aclosing
+from typing import Any, Optional
+
+from langchain_core.callbacks import AsyncCallbackManager
+from langchain_core.messages import AIMessage, AIMessageChunk, convert_to_messages
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, LLMResult
+from langchain_core.runnables import ensure_config
+
+from ..services.llm_gateway import LLMGateway
+
+logger = logging.getLogger(__name__)
+
+
+def new_message_id() -> str:
+    """Id compartido por los chunks streameados y el AIMessage final del nodo"""
+    return f"run-{uuid.uuid4()}"
+
+
+async def stream_chat_completion(
+        gateway: LLMGateway,
+        *,
+        caller: str,
+        call_type: str = "chat",
+        message_id: Optional[str] = None,
+        name: str = "openai",
+        **params: Any
+) -> str:
+    """
+    Ejecuta chat.completions.create en streaming vía el gateway, emite cada token
+    a los callbacks del nodo actual y devuelve el texto completo.
+    """
+    config = ensure_config()
+    callback_manager = AsyncCallbackManager.configure(
+        inheritable_callbacks=config.get("callbacks"),
+        inheritable_tags=config.get("tags"),
+        inheritable_metadata=config.get("metadata")
+    )
+    message_id = message_id or new_message_id()
+
+    run_managers = await callback_manager.on_chat_model_start(
+        {"lc": 1, "type": "not_implemented", "id": ["openai", "AsyncOpenAI"], "name": name},
+        [convert_to_messages(params["messages"])],
+        invocation_params={k: v for k, v in params.items() if k != "messages"},
+        name=name
+    )
+    run_manager = run_managers[0]
+
+    parts: list[str] = []
+    try:
+        # aclosing: si un callback falla o el nodo se cancela, el stream se cierra acá
+        # (y libera slot y span) en vez de esperar al garbage collector
+        async with aclosing(gateway.stream_chat_completion(caller, call_type, **params)) as chunks:
+            async for chunk in chunks:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if not token:
+                    continue
+                parts.append(token)
+                await run_manager.on_llm_new_token(
+                    token,
+                    chunk=ChatGenerationChunk(message=AIMessageChunk(content=token, id=message_id))
+                )
+    except BaseException as e:
+        await run_manager.on_llm_error(e)
+        raise
+
+    content = "".join(parts)
+    await run_manager.on_llm_end(LLMResult(generations=[[
+        ChatGeneration(message=AIMessage(content=content, id=message_id))
+    ]]))
+    return content
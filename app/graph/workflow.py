@@ -4,41 +4,56 @@ Workflow principal de LangGraph para orquestar todos los agentes del sistema Ith
 
 import logging
 from datetime import datetime
+from collections.abc import AsyncIterator
 from typing import Any
 import uuid
 
 from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.graph import StateGraph, END
 from langgraph.graph.state import CompiledStateGraph
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessageChunk, HumanMessage
 
+from .context_window import create_context_window_from_env
 from .state import ConversationState
-from ..agents.faq import handle_faq_query
-from ..agents.supervisor import route_message, decide_next_agent_wrapper
+from ..agents.faq import faq_agent, handle_faq_query
+from ..agents.supervisor import SupervisorAgent
 from ..agents.wizard_workflow.wizard_graph import wizard_graph
+from ..services.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+# Instancia global del supervisor, con la recuperación de FAQs del agente FAQ inyectada
+supervisor_agent = SupervisorAgent(
+    prefetch_faqs=faq_agent.prefetch_faqs,
+    single_shot_context=faq_agent.single_shot_context
+)
+
 
 class IthakaWorkflow:
     """Workflow principal que maneja toda la lógica de conversación"""
 
     def __init__(self):
-        self.graph = self._build_graph()
+        builder = self._build_graph()
+        # CopilotKit guarda el estado por thread_id entre turnos: necesita checkpointer
+        self.graph: CompiledStateGraph = builder.compile(checkpointer=InMemorySaver())
+        # ChatService y /chat/stream reconstruyen el estado desde la base en cada turno:
+        # sin checkpointer, ningún turno queda retenido en memoria del proceso
+        self.stateless_graph: CompiledStateGraph = builder.compile()
 
-    def _build_graph(self) -> CompiledStateGraph:
-        """Construye el grafo de estados LangGraph"""
+    def _build_graph(self) -> StateGraph:
+        """Construye el grafo de estados LangGraph (sin compilar)"""
 
         # Crear el grafo con el estado compartido
         workflow = StateGraph(ConversationState)
 
-        # Agregar nodos (agentes)
-        workflow.add_node("supervisor", route_message)
+        # Agregar nodos (agentes), cada uno medido como un span
+        workflow.add_node(
+            "supervisor", tracer.traced("node.supervisor")(supervisor_agent.route_message))
         # workflow.add_node("wizard", handle_wizard_flow)
 
-        workflow.add_node("wizard", handle_wizard_flow_good)
+        workflow.add_node("wizard", tracer.traced("node.wizard")(handle_wizard_flow_good))
 
-        workflow.add_node("faq", handle_faq_query)
+        workflow.add_node("faq", tracer.traced("node.faq")(handle_faq_query))
 
         # Definir punto de entrada
         workflow.set_entry_point("supervisor")
@@ -46,7 +61,7 @@ class IthakaWorkflow:
         # Agregar bordes condicionales desde el supervisor
         workflow.add_conditional_edges(
             "supervisor",
-            decide_next_agent_wrapper,
+            supervisor_agent.decide_next_agent,
             {
                 "wizard": "wizard",
                 "faq": "faq",
@@ -68,8 +83,7 @@ class IthakaWorkflow:
         workflow.add_edge("wizard", END)
         workflow.add_edge("faq", END)
 
-        # Compilar el grafo
-        return workflow.compile(checkpointer=InMemorySaver())
+        return workflow
 
     def _wizard_should_continue(self, state: ConversationState) -> str:
         """Determina si el wizard debe continuar o terminar"""
@@ -91,7 +105,8 @@ class IthakaWorkflow:
     def _create_initial_state(
             self,
             user_message: str,
-            wizard_state: dict[str, Any] = None
+            wizard_state: dict[str, Any] = None,
+            chat_history: list[dict[str, str]] = None
     ) -> ConversationState:
         """Crea el estado inicial para el workflow"""
 
@@ -122,19 +137,26 @@ class IthakaWorkflow:
                 "valid": False  # Inicializar valid
             }
 
+        # Ventana de contexto sembrada con el historial persistido (ChatService)
+        messages = [HumanMessage(content=user_message)]
+        context_window = create_context_window_from_env()
+        context_window.extend_from_history(chat_history or []).sync(messages)
+
         return {
-            "messages": [HumanMessage(content=user_message)],
+            "messages": messages,
             "conversation_id": None,
             "user_email": None,
             "current_agent": "supervisor",
             "agent_context": {},
-            "wizard_state": wizard_state_obj
+            "wizard_state": wizard_state_obj,
+            "context_window": context_window.to_state()
         }
 
     async def process_message(
             self,
             user_message: str,
-            wizard_state: dict[str, Any] = None
+            wizard_state: dict[str, Any] = None,
+            chat_history: list[dict[str, str]] = None
     ) -> dict[str, Any]:
         """Procesa un mensaje del usuario a través del grafo de agentes"""
 
@@ -142,51 +164,104 @@ class IthakaWorkflow:
             # Crear estado inicial
             initial_state = self._create_initial_state(
                 user_message=user_message,
-                wizard_state=wizard_state
+                wizard_state=wizard_state,
+                chat_history=chat_history
             )
 
             logger.info(f"Processing message: {user_message[:50]}...")
-            result = await self.graph.ainvoke(initial_state)
-
-            # Extraer información relevante del resultado
-            wizard_state_obj = result.get("wizard_state")
-            response_data = {
-                "response": result.get("agent_context", {}).get("response", "Lo siento, no pude procesar tu mensaje."),
-                "agent_used": result.get("current_agent", "unknown")
-            }
-
-            # Si hay wizard state, extraer sus campos
-            if wizard_state_obj:
-                response_data.update({
-                    "wizard_session_id": wizard_state_obj.get("wizard_session_id"),
-                    "wizard_state": wizard_state_obj.get("wizard_status", "INACTIVE"),
-                    "current_question": wizard_state_obj.get("current_question"),
-                    "wizard_responses": wizard_state_obj.get("wizard_responses", {}),
-                    "awaiting_answer": wizard_state_obj.get("awaiting_answer", False)
-                })
-            else:
-                response_data.update({
-                    "wizard_session_id": None,
-                    "wizard_state": "INACTIVE",
-                    "current_question": 1,
-                    "wizard_responses": {},
-                    "awaiting_answer": False
-                })
+            with tracer.span("workflow.turn"):
+                result = await self.stateless_graph.ainvoke(initial_state)
+            response_data = self._build_response_data(result)
 
             logger.info(f"Message processed successfully by {response_data['agent_used']}")
             return response_data
 
         except Exception as e:
             logger.error(f"Error processing message through workflow: {e}")
-            return {
-                "response": "Lo siento, tuve un problema técnico procesando tu mensaje. ¿Podrías intentar de nuevo?",
-                "agent_used": "error_handler",
+            return self._error_response(e)
+
+    async def stream_message(
+            self,
+            user_message: str,
+            wizard_state: dict[str, Any] = None,
+            chat_history: list[dict[str, str]] = None
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """
+        Procesa un mensaje emitiendo ("token", texto) a medida que el LLM genera
+        y al final ("result", response_data) con el mismo formato que process_message
+        """
+
+        try:
+            initial_state = self._create_initial_state(
+                user_message=user_message,
+                wizard_state=wizard_state,
+                chat_history=chat_history
+            )
+
+            logger.info(f"Streaming message: {user_message[:50]}...")
+            result = None
+            # El span cubre el turno completo, incluidos los yields al consumidor
+            with tracer.span("workflow.turn"):
+                async for mode, payload in self.stateless_graph.astream(
+                        initial_state,
+                        stream_mode=["messages", "values"]
+                ):
+                    if mode == "values":
+                        result = payload
+                        continue
+
+                    message, _metadata = payload
+                    if isinstance(message, AIMessageChunk) and message.content:
+                        yield "token", message.content
+
+            response_data = self._build_response_data(result or {})
+            logger.info(f"Message streamed successfully by {response_data['agent_used']}")
+            yield "result", response_data
+
+        except Exception as e:
+            logger.error(f"Error streaming message through workflow: {e}")
+            yield "result", self._error_response(e)
+
+    @staticmethod
+    def _build_response_data(result: dict[str, Any]) -> dict[str, Any]:
+        """Extrae la respuesta y el estado del wizard del estado final del grafo"""
+        wizard_state_obj = result.get("wizard_state")
+        response_data = {
+            "response": result.get("agent_context", {}).get("response", "Lo siento, no pude procesar tu mensaje."),
+            "agent_used": result.get("current_agent", "unknown")
+        }
+
+        # Si hay wizard state, extraer sus campos
+        if wizard_state_obj:
+            response_data.update({
+                "wizard_session_id": wizard_state_obj.get("wizard_session_id"),
+                "wizard_state": wizard_state_obj.get("wizard_status", "INACTIVE"),
+                "current_question": wizard_state_obj.get("current_question"),
+                "wizard_responses": wizard_state_obj.get("wizard_responses", {}),
+                "awaiting_answer": wizard_state_obj.get("awaiting_answer", False)
+            })
+        else:
+            response_data.update({
                 "wizard_session_id": None,
                 "wizard_state": "INACTIVE",
                 "current_question": 1,
-                "awaiting_answer": False,
-                "error": str(e)
-            }
+                "wizard_responses": {},
+                "awaiting_answer": False
+            })
+
+        return response_data
+
+    @staticmethod
+    def _error_response(error: Exception) -> dict[str, Any]:
+        return {
+            "response": "Lo siento, tuve un problema técnico procesando tu mensaje. ¿Podrías intentar de nuevo?",
+            "agent_used": "error_handler",
+            "wizard_session_id": None,
+            "wizard_state": "INACTIVE",
+            "current_question": 1,
+            "awaiting_answer": False,
+            "error": str(error)
+        }
 
 
 async def handle_wizard_flow_good(state: dict) -> dict:
@@ -195,8 +270,9 @@ async def handle_wizard_flow_good(state: dict) -> dict:
     # Extraer el wizard_state del ConversationState
     wizard_state = state.get("wizard_state")
 
-    if not wizard_state:
-        # Si no hay wizard_state, crear uno por defecto
+    if not wizard_state or not wizard_state.get("wizard_session_id"):
+        # Si no hay wizard_state (o el supervisor rutea al wizard desde un estado
+        # inactivo, sin sesión), crear uno por defecto
         import uuid
         wizard_state = {
             "wizard_session_id": str(uuid.uuid4()),
@@ -224,3 +300,41 @@ async def handle_wizard_flow_good(state: dict) -> dict:
         "messages": result.get("messages", []),  # Usar los mensajes del wizard para el frontend
         "agent_context": {"response": result.get("messages", [])[-1].content if result.get("messages") else ""}
     }
+
+
+# Instancia global del workflow (compartida por CopilotKit y el servicio de chat)
+ithaka_workflow = IthakaWorkflow()
+
+
+async def process_user_message(
+        user_message: str,
+        conversation_id: int = None,
+        chat_history: list[dict[str, str]] = None,
+        user_email: str = None,
+        wizard_state: dict[str, Any] = None
+) -> dict[str, Any]:
+    """Procesa un mensaje con el workflow global (usado por ChatService)"""
+    result = await ithaka_workflow.process_message(
+        user_message=user_message,
+        wizard_state=wizard_state,
+        chat_history=chat_history
+    )
+    return {**result, "conversation_id": conversation_id}
+
+
+async def stream_user_message(
+        user_message: str,
+        conversation_id: int = None,
+        chat_history: list[dict[str, str]] = None,
+        user_email: str = None,
+        wizard_state: dict[str, Any] = None
+) -> AsyncIterator[tuple[str, Any]]:
+    """Versión en streaming de process_user_message"""
+    async for kind, payload in ithaka_workflow.stream_message(
+            user_message=user_message,
+            wizard_state=wizard_state,
+            chat_history=chat_history
+    ):
+        if kind == "result":
+            payload = {**payload, "conversation_id": conversation_id}
+        yield kind, payload
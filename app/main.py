@@ -1,9 +1,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
+from app.agents.faq import faq_agent
+from app.api.v1.admin import router as admin_router
+from app.api.v1.chat import router as chat_router
 from app.api.v1.conversations import router as conversations_router
 from app.api.v1.copilotkit_endpoint import router as copilotkit_router
 from app.api.v1.scoring import router as scoring_router
+from app.db.config.database import get_async_session
+from app.services.embedding_service import embedding_service
+from app.services.tracing import tracer
+from app.services.usage_accounting import usage_accountant
 
 v1 = '/api/v1'
 
@@ -22,6 +30,26 @@ app.add_middleware(
 app.include_router(conversations_router)
 app.include_router(scoring_router, prefix=v1, tags=["Scoring"])
 app.include_router(copilotkit_router, prefix=v1, tags=["CopilotKit"])
+app.include_router(chat_router, prefix=v1, tags=["Chat"])
+app.include_router(admin_router, prefix=v1, tags=["Admin"])
+
+
+@app.on_event("startup")
+async def warm_up_faq_index():
+    # El tokenizer de tiktoken se carga en un hilo: sin red no demora el arranque
+    faq_agent.context_builder.warm_up()
+    async for session in get_async_session():
+        await embedding_service.warm_up(session)
+
+
+@app.on_event("startup")
+async def start_usage_accounting():
+    usage_accountant.start()
+
+
+@app.on_event("shutdown")
+async def flush_usage_accounting():
+    await usage_accountant.stop()
 
 
 @app.get("/")
@@ -32,3 +60,9 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "service": "ithaka-backend"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(tracer.render_prometheus(),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,16 +1,16 @@
 import json
-import os
 from typing import Dict, Any
 
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
+
+from .llm_gateway import llm_gateway
 
 load_dotenv()
 
 
 class AIScoreEngine:
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.llm = llm_gateway
 
     async def evaluar_postulacion(self, texto: str) -> Dict[str, Any]:
         """
@@ -50,7 +50,9 @@ class AIScoreEngine:
             }}
             """
 
-            response = await self.client.chat.completions.create(
+            response = await self.llm.chat_completion(
+                caller="scoring",
+                call_type="scoring",
                 model="gpt-4",
                 messages=[
                     {"role": "system",
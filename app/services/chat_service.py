@@ -3,13 +3,16 @@ Servicio de chat actualizado para integrar con el sistema de agentes LangGraph
 """
 
 import logging
+from collections.abc import AsyncIterator
 from typing import Any, Optional, Dict
 
 from sqlalchemy import select, and_
 
-from ..db.config.database import get_async_session
+from ..db.config.database import SessionLocal, get_async_session
 from ..db.models import Conversation, Message, WizardSession
-from ..graph.workflow import process_user_message
+from ..graph.workflow import process_user_message, stream_user_message
+from .tracing import tracer
+from .usage_accounting import current_conversation_id
 
 logger = logging.getLogger(__name__)
 
@@ -22,16 +25,15 @@ class ChatService:
 
     async def _with_session(self, operation):
         """Helper method to handle session acquisition pattern"""
-        async for session in get_async_session():
+        # Un break en finally descartaba el return: siempre devolvía None
+        async with SessionLocal() as session:
             try:
-                result = await operation(session)
-                return result
-            except Exception as e:
+                return await operation(session)
+            except Exception:
                 await session.rollback()
                 raise
-            finally:
-                break
 
+    @tracer.traced("chat.turn")
     async def process_message(
         self,
         user_message: str,
@@ -41,21 +43,10 @@ class ChatService:
         """Procesa un mensaje del usuario usando el sistema de agentes"""
 
         try:
-            # Obtener o crear conversación
-            if not conversation_id and user_email:
-                conversation_id = await self._get_or_create_conversation(user_email)
-            elif not conversation_id and not user_email:
-                # Para preguntas FAQ sin email, crear conversación temporal
-                conversation_id = await self._create_temporary_conversation()
-
-            # Obtener historial de la conversación
-            chat_history = []
-            if conversation_id:
-                chat_history = await self._get_chat_history(conversation_id)
-            
-            # Recuperar estado del wizard si existe
-            wizard_state = await self._get_wizard_state(conversation_id)
-            logger.info(f"Retrieved wizard state: {wizard_state}")
+            conversation_id, chat_history, wizard_state = await self._prepare_conversation(
+                user_email, conversation_id)
+            # Los tokens que consuma el turno se atribuyen a esta conversación
+            current_conversation_id.set(conversation_id)
 
             # Procesar mensaje a través del workflow de agentes
             result = await process_user_message(
@@ -66,56 +57,140 @@ class ChatService:
                 wizard_state=wizard_state
             )
 
-            # Guardar mensajes en la base de datos
-            if conversation_id:
-                await self._save_messages(
-                    conversation_id=conversation_id,
+            await self._persist_result(conversation_id, user_message, user_email, result)
+            return self._build_chat_response(result, conversation_id)
+
+        except Exception as e:
+            logger.error(f"Error in chat service: {e}")
+            return self._error_response(e, conversation_id)
+
+    async def stream_message(
+        self,
+        user_message: str,
+        user_email: str = None,
+        conversation_id: int = None
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """
+        Igual que process_message pero emite ("token", texto) mientras se genera.
+        El texto completo se persiste al terminar y se emite ("done", respuesta).
+        """
+
+        # Un generador async no puede usar tracer.traced: el span se abre adentro
+        with tracer.span("chat.turn"):
+            try:
+                conversation_id, chat_history, wizard_state = await self._prepare_conversation(
+                    user_email, conversation_id)
+                # Los tokens que consuma el turno se atribuyen a esta conversación
+                current_conversation_id.set(conversation_id)
+
+                result = None
+                async for kind, payload in stream_user_message(
                     user_message=user_message,
-                    bot_response=result["response"]
-                )
-            
-            # Persistir estado del wizard si es necesario
-            if result.get("wizard_state") in ["ACTIVE", "COMPLETED", "PAUSED", "INACTIVE"]:
-                logger.info(f"Saving wizard state: {result.get('wizard_state')}, question: {result.get('current_question')}")
-                await self._save_wizard_state(
                     conversation_id=conversation_id,
-                    wizard_session_id=result.get("wizard_session_id"),
-                    wizard_state=result.get("wizard_state"),
-                    current_question=result.get("current_question"),
-                    wizard_responses=result.get("wizard_responses", {})
-                )
+                    chat_history=chat_history,
+                    user_email=user_email,
+                    wizard_state=wizard_state
+                ):
+                    if kind == "token":
+                        yield "token", payload
+                    else:
+                        result = payload
 
-            # Actualizar email de conversación si se proporcionó durante el wizard
-            if user_email and conversation_id:
-                await self._update_conversation_email(conversation_id, user_email)
-
-            return {
-                "success": True,
-                "response": result["response"],
-                "conversation_id": result["conversation_id"] or conversation_id,
-                "agent_used": result["agent_used"],
-                "wizard_session_id": result.get("wizard_session_id"),
-                "wizard_state": result.get("wizard_state", "INACTIVE"),
-                "current_question": result.get("current_question"),
-                "human_feedback_needed": result.get("human_feedback_needed", False),
-                "human_validation_needed": result.get("human_validation_needed", False),
-                "metadata": {
-                    "next_action": result.get("next_action"),
-                    "faq_results": result.get("faq_results"),
-                    "validation_results": result.get("validation_results")
-                }
-            }
+                await self._persist_result(conversation_id, user_message, user_email, result)
+                yield "done", self._build_chat_response(result, conversation_id)
 
-        except Exception as e:
-            logger.error(f"Error in chat service: {e}")
-            return {
-                "success": False,
-                "response": "Lo siento, tuve un problema procesando tu mensaje. ¿Podrías intentar de nuevo?",
-                "error": str(e),
-                "conversation_id": conversation_id,
-                "agent_used": "error_handler"
-            }
+            except Exception as e:
+                logger.error(f"Error in chat service stream: {e}")
+                yield "done", self._error_response(e, conversation_id)
+
+    async def _prepare_conversation(
+        self,
+        user_email: Optional[str],
+        conversation_id: Optional[int]
+    ) -> tuple[Optional[int], list[dict[str, str]], Optional[dict[str, Any]]]:
+        """Obtiene la conversación, su historial y el estado del wizard"""
+
+        # Obtener o crear conversación
+        if not conversation_id and user_email:
+            conversation_id = await self._get_or_create_conversation(user_email)
+        elif not conversation_id and not user_email:
+            # Para preguntas FAQ sin email, crear conversación temporal
+            conversation_id = await self._create_temporary_conversation()
+
+        # Obtener historial de la conversación
+        chat_history = []
+        if conversation_id:
+            chat_history = await self._get_chat_history(conversation_id)
+
+        # Recuperar estado del wizard si existe
+        wizard_state = await self._get_wizard_state(conversation_id)
+        logger.info(f"Retrieved wizard state: {wizard_state}")
+
+        return conversation_id, chat_history, wizard_state
+
+    async def _persist_result(
+        self,
+        conversation_id: Optional[int],
+        user_message: str,
+        user_email: Optional[str],
+        result: dict[str, Any]
+    ):
+        """Guarda mensajes, estado del wizard y email de la conversación"""
 
+        # Guardar mensajes en la base de datos
+        if conversation_id:
+            await self._save_messages(
+                conversation_id=conversation_id,
+                user_message=user_message,
+                bot_response=result["response"],
+                agent_used=result.get("agent_used")
+            )
+
+        # Persistir estado del wizard si es necesario
+        if result.get("wizard_state") in ["ACTIVE", "COMPLETED", "PAUSED", "INACTIVE"]:
+            logger.info(f"Saving wizard state: {result.get('wizard_state')}, question: {result.get('current_question')}")
+            await self._save_wizard_state(
+                conversation_id=conversation_id,
+                wizard_session_id=result.get("wizard_session_id"),
+                wizard_state=result.get("wizard_state"),
+                current_question=result.get("current_question"),
+                wizard_responses=result.get("wizard_responses", {})
+            )
+
+        # Actualizar email de conversación si se proporcionó durante el wizard
+        if user_email and conversation_id:
+            await self._update_conversation_email(conversation_id, user_email)
+
+    @staticmethod
+    def _build_chat_response(result: dict[str, Any], conversation_id: Optional[int]) -> dict[str, Any]:
+        return {
+            "success": True,
+            "response": result["response"],
+            "conversation_id": result["conversation_id"] or conversation_id,
+            "agent_used": result["agent_used"],
+            "wizard_session_id": result.get("wizard_session_id"),
+            "wizard_state": result.get("wizard_state", "INACTIVE"),
+            "current_question": result.get("current_question"),
+            "human_feedback_needed": result.get("human_feedback_needed", False),
+            "human_validation_needed": result.get("human_validation_needed", False),
+            "metadata": {
+                "next_action": result.get("next_action"),
+                "faq_results": result.get("faq_results"),
+                "validation_results": result.get("validation_results")
+            }
+        }
+
+    @staticmethod
+    def _error_response(error: Exception, conversation_id: Optional[int]) -> dict[str, Any]:
+        return {
+            "success": False,
+            "response": "Lo siento, tuve un problema procesando tu mensaje. ¿Podrías intentar de nuevo?",
+            "error": str(error),
+            "conversation_id": conversation_id,
+            "agent_used": "error_handler"
+        }
+
+    @tracer.traced("db.get_or_create_conversation")
     async def _get_or_create_conversation(self, user_email: str) -> int:
         """Obtiene conversación existente o crea una nueva"""
         try: 
@@ -147,6 +222,7 @@ class ChatService:
             logger.error(f"Error managing conversation: {e}")
             raise
 
+    @tracer.traced("db.get_chat_history")
     async def _get_chat_history(self, conversation_id: int, limit: int = 10) -> list[dict[str, str]]:
         """Obtiene historial reciente de la conversación"""
 
@@ -154,7 +230,9 @@ class ChatService:
             stmt = select(Message).where(
                 Message.conv_id == conversation_id
             ).order_by(
-                Message.ts.desc()
+                # Pregunta y respuesta se guardan en la misma transacción con el mismo ts:
+                # el id desempata para que la ventana de contexto no las invierta
+                Message.ts.desc(), Message.id.desc()
             ).limit(limit)
 
             result = await session.execute(stmt)
@@ -166,6 +244,7 @@ class ChatService:
                 history.append({
                     "role": message.role,
                     "content": message.content,
+                    "agent": message.agent,
                     "timestamp": message.ts.isoformat()
                 })
 
@@ -177,11 +256,13 @@ class ChatService:
             logger.error(f"Error getting chat history: {e}")
             return []
 
+    @tracer.traced("db.save_messages")
     async def _save_messages(
         self,
         conversation_id: int,
         user_message: str,
-        bot_response: str
+        bot_response: str,
+        agent_used: Optional[str] = None
     ):
         """Guarda mensajes del usuario y bot en la base de datos"""
         try:
@@ -199,7 +280,8 @@ class ChatService:
                 bot_msg = Message(
                     conv_id=conversation_id,
                     role="assistant",
-                    content=bot_response
+                    content=bot_response,
+                    agent=agent_used
                 )
                 session.add(bot_msg)
 
@@ -213,6 +295,7 @@ class ChatService:
             logger.error(f"Error saving messages: {e}")
             # No re-lanzar el error para no interrumpir el flujo principal
 
+    @tracer.traced("db.update_conversation_email")
     async def _update_conversation_email(self, conversation_id: int, email: str):
         """Actualiza el email de una conversación si no lo tenía"""
 
@@ -233,6 +316,7 @@ class ChatService:
         except Exception as e:
             logger.error(f"Error updating conversation email: {e}")
 
+    @tracer.traced("db.get_conversation_info")
     async def get_conversation_info(self, conversation_id: int) -> Optional[dict[str, Any]]:
         """Obtiene información de una conversación"""
 
@@ -258,6 +342,7 @@ class ChatService:
             logger.error(f"Error getting conversation info: {e}")
             return None
 
+    @tracer.traced("db.create_temporary_conversation")
     async def _create_temporary_conversation(self) -> int:
         """Crea una conversación temporal para preguntas FAQ sin email"""
 
@@ -282,6 +367,7 @@ class ChatService:
             # Si falla, devolver un ID temporal negativo para indicar que es temporal
             return -1
 
+    @tracer.traced("db.get_wizard_state")
     async def _get_wizard_state(self, conversation_id: int) -> Optional[Dict[str, Any]]:
         """Recupera el estado del wizard desde la base de datos"""
         try:
@@ -329,6 +415,7 @@ class ChatService:
         
         return None
 
+    @tracer.traced("db.save_wizard_state")
     async def _save_wizard_state(
         self,
         conversation_id: int,
@@ -0,0 +1,107 @@
+"""
+Backends de embeddings intercambiables: OpenAI (remoto) o modelo local en CPU
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Protocol
+
+from ..config.embeddings import EMBEDDING_BACKEND, EMBEDDING_DIMENSION
+from .llm_gateway import llm_gateway
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBackend(Protocol):
+    """Interfaz común de los backends de embeddings"""
+
+    # Identificador guardado en faq_embeddings.embedding_model y en las claves de cache
+    model: str
+    dimension: int
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        ...
+
+
+class OpenAIEmbeddingBackend:
+    """Embeddings vía la API de OpenAI"""
+
+    def __init__(self, model: str, dimension: int):
+        self.llm = llm_gateway
+        self.model = model
+        self.dimension = dimension
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        response = await self.llm.embeddings("embeddings", model=self.model, input=texts)
+        return [data.embedding for data in response.data]
+
+
+class LocalEmbeddingBackend:
+    """
+    Embeddings con un modelo sentence-transformers ejecutado en CPU.
+    Requiere la dependencia opcional `sentence-transformers`.
+    """
+
+    def __init__(self, model_name: str, dimension: int, max_workers: int = 2):
+        self.model_name = model_name
+        self.model = f"local:{model_name}"
+        self.dimension = dimension
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="local-embeddings")
+        self._encoder = None
+
+    def _load(self):
+        if self._encoder is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise ImportError(
+                    "EMBEDDING_BACKEND=local requires the 'sentence-transformers' package"
+                ) from e
+
+            encoder = SentenceTransformer(self.model_name, device="cpu")
+            model_dimension = encoder.get_sentence_embedding_dimension()
+            if model_dimension != self.dimension:
+                raise ValueError(
+                    f"Local model {self.model_name} produces {model_dimension}-d "
+                    f"embeddings but EMBEDDING_DIMENSION={self.dimension}")
+            self._encoder = encoder
+            logger.info(f"Local embedding model loaded: {self.model_name}")
+        return self._encoder
+
+    def _encode(self, texts: list[str]) -> list[list[float]]:
+        vectors = self._load().encode(
+            texts, normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.tolist()
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._encode, texts)
+
+    def warm_up(self) -> None:
+        """Carga el modelo por adelantado (evita la latencia en el primer request)"""
+        self._load()
+
+
+def create_embedding_backend_from_env(name: Optional[str] = None) -> EmbeddingBackend:
+    """Crea el backend según EMBEDDING_BACKEND (openai por defecto)"""
+    name = (name or EMBEDDING_BACKEND).lower()
+
+    if name == "local":
+        return LocalEmbeddingBackend(
+            model_name=os.getenv(
+                "LOCAL_EMBEDDING_MODEL",
+                "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"),
+            dimension=EMBEDDING_DIMENSION,
+            max_workers=int(os.getenv("LOCAL_EMBEDDING_WORKERS", "2"))
+        )
+
+    if name != "openai":
+        logger.warning(f"Unknown EMBEDDING_BACKEND '{name}', using openai")
+
+    return OpenAIEmbeddingBackend(
+        model=os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small"),
+        dimension=EMBEDDING_DIMENSION
+    )
@@ -0,0 +1,99 @@
+"""
+Micro-batching de embeddings: agrupa llamadas concurrentes en un único request
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+BatchFunction = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+
+class EmbeddingMicroBatcher:
+    """Junta textos durante una ventana corta y los embebe en un solo batch"""
+
+    def __init__(
+            self,
+            batch_fn: BatchFunction,
+            window_seconds: float = 0.005,
+            max_batch_size: int = 64
+    ):
+        self.batch_fn = batch_fn
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._pending: dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: set[asyncio.Task] = set()
+        self.requests = 0
+        self.deduplicated = 0
+        self.batches = 0
+        self.largest_batch = 0
+
+    async def submit(self, text: str) -> list[float]:
+        """Encola un texto y espera su embedding (textos idénticos comparten request)"""
+        self.requests += 1
+        future = self._pending.get(text)
+        if future is not None:
+            self.deduplicated += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[text] = future
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window_seconds, self._flush)
+
+        # shield: si un llamador se cancela, los demás siguen esperando el resultado
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: dict[str, asyncio.Future]) -> None:
+        texts = list(batch)
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(texts))
+
+        try:
+            embeddings = await self.batch_fn(texts)
+            if len(embeddings) != len(texts):
+                # zip dejaría futuros sin resolver y sus llamadores esperando para siempre
+                raise RuntimeError(
+                    f"Embedding batch returned {len(embeddings)} results for {len(texts)} texts")
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for text, embedding in zip(texts, embeddings):
+            future = batch[text]
+            if not future.done():
+                future.set_result(embedding)
+
+    def get_stats(self) -> dict:
+        """Métricas del batcher"""
+        return {
+            "window_ms": self.window_seconds * 1000,
+            "max_batch_size": self.max_batch_size,
+            "requests": self.requests,
+            "deduplicated": self.deduplicated,
+            "batches": self.batches,
+            "largest_batch": self.largest_batch,
+            "avg_batch_size": (self.requests - self.deduplicated) / self.batches
+            if self.batches else 0.0
+        }
@@ -0,0 +1,269 @@
+"""
+Cache de embeddings de consultas con eviction LRU/TTL y backend compartido opcional
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from array import array
+from collections import OrderedDict
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Protocol
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from ..db.config.database import SessionLocal
+from ..db.models import EmbeddingCacheEntry
+from .text_normalization import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCacheBackend(Protocol):
+    """Backend compartido entre réplicas para entradas del cache"""
+
+    async def get(self, key: str, ttl_seconds: float) -> Optional[list[float]]:
+        ...
+
+    async def set(self, key: str, model: str, embedding: list[float]) -> None:
+        ...
+
+    async def delete_expired(self, ttl_seconds: float) -> int:
+        """Elimina las entradas vencidas; devuelve cuántas borró"""
+        ...
+
+
+class SQLiteEmbeddingCacheBackend:
+    """Backend en un archivo SQLite (útil con un volumen compartido)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._initialized:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache ("
+                "cache_key TEXT PRIMARY KEY, model TEXT NOT NULL, "
+                "embedding BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_embedding_cache_created_at "
+                "ON embedding_cache (created_at)"
+            )
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def _get_sync(self, key: str, ttl_seconds: float) -> Optional[list[float]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT embedding FROM embedding_cache "
+                "WHERE cache_key = ? AND created_at >= ?",
+                (key, time.time() - ttl_seconds)
+            ).fetchone()
+        if row is None:
+            return None
+        values = array("d")
+        values.frombytes(row[0])
+        return values.tolist()
+
+    def _set_sync(self, key: str, model: str, embedding: list[float]) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO embedding_cache "
+                "(cache_key, model, embedding, created_at) VALUES (?, ?, ?, ?)",
+                (key, model, array("d", embedding).tobytes(), time.time())
+            )
+
+    def _delete_expired_sync(self, ttl_seconds: float) -> int:
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(
+                "DELETE FROM embedding_cache WHERE created_at < ?",
+                (time.time() - ttl_seconds,)
+            ).rowcount
+
+    async def get(self, key: str, ttl_seconds: float) -> Optional[list[float]]:
+        return await asyncio.to_thread(self._get_sync, key, ttl_seconds)
+
+    async def set(self, key: str, model: str, embedding: list[float]) -> None:
+        await asyncio.to_thread(self._set_sync, key, model, embedding)
+
+    async def delete_expired(self, ttl_seconds: float) -> int:
+        return await asyncio.to_thread(self._delete_expired_sync, ttl_seconds)
+
+
+class PostgresEmbeddingCacheBackend:
+    """Backend en la tabla embedding_cache de PostgreSQL"""
+
+    async def get(self, key: str, ttl_seconds: float) -> Optional[list[float]]:
+        min_created_at = datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds)
+        async with SessionLocal() as session:
+            stmt = select(EmbeddingCacheEntry.embedding).where(
+                EmbeddingCacheEntry.cache_key == key,
+                EmbeddingCacheEntry.created_at >= min_created_at
+            )
+            embedding = (await session.execute(stmt)).scalar_one_or_none()
+        return list(embedding) if embedding is not None else None
+
+    async def set(self, key: str, model: str, embedding: list[float]) -> None:
+        stmt = insert(EmbeddingCacheEntry).values(
+            cache_key=key, model=model, embedding=embedding
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[EmbeddingCacheEntry.cache_key],
+            set_={"embedding": stmt.excluded.embedding, "created_at": func.now()}
+        )
+        async with SessionLocal() as session:
+            await session.execute(stmt)
+            await session.commit()
+
+    async def delete_expired(self, ttl_seconds: float) -> int:
+        min_created_at = datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds)
+        async with SessionLocal() as session:
+            result = await session.execute(
+                delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.created_at < min_created_at))
+            await session.commit()
+        return result.rowcount
+
+
+class EmbeddingCache:
+    """Cache LRU con TTL para embeddings, indexado por texto normalizado y modelo"""
+
+    def __init__(
+            self,
+            max_entries: int = 1000,
+            ttl_seconds: float = 86400,
+            backend: Optional[EmbeddingCacheBackend] = None,
+            cleanup_interval_seconds: float = 3600
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        # Cada cuánto se borran del backend las entradas vencidas (en una escritura)
+        self.cleanup_interval_seconds = cleanup_interval_seconds
+        self._next_cleanup = time.monotonic()
+        self._entries: OrderedDict[str, tuple[float, list[float]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.evictions = 0
+        self.expired_deleted = 0
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Clave estable a partir del modelo y el texto normalizado"""
+        normalized = normalize_text(text)
+        return hashlib.sha256(f"{model}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    async def get(self, model: str, text: str) -> Optional[list[float]]:
+        """Devuelve el embedding cacheado o None si no hay entrada vigente"""
+        key = self.make_key(model, text)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, embedding = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+            del self._entries[key]
+
+        if self.backend is not None:
+            try:
+                embedding = await self.backend.get(key, self.ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Embedding cache backend read failed: {e}")
+                embedding = None
+            if embedding is not None:
+                self._store_local(key, embedding)
+                self.hits += 1
+                self.shared_hits += 1
+                return embedding
+
+        self.misses += 1
+        return None
+
+    async def set(self, model: str, text: str, embedding: list[float]) -> None:
+        """Guarda un embedding en memoria y, si existe, en el backend compartido"""
+        key = self.make_key(model, text)
+        self._store_local(key, embedding)
+
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, model, embedding)
+            except Exception as e:
+                logger.warning(f"Embedding cache backend write failed: {e}")
+            await self._cleanup_backend()
+
+    async def _cleanup_backend(self) -> None:
+        """Borra las entradas vencidas del backend, como mucho una vez por intervalo"""
+        now = time.monotonic()
+        if now < self._next_cleanup:
+            return
+        self._next_cleanup = now + self.cleanup_interval_seconds
+        try:
+            deleted = await self.backend.delete_expired(self.ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Embedding cache backend cleanup failed: {e}")
+            return
+        self.expired_deleted += deleted
+        if deleted:
+            logger.info(f"Deleted {deleted} expired embedding cache entries")
+
+    def _store_local(self, key: str, embedding: list[float]) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Vacía el cache en memoria (no afecta al backend compartido)"""
+        self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """Métricas del cache"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "backend": type(self.backend).__name__ if self.backend else "memory",
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expired_deleted": self.expired_deleted,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+def create_embedding_cache_from_env() -> Optional[EmbeddingCache]:
+    """Crea el cache según EMBEDDING_CACHE_* o None si está deshabilitado"""
+    if os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+
+    backend_name = os.getenv("EMBEDDING_CACHE_BACKEND", "memory").lower()
+    backend: Optional[EmbeddingCacheBackend] = None
+    if backend_name == "sqlite":
+        backend = SQLiteEmbeddingCacheBackend(
+            os.getenv("EMBEDDING_CACHE_SQLITE_PATH", "embedding_cache.sqlite3"))
+    elif backend_name == "postgres":
+        backend = PostgresEmbeddingCacheBackend()
+    elif backend_name != "memory":
+        logger.warning(
+            f"Unknown EMBEDDING_CACHE_BACKEND '{backend_name}', using memory")
+
+    return EmbeddingCache(
+        max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "1000")),
+        ttl_seconds=float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "86400")),
+        backend=backend,
+        cleanup_interval_seconds=float(
+            os.getenv("EMBEDDING_CACHE_CLEANUP_INTERVAL_SECONDS", "3600"))
+    )
@@ -1,34 +1,118 @@
+import asyncio
+import hashlib
 import logging
 import os
+from collections.abc import Callable
 from typing import List, Optional
 
-import numpy as np
-from openai import AsyncOpenAI
-from sqlalchemy import select
+from sqlalchemy import func, or_, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..db.models import FAQEmbedding
+from .embedding_backends import EmbeddingBackend, create_embedding_backend_from_env
+from .embedding_batcher import EmbeddingMicroBatcher
+from .embedding_cache import create_embedding_cache_from_env
+from .faq_lexical_index import BM25FAQIndex, tokenize
+from .faq_vector_index import LocalFAQIndex
+from .tracing import tracer
 
 logger = logging.getLogger(__name__)
 
 
+def build_faq_embedding_text(question: str, answer: str) -> str:
+    """Texto que se embebe para una FAQ (pregunta y respuesta combinadas)"""
+    return f"Pregunta: {question}\nRespuesta: {answer}"
+
+
+def faq_content_hash(question: str, answer: str) -> str:
+    """Hash del contenido de una FAQ, usado para upserts idempotentes"""
+    return hashlib.sha256(
+        build_faq_embedding_text(question.strip(), answer.strip()).encode("utf-8")
+    ).hexdigest()
+
+
+def lexical_results_as_faqs(results: list[dict]) -> list[dict]:
+    """
+    Resultados BM25 con el formato de FAQ de la búsqueda. No tienen similitud coseno:
+    similarity queda en None y el puntaje BM25 crudo va en lexical_score
+    """
+    return [
+        {
+            "id": r["id"],
+            "question": r["question"],
+            "answer": r["answer"],
+            "similarity": None,
+            "lexical_score": r["lexical_score"],
+            "source": "lexical"
+        }
+        for r in results
+    ]
+
+
 class EmbeddingService:
-    """Servicio para generar y gestionar embeddings usando OpenAI"""
+    """Servicio para generar y gestionar embeddings (OpenAI o modelo local)"""
 
-    def __init__(self):
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.model = os.getenv("OPENAI_EMBEDDING_MODEL",
-                               "text-embedding-3-small")
-        self.dimension = int(os.getenv("EMBEDDING_DIMENSION", "1536"))
+    def __init__(self, backend: Optional[EmbeddingBackend] = None):
+        self.backend = backend or create_embedding_backend_from_env()
+        self.model = self.backend.model
+        self.dimension = self.backend.dimension
+        self.cache = create_embedding_cache_from_env()
+        self._corpus_listeners: list[Callable[[], None]] = []
 
-    async def generate_embedding(self, text: str) -> List[float]:
-        """Genera embedding para un texto dado"""
-        try:
-            response = await self.client.embeddings.create(
-                model=self.model,
-                input=text.strip()
+        # Micro-batching de llamadas concurrentes a generate_embedding
+        self.batcher: Optional[EmbeddingMicroBatcher] = None
+        if os.getenv("EMBEDDING_BATCHING_ENABLED", "true").lower() in ("1", "true", "yes"):
+            self.batcher = EmbeddingMicroBatcher(
+                self.generate_batch_embeddings,
+                window_seconds=float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5")) / 1000,
+                max_batch_size=int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
             )
-            return response.data[0].embedding
+
+        # Parámetros de búsqueda del índice ANN (0 = default de pgvector)
+        self.hnsw_ef_search = int(os.getenv("FAQ_HNSW_EF_SEARCH", "0"))
+        self.ivfflat_probes = int(os.getenv("FAQ_IVFFLAT_PROBES", "0"))
+
+        # Backend de búsqueda: "pgvector" (default) o "memory" (índice local)
+        self.search_backend = os.getenv("FAQ_SEARCH_BACKEND", "pgvector").lower()
+        self.local_index: Optional[LocalFAQIndex] = None
+        if self.search_backend == "memory":
+            self.local_index = LocalFAQIndex(
+                check_interval_seconds=float(
+                    os.getenv("FAQ_INDEX_CHECK_INTERVAL", "30")))
+            self.add_corpus_listener(self.local_index.mark_stale)
+
+        # Recuperación: "vector" (default) o "hybrid" (BM25 + vector con RRF)
+        self.retrieval_mode = os.getenv("FAQ_RETRIEVAL_MODE", "vector").lower()
+        self.rrf_k = int(os.getenv("FAQ_RRF_K", "60"))
+        self.lexical_fast_path = os.getenv(
+            "FAQ_LEXICAL_FAST_PATH", "true").lower() in ("1", "true", "yes")
+        self.lexical_fast_path_max_tokens = int(
+            os.getenv("FAQ_LEXICAL_FAST_PATH_MAX_TOKENS", "3"))
+        self.lexical_fast_path_min_score = float(
+            os.getenv("FAQ_LEXICAL_FAST_PATH_MIN_SCORE", "1.5"))
+        self.lexical_index: Optional[BM25FAQIndex] = None
+        if self.retrieval_mode == "hybrid":
+            self.lexical_index = BM25FAQIndex(
+                check_interval_seconds=float(
+                    os.getenv("FAQ_INDEX_CHECK_INTERVAL", "30")))
+            self.add_corpus_listener(self.lexical_index.mark_stale)
+
+    async def generate_embedding(self, text: str, use_cache: bool = True) -> list[float]:
+        """Genera embedding para un texto dado (consultando primero el cache)"""
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            cached = await self.cache.get(self.model, text)
+            if cached is not None:
+                return cached
+
+        try:
+            if self.batcher is not None:
+                embedding = await self.batcher.submit(text.strip())
+            else:
+                embedding = (await self.backend.embed([text.strip()]))[0]
+            if use_cache:
+                await self.cache.set(self.model, text, embedding)
+            return embedding
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
             raise
@@ -36,11 +120,7 @@ class EmbeddingService:
     async def generate_batch_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Genera embeddings para múltiples textos en batch"""
         try:
-            response = await self.client.embeddings.create(
-                model=self.model,
-                input=texts
-            )
-            return [data.embedding for data in response.data]
+            return await self.backend.embed(texts)
         except Exception as e:
             logger.error(f"Error generating batch embeddings: {e}")
             raise
@@ -50,42 +130,154 @@ class EmbeddingService:
             query: str,
             session: AsyncSession,
             limit: int = 5,
-            similarity_threshold: float = 0.7
+            similarity_threshold: float = 0.7,
+            query_embedding: Optional[list[float]] = None
     ) -> List[dict]:
         """Busca FAQs similares usando similitud de coseno"""
         try:
-            # Generar embedding para la query
-            query_embedding = await self.generate_embedding(query)
-
-            # Búsqueda vectorial en PostgreSQL
-            stmt = select(FAQEmbedding).order_by(
-                FAQEmbedding.embedding.cosine_distance(query_embedding)
-            ).limit(limit)
-
-            result = await session.execute(stmt)
-            faqs = result.scalars().all()
-
-            # Calcular similitudes y filtrar por threshold
-            similar_faqs = []
-            for faq in faqs:
-                # Calcular similitud de coseno
-                similarity = self._cosine_similarity(
-                    query_embedding, faq.embedding)
-
-                if similarity >= similarity_threshold:
-                    similar_faqs.append({
-                        "id": faq.id,
-                        "question": faq.question,
-                        "answer": faq.answer,
-                        "similarity": similarity
-                    })
-
-            return similar_faqs
+            # Generar embedding para la query si no viene precalculado
+            if query_embedding is None:
+                query_embedding = await self.generate_embedding(query)
+
+            return await self._search_by_embedding(
+                query_embedding, session, limit, similarity_threshold)
 
         except Exception as e:
             logger.error(f"Error searching similar FAQs: {e}")
             return []
 
+    @tracer.traced("faq.vector_search")
+    async def _search_by_embedding(
+            self,
+            query_embedding: list[float],
+            session: AsyncSession,
+            limit: int,
+            similarity_threshold: float
+    ) -> list[dict]:
+        """Búsqueda por similitud de coseno (índice local o pgvector)"""
+        # Índice local en memoria, con pgvector como fallback
+        if self.local_index is not None:
+            try:
+                await self.local_index.ensure_fresh(session, self)
+                if self.local_index.is_ready:
+                    return self.local_index.search(
+                        query_embedding, limit, similarity_threshold)
+            except Exception as e:
+                logger.warning(
+                    f"Local FAQ index unavailable, falling back to pgvector: {e}")
+
+        await self._apply_ann_search_settings(session)
+
+        # Búsqueda vectorial en PostgreSQL: solo columnas necesarias y la
+        # distancia calculada por pgvector (sin hidratar los embeddings)
+        distance = FAQEmbedding.embedding.cosine_distance(
+            query_embedding).label("distance")
+        stmt = select(
+            FAQEmbedding.id,
+            FAQEmbedding.question,
+            FAQEmbedding.answer,
+            distance
+        ).where(
+            distance <= 1 - similarity_threshold
+        ).order_by(distance).limit(limit)
+
+        result = await session.execute(stmt)
+
+        return [
+            {
+                "id": row.id,
+                "question": row.question,
+                "answer": row.answer,
+                "similarity": 1 - float(row.distance)
+            }
+            for row in result
+        ]
+
+    async def hybrid_search(
+            self,
+            query: str,
+            session: AsyncSession,
+            limit: int = 5,
+            similarity_threshold: float = 0.7
+    ) -> tuple[list[dict], Optional[list[float]]]:
+        """
+        Búsqueda híbrida BM25 + vector fusionada con reciprocal-rank fusion.
+        Returns: (faqs, query_embedding) — el embedding es None si respondió
+        el camino léxico rápido sin llamar a la API de embeddings
+        """
+        lexical_results = await self.lexical_search(query, session, limit * 2)
+
+        # Camino rápido: consultas cortas cuyos términos aparecen todos en la mejor FAQ,
+        # solo si el match BM25 es fuerte (términos frecuentes como "ithaka" no alcanzan)
+        if (self.lexical_fast_path and lexical_results
+                and lexical_results[0]["coverage"] == 1.0
+                and lexical_results[0]["lexical_score"] >= self.lexical_fast_path_min_score
+                and len(tokenize(query)) <= self.lexical_fast_path_max_tokens):
+            return lexical_results_as_faqs(
+                [r for r in lexical_results[:limit] if r["coverage"] == 1.0]), None
+
+        query_embedding = await self.generate_embedding(query)
+        vector_results = await self.search_similar_faqs(
+            query=query,
+            session=session,
+            limit=limit * 2,
+            similarity_threshold=similarity_threshold,
+            query_embedding=query_embedding
+        )
+
+        fused: dict[int, dict] = {}
+        for source, results in (("vector", vector_results), ("lexical", lexical_results)):
+            for rank, r in enumerate(results, 1):
+                entry = fused.setdefault(r["id"], {
+                    "id": r["id"],
+                    "question": r["question"],
+                    "answer": r["answer"],
+                    # Las FAQs solo léxicas no pasaron el filtro vectorial:
+                    # se reportan en el umbral mínimo
+                    "similarity": similarity_threshold,
+                    "rrf_score": 0.0,
+                    "source": source
+                })
+                entry["rrf_score"] += 1 / (self.rrf_k + rank)
+                if source == "vector":
+                    entry["similarity"] = r["similarity"]
+                elif entry["source"] != "lexical":
+                    entry["source"] = "hybrid"
+
+        ranked = sorted(fused.values(), key=lambda r: r["rrf_score"], reverse=True)
+        return ranked[:limit], query_embedding
+
+    async def lexical_search(self, query: str, session: AsyncSession, limit: int = 5) -> list[dict]:
+        """
+        Búsqueda BM25 (sin llamar a la API de embeddings); el índice se crea al primer
+        uso si el modo de recuperación no es híbrido. Devuelve [] si falla.
+        """
+        if self.lexical_index is None:
+            self.lexical_index = BM25FAQIndex(
+                check_interval_seconds=float(
+                    os.getenv("FAQ_INDEX_CHECK_INTERVAL", "30")))
+            self.add_corpus_listener(self.lexical_index.mark_stale)
+
+        try:
+            with tracer.span("faq.lexical_search"):
+                await self.lexical_index.ensure_fresh(session, self)
+                return self.lexical_index.search(query, limit)
+        except Exception as e:
+            logger.warning(f"Lexical FAQ search failed: {e}")
+            return []
+
+    async def _apply_ann_search_settings(self, session: AsyncSession) -> None:
+        """Ajusta ef_search/probes del índice ANN para la transacción actual"""
+        if session.bind.dialect.name != "postgresql":
+            return
+        # SET LOCAL no acepta parámetros bind; los valores son enteros validados
+        if self.hnsw_ef_search > 0:
+            await session.execute(
+                text(f"SET LOCAL hnsw.ef_search = {int(self.hnsw_ef_search)}"))
+        if self.ivfflat_probes > 0:
+            await session.execute(
+                text(f"SET LOCAL ivfflat.probes = {int(self.ivfflat_probes)}"))
+
     async def add_faq_embedding(
             self,
             question: str,
@@ -94,15 +286,39 @@ class EmbeddingService:
     ) -> Optional[FAQEmbedding]:
         """Agrega una nueva FAQ con su embedding"""
         try:
+            # Si la FAQ ya existe con el mismo contenido, no re-embeber
+            content_hash = faq_content_hash(question, answer)
+            existing = (await session.execute(
+                select(FAQEmbedding).where(FAQEmbedding.content_hash == content_hash)
+            )).scalar_one_or_none()
+            if (existing is not None
+                    and existing.embedding_model == self.model
+                    and existing.embedding_dimension == self.dimension):
+                logger.info(f"FAQ already exists with ID: {existing.id}")
+                return existing
+
             # Combinar pregunta y respuesta para el embedding
-            combined_text = f"Pregunta: {question}\nRespuesta: {answer}"
-            embedding = await self.generate_embedding(combined_text)
+            combined_text = build_faq_embedding_text(question, answer)
+            embedding = await self.generate_embedding(combined_text, use_cache=False)
+
+            # Re-embeber la FAQ existente generada con otro modelo/dimensión
+            if existing is not None:
+                existing.embedding = embedding
+                existing.embedding_model = self.model
+                existing.embedding_dimension = self.dimension
+                await session.commit()
+                logger.info(f"FAQ embedding refreshed for ID: {existing.id}")
+                self.notify_corpus_changed()
+                return existing
 
             # Crear nuevo registro
             faq_embedding = FAQEmbedding(
                 question=question,
                 answer=answer,
-                embedding=embedding
+                embedding=embedding,
+                content_hash=content_hash,
+                embedding_model=self.model,
+                embedding_dimension=self.dimension
             )
 
             session.add(faq_embedding)
@@ -110,6 +326,7 @@ class EmbeddingService:
             await session.refresh(faq_embedding)
 
             logger.info(f"FAQ embedding added with ID: {faq_embedding.id}")
+            self.notify_corpus_changed()
             return faq_embedding
 
         except Exception as e:
@@ -117,23 +334,65 @@ class EmbeddingService:
             await session.rollback()
             return None
 
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calcula similitud de coseno entre dos vectores"""
-        try:
-            vec1_np = np.array(vec1)
-            vec2_np = np.array(vec2)
+    def stale_embedding_filter(self):
+        """Condición SQL para FAQs embebidas con otro modelo o dimensión"""
+        return or_(
+            FAQEmbedding.embedding.is_(None),
+            FAQEmbedding.embedding_model.is_distinct_from(self.model),
+            FAQEmbedding.embedding_dimension.is_distinct_from(self.dimension)
+        )
 
-            dot_product = np.dot(vec1_np, vec2_np)
-            norm1 = np.linalg.norm(vec1_np)
-            norm2 = np.linalg.norm(vec2_np)
+    async def warm_up(self, session: AsyncSession) -> None:
+        """Precarga el modelo local y los índices locales de FAQs (si aplican)"""
+        if hasattr(self.backend, "warm_up"):
+            try:
+                await asyncio.to_thread(self.backend.warm_up)
+            except Exception as e:
+                logger.error(f"Error loading local embedding model: {e}")
 
-            if norm1 == 0 or norm2 == 0:
-                return 0.0
+        for index in (self.local_index, self.lexical_index):
+            if index is None:
+                continue
+            try:
+                await index.ensure_fresh(session, self)
+            except Exception as e:
+                logger.error(f"Error loading local FAQ index: {e}")
 
-            return dot_product / (norm1 * norm2)
-        except Exception as e:
-            logger.error(f"Error calculating cosine similarity: {e}")
-            return 0.0
+    async def get_faq_corpus_signature(self, session: AsyncSession) -> tuple:
+        """Firma barata de la tabla faq_embeddings para detectar cambios"""
+        stmt = select(
+            func.count(FAQEmbedding.id),
+            func.max(FAQEmbedding.id),
+            func.max(FAQEmbedding.created_at),
+            # Las filas re-embebidas o actualizadas en su lugar no cambian id ni created_at
+            func.max(FAQEmbedding.updated_at)
+        )
+        result = await session.execute(stmt)
+        return tuple(result.one())
+
+    def add_corpus_listener(self, listener: Callable[[], None]) -> None:
+        """Registra un callback a invocar cuando cambian las FAQs"""
+        self._corpus_listeners.append(listener)
+
+    def notify_corpus_changed(self) -> None:
+        """Notifica a los listeners que las FAQs cambiaron en este proceso"""
+        for listener in self._corpus_listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Error notifying FAQ corpus change: {e}")
+
+    def get_cache_stats(self) -> dict:
+        """Métricas del cache de embeddings de consultas"""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.get_stats()}
+
+    def get_batcher_stats(self) -> dict:
+        """Métricas del micro-batching de embeddings"""
+        if self.batcher is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.batcher.get_stats()}
 
 
 # Instancia global del servicio
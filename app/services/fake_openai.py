@@ -0,0 +1,198 @@
+"""
+Servidor falso compatible con la API de OpenAI (chat.completions y embeddings)
+para pruebas de carga y CI sin red: respuestas deterministas y latencia configurable
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+from typing import Any, Optional
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from ..config.embeddings import EMBEDDING_DIMENSION
+from .faq_lexical_index import tokenize
+
+_WORDS = (
+    "Ithaka acompaña emprendedores de la comunidad UCU con cursos, mentorías, "
+    "programas como Fellows y el minor, además de la incubadora de startups. "
+    "Todas las actividades son gratuitas y podés consultarnos por más información."
+).split()
+
+
+class LatencyModel:
+    """Latencias simuladas: fixed, uniform o lognormal (en milisegundos)"""
+
+    def __init__(
+            self,
+            distribution: str = "fixed",
+            mean_ms: float = 0.0,
+            jitter_ms: float = 0.0,
+            token_ms: float = 0.0,
+            seed: Optional[int] = None
+    ):
+        self.distribution = distribution
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self.token_ms = token_ms
+        self._random = random.Random(seed)
+
+    def sample_seconds(self) -> float:
+        if self.mean_ms <= 0:
+            return 0.0
+        if self.distribution == "uniform":
+            value = self._random.uniform(self.mean_ms - self.jitter_ms, self.mean_ms + self.jitter_ms)
+        elif self.distribution == "lognormal":
+            # jitter_ms se interpreta como desvío estándar de la distribución
+            sigma = np.sqrt(np.log(1 + (self.jitter_ms / self.mean_ms) ** 2))
+            mu = np.log(self.mean_ms) - sigma ** 2 / 2
+            value = self._random.lognormvariate(mu, sigma)
+        else:
+            value = self.mean_ms
+        return max(value, 0.0) / 1000
+
+
+def _seed_for(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+
+
+def fake_embedding(text: str, dimension: int) -> list[float]:
+    """
+    Suma de vectores pseudoaleatorios por token: textos con palabras en común
+    quedan cerca, así la búsqueda semántica se comporta de forma realista
+    """
+    vector = np.zeros(dimension, dtype=np.float64)
+    for token in tokenize(text) or [text]:
+        vector += np.random.default_rng(_seed_for(token)).standard_normal(dimension)
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+def fake_completion_text(messages: list[dict[str, Any]], max_tokens: Optional[int]) -> str:
+    """Texto determinista según el último mensaje del usuario"""
+    prompt = "\n".join(str(m.get("content", "")) for m in messages)
+
+    # Prompts con formato de salida estricto usados por los agentes
+    if "Responde ÚNICAMENTE con una palabra" in prompt:
+        return "faq"
+    if '"route"' in prompt and '"answer"' in prompt:
+        return json.dumps({"route": "faq", "answer": "Respuesta simulada a partir de las FAQs."},
+                          ensure_ascii=False)
+    if "JSON" in prompt and "creatividad" in prompt:
+        return json.dumps({"creatividad": 70, "claridad": 70, "compromiso": 70,
+                           "score_total": 70, "analisis": "Evaluación simulada."})
+
+    user_content = next(
+        (str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), "")
+    rng = random.Random(_seed_for(user_content))
+    length = min(max_tokens or 60, 60)
+    return " ".join(rng.choice(_WORDS) for _ in range(max(length // 2, 1)))
+
+
+def _usage(prompt: str, completion: str = "") -> dict[str, int]:
+    prompt_tokens = max(len(prompt) // 4, 1)
+    completion_tokens = len(completion) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+def create_fake_openai_app(
+        latency: Optional[LatencyModel] = None,
+        embedding_dimension: int = EMBEDDING_DIMENSION
+) -> FastAPI:
+    """App FastAPI que imita /v1/chat/completions y /v1/embeddings"""
+    latency = latency or LatencyModel()
+    app = FastAPI(title="Fake OpenAI")
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        await asyncio.sleep(latency.sample_seconds())
+
+        messages = body.get("messages", [])
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        content = fake_completion_text(messages, body.get("max_tokens"))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "fake")
+
+        if not body.get("stream"):
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content}
+                }],
+                "usage": _usage(prompt, content)
+            })
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        async def event_stream():
+            base = {"id": completion_id, "object": "chat.completion.chunk",
+                    "created": created, "model": model}
+            tokens = content.split(" ")
+            for i, token in enumerate(tokens):
+                piece = token if i == 0 else f" {token}"
+                chunk = {**base, "choices": [{"index": 0, "delta": {"content": piece},
+                                              "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                if latency.token_ms:
+                    await asyncio.sleep(latency.token_ms / 1000)
+            yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})}\n\n"
+            if include_usage:
+                yield f"data: {json.dumps({**base, 'choices': [], 'usage': _usage(prompt, content)})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        await asyncio.sleep(latency.sample_seconds())
+
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dimension = body.get("dimensions") or embedding_dimension
+        return JSONResponse({
+            "object": "list",
+            "model": body.get("model", "fake"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(text, dimension)}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": _usage(" ".join(inputs))
+        })
+
+    return app
+
+
+def create_fake_openai_app_from_env() -> FastAPI:
+    """Crea la app según FAKE_OPENAI_*"""
+    seed = os.getenv("FAKE_OPENAI_SEED")
+    return create_fake_openai_app(
+        latency=LatencyModel(
+            distribution=os.getenv("FAKE_OPENAI_LATENCY_DISTRIBUTION", "fixed"),
+            mean_ms=float(os.getenv("FAKE_OPENAI_LATENCY_MS", "0")),
+            jitter_ms=float(os.getenv("FAKE_OPENAI_LATENCY_JITTER_MS", "0")),
+            token_ms=float(os.getenv("FAKE_OPENAI_TOKEN_LATENCY_MS", "0")),
+            seed=int(seed) if seed else None
+        )
+    )
@@ -0,0 +1,194 @@
+"""
+Armado compacto del contexto de FAQs para el LLM: deduplica respuestas casi
+idénticas, descarta resultados poco relevantes y respeta un presupuesto de tokens
+"""
+
+import logging
+import os
+import threading
+from collections.abc import Sequence
+from typing import Any, Optional
+
+from .faq_lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Aproximación usada si tiktoken no está disponible
+_CHARS_PER_TOKEN = 4
+
+
+class TokenCounter:
+    """
+    Cuenta y trunca tokens con tiktoken (o una aproximación por caracteres).
+    El vocabulario se carga en un hilo aparte (puede requerir descargarlo): mientras
+    no está listo se usa la aproximación, nunca se bloquea el event loop.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self._encoding = None
+        self._loaded = False
+        self._loading = False
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """Carga el vocabulario de tiktoken (bloqueante; idempotente)"""
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                import tiktoken
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logger.warning(f"tiktoken unavailable, approximating token counts: {e}")
+            finally:
+                self._loaded = True
+
+    def warm_up(self) -> None:
+        """Inicia la carga en segundo plano sin bloquear a quien llama"""
+        if self._loaded or self._loading:
+            return
+        self._loading = True
+        threading.Thread(target=self.load, name="tiktoken-warm-up", daemon=True).start()
+
+    def _get_encoding(self):
+        if not self._loaded:
+            self.warm_up()
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        encoding = self._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text))
+        return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        encoding = self._get_encoding()
+        if encoding is not None:
+            tokens = encoding.encode(text)
+            if len(tokens) <= max_tokens:
+                return text
+            return encoding.decode(tokens[:max_tokens]).rstrip() + "…"
+        max_chars = max_tokens * _CHARS_PER_TOKEN
+        return text if len(text) <= max_chars else text[:max_chars].rstrip() + "…"
+
+
+class FAQContextBuilder:
+    """Selecciona y formatea las FAQs que entran en el prompt"""
+
+    def __init__(
+            self,
+            model: str,
+            max_tokens: int = 600,
+            max_similarity_gap: float = 0.2,
+            duplicate_threshold: float = 0.85,
+            min_truncated_tokens: int = 40
+    ):
+        self.counter = TokenCounter(model)
+        self.max_tokens = max_tokens
+        self.max_similarity_gap = max_similarity_gap
+        self.duplicate_threshold = duplicate_threshold
+        self.min_truncated_tokens = min_truncated_tokens
+        self.builds = 0
+        self.dropped_low_relevance = 0
+        self.dropped_duplicates = 0
+        self.truncated = 0
+        self.dropped_over_budget = 0
+        self.context_tokens = 0
+
+    def warm_up(self) -> None:
+        """Inicia la carga del tokenizer (llamar al arrancar la app)"""
+        self.counter.warm_up()
+
+    def select(self, similar_faqs: Sequence[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Filtra por distancia a la mejor similitud y elimina respuestas duplicadas"""
+        if not similar_faqs:
+            return []
+
+        # Los resultados solo léxicos no tienen similitud coseno comparable
+        vector_scores = [faq["similarity"] for faq in similar_faqs
+                         if faq.get("source") != "lexical"]
+        floor = max(vector_scores) - self.max_similarity_gap if vector_scores else None
+
+        selected: list[dict[str, Any]] = []
+        selected_terms: list[set[str]] = []
+        for faq in similar_faqs:
+            if (floor is not None and faq.get("source") != "lexical"
+                    and faq["similarity"] < floor and selected):
+                self.dropped_low_relevance += 1
+                continue
+
+            terms = set(tokenize(faq["answer"]))
+            if any(self._jaccard(terms, other) >= self.duplicate_threshold
+                   for other in selected_terms):
+                self.dropped_duplicates += 1
+                continue
+
+            selected.append(faq)
+            selected_terms.append(terms)
+
+        return selected
+
+    @staticmethod
+    def _jaccard(a: set[str], b: set[str]) -> float:
+        if not a or not b:
+            return 1.0 if a == b else 0.0
+        return len(a & b) / len(a | b)
+
+    def build(self, similar_faqs: Sequence[dict[str, Any]]) -> str:
+        """Devuelve el bloque de contexto dentro del presupuesto de tokens"""
+        self.builds += 1
+        selected = self.select(similar_faqs)
+        blocks: list[str] = []
+        used = 0
+
+        for faq in selected:
+            header = f"FAQ {len(blocks) + 1}:\nPregunta: {faq['question']}\nRespuesta: "
+            answer = faq["answer"].strip()
+            header_tokens = self.counter.count(header)
+            answer_tokens = self.counter.count(answer)
+
+            if used + header_tokens + answer_tokens <= self.max_tokens:
+                blocks.append(header + answer)
+                used += header_tokens + answer_tokens
+                continue
+
+            # La primera FAQ siempre entra (truncada); las demás solo si vale la pena
+            answer_budget = self.max_tokens - used - header_tokens
+            if not blocks or answer_budget >= self.min_truncated_tokens:
+                answer = self.counter.truncate(answer, max(answer_budget, 1))
+                blocks.append(header + answer)
+                used += header_tokens + self.counter.count(answer)
+                self.truncated += 1
+            break
+
+        self.dropped_over_budget += len(selected) - len(blocks)
+        self.context_tokens += used
+        return "\n\n".join(blocks)
+
+    def get_stats(self) -> dict:
+        """Métricas del armado de contexto"""
+        return {
+            "max_tokens": self.max_tokens,
+            "builds": self.builds,
+            "avg_context_tokens": self.context_tokens / self.builds if self.builds else 0.0,
+            "dropped_low_relevance": self.dropped_low_relevance,
+            "dropped_duplicates": self.dropped_duplicates,
+            "dropped_over_budget": self.dropped_over_budget,
+            "truncated": self.truncated
+        }
+
+
+def create_context_builder_from_env(model: Optional[str] = None) -> FAQContextBuilder:
+    """Crea el builder según FAQ_CONTEXT_*"""
+    return FAQContextBuilder(
+        model=model or os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        max_tokens=int(os.getenv("FAQ_CONTEXT_MAX_TOKENS", "600")),
+        max_similarity_gap=float(os.getenv("FAQ_CONTEXT_MAX_SIMILARITY_GAP", "0.2")),
+        duplicate_threshold=float(os.getenv("FAQ_CONTEXT_DUPLICATE_THRESHOLD", "0.85"))
+    )
@@ -0,0 +1,151 @@
+"""
+Respuestas precalculadas para consultas FAQ sin resultados, elegidas por tema
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from .text_matching import KeywordMatcher
+from .text_normalization import normalize_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FALLBACKS_PATH = Path(__file__).resolve().parents[2] / "config" / "faq_fallback_responses.json"
+
+GENERAL_TOPIC = "general"
+
+# Temas con sus palabras clave y una respuesta por defecto (se puede regenerar
+# offline con scripts/generate_fallback_responses.py)
+FALLBACK_TOPICS: dict[str, dict] = {
+    "fellows": {
+        "keywords": ["fellows", "fellow", "beca", "stanford", "twente", "paises bajos"],
+        "response": """
+No encontré una respuesta exacta a tu consulta, pero te cuento sobre el **Programa Fellows**:
+
+Es una beca completa para desarrollar habilidades de intraemprendimiento, con formación online de Stanford/Twente. Cada año seleccionamos 4 estudiantes UCU; la convocatoria suele abrir entre marzo y abril.
+
+Más información: https://programa-university-inno-k2jjjij.gamma.site/
+
+¿Querés saber algo más específico sobre el programa?
+"""
+    },
+    "minor": {
+        "keywords": ["minor", "especializacion", "semestre"],
+        "response": """
+No encontré una respuesta exacta, pero quizás te interese el **Minor de Innovación y Emprendimiento**: un programa de un semestre para especializarte en creatividad, innovación y mentalidad emprendedora.
+
+Más información: https://minor-innovacion-emprend-6ucsomp.gamma.site/
+
+¿Hay algo puntual del minor que quieras consultar?
+"""
+    },
+    "cursos": {
+        "keywords": ["curso", "cursos", "electiva", "electivas", "electivo", "capacitacion",
+                     "taller", "formacion", "creditos"],
+        "response": """
+No encontré información específica sobre eso, pero en Ithaka ofrecemos **cursos electivos** gratuitos para estudiantes UCU, el minor de innovación y emprendimiento y capacitaciones abiertas.
+
+Listado de cursos electivos: https://bit.ly/ElectivasIthaka
+
+¿Buscás algún curso en particular?
+"""
+    },
+    "emprendimiento": {
+        "keywords": ["emprender", "emprendimiento", "startup", "incubadora", "negocio",
+                     "idea", "proyecto", "mentoria", "mentor", "postular", "postulacion"],
+        "response": """
+No tengo una respuesta exacta, pero si estás pensando en **emprender**, Ithaka te puede acompañar con la incubadora de startups, mentorías y capacitaciones para validar y hacer crecer tu idea.
+
+Si tenés una idea o proyecto, podés contarme y te guío para postularla.
+
+¿Querés empezar la postulación o tenés otra consulta?
+"""
+    },
+    "costos": {
+        "keywords": ["costo", "costos", "precio", "pagar", "gratis", "gratuito", "arancel", "cuesta"],
+        "response": """
+No encontré esa consulta puntual, pero te cuento que **todas las actividades de Ithaka son gratuitas**: cursos, mentorías, programas e incubadora. Para los cursos electivos solo necesitás créditos disponibles si sos estudiante UCU.
+
+¿Hay algo más en lo que pueda ayudarte?
+"""
+    },
+    "contacto": {
+        "keywords": ["contacto", "contactar", "email", "correo", "telefono", "redes",
+                     "instagram", "linkedin", "twitter", "newsletter", "campus", "donde", "ubicacion"],
+        "response": """
+No encontré esa información específica. Podés contactar al equipo de Ithaka y enterarte de convocatorias y eventos a través de nuestras redes (Instagram, Twitter y LinkedIn) o suscribiéndote al newsletter. Tenemos presencia en los campus de Montevideo, Maldonado y Salto.
+
+¿Te ayudo con algo más?
+"""
+    },
+    GENERAL_TOPIC: {
+        "keywords": [],
+        "response": """
+No encontré información específica sobre tu consulta en nuestras FAQs.
+
+Te sugiero:
+• Contactar directamente al equipo de Ithaka
+• Revisar nuestro sitio web oficial
+• Seguirnos en redes sociales para estar al día
+
+¿Hay algo más sobre emprendimiento o nuestros programas en lo que pueda ayudarte?
+"""
+    }
+}
+
+
+class FallbackResponseLibrary:
+    """Detecta el tema de la consulta y devuelve la respuesta precalculada"""
+
+    def __init__(self, topics: dict[str, dict] = FALLBACK_TOPICS, overrides_path: Optional[Path] = None):
+        self.responses = {topic: data["response"] for topic, data in topics.items()}
+        # Palabras clave compiladas una sola vez
+        self.keywords = {
+            topic: KeywordMatcher(data["keywords"])
+            for topic, data in topics.items()
+        }
+        if overrides_path is not None:
+            self._load_overrides(overrides_path)
+        self.served = {topic: 0 for topic in self.responses}
+
+    def _load_overrides(self, path: Path) -> None:
+        if not path.exists():
+            return
+        try:
+            overrides = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load fallback responses from {path}: {e}")
+            return
+
+        for topic, response in overrides.items():
+            if topic in self.responses and response:
+                self.responses[topic] = response
+        logger.info(f"Loaded {len(overrides)} precomputed fallback responses from {path}")
+
+    def detect_topic(self, text: str) -> str:
+        """Tema con más palabras clave presentes (general si no hay ninguna)"""
+        normalized = normalize_text(text)
+        best_topic, best_hits = GENERAL_TOPIC, 0
+        for topic, matcher in self.keywords.items():
+            hits = len(matcher.find_all(normalized, normalized=True))
+            if hits > best_hits:
+                best_topic, best_hits = topic, hits
+        return best_topic
+
+    def get_response(self, text: str) -> str:
+        topic = self.detect_topic(text)
+        self.served[topic] += 1
+        return self.responses[topic]
+
+    def get_stats(self) -> dict:
+        """Respuestas servidas por tema"""
+        return {"served": dict(self.served)}
+
+
+def create_fallback_library_from_env() -> FallbackResponseLibrary:
+    """Crea la librería con las respuestas de FAQ_FALLBACK_RESPONSES_PATH (si existe)"""
+    path = os.getenv("FAQ_FALLBACK_RESPONSES_PATH")
+    return FallbackResponseLibrary(overrides_path=Path(path) if path else DEFAULT_FALLBACKS_PATH)
@@ -0,0 +1,224 @@
+"""
+Pipeline de ingesta masiva de FAQs: embeddings en batch con concurrencia acotada
+e inserción multi-fila idempotente por hash de contenido
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import delete, func, not_, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.models import FAQEmbedding
+from .embedding_service import (
+    EmbeddingService,
+    build_faq_embedding_text,
+    embedding_service,
+    faq_content_hash,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class FAQIngestionPipeline:
+    """Carga FAQs en bloque saltando las que ya existen con el mismo contenido"""
+
+    def __init__(
+            self,
+            service: EmbeddingService = embedding_service,
+            batch_size: int = None,
+            max_concurrency: int = None
+    ):
+        self.service = service
+        # La API de embeddings acepta hasta 2048 inputs por request
+        self.batch_size = min(
+            batch_size or int(os.getenv("FAQ_INGEST_BATCH_SIZE", "100")), 2048)
+        self.max_concurrency = max_concurrency or int(
+            os.getenv("FAQ_INGEST_CONCURRENCY", "4"))
+
+    async def ingest(
+            self,
+            faqs: Iterable[dict[str, str]],
+            session: AsyncSession,
+            full_sync: bool = False
+    ) -> dict[str, Any]:
+        """
+        Embebe e inserta las FAQs nuevas; devuelve estadísticas de la carga.
+        Con full_sync la entrada es el corpus completo: al terminar sin errores se
+        eliminan las filas cuyo contenido ya no está (p. ej. FAQs editadas).
+        """
+        started = time.perf_counter()
+
+        # Deduplicar la entrada por hash de contenido
+        pending: dict[str, dict[str, str]] = {}
+        total = 0
+        for faq in faqs:
+            total += 1
+            question, answer = faq["question"].strip(), faq["answer"].strip()
+            pending.setdefault(faq_content_hash(question, answer),
+                               {"question": question, "answer": answer})
+
+        existing = await self._existing_hashes(session, list(pending))
+        new_items = [(h, faq) for h, faq in pending.items() if h not in existing]
+
+        inserted = 0
+        failed = 0
+        chunks = 0
+        # Las escrituras son secuenciales (una sola sesión), en orden de llegada
+        async for next_done in self._embed_in_chunks(
+                new_items,
+                lambda item: build_faq_embedding_text(**item[1])):
+            chunks += 1
+            try:
+                chunk, embeddings = await next_done
+                inserted += await self._insert_chunk(session, chunk, embeddings)
+            except Exception as e:
+                logger.error(f"Error ingesting FAQ chunk: {e}")
+                await session.rollback()
+                failed += 1
+
+        deleted = 0
+        if full_sync and not failed and pending:
+            deleted = await self._delete_missing(session, list(pending))
+
+        if inserted or deleted:
+            self.service.notify_corpus_changed()
+
+        stats = {
+            "received": total,
+            "unique": len(pending),
+            "skipped": len(pending) - len(new_items),
+            "inserted": inserted,
+            "deleted": deleted,
+            "failed_chunks": failed,
+            "chunks": chunks,
+            "elapsed_seconds": round(time.perf_counter() - started, 3)
+        }
+        logger.info(f"FAQ ingestion finished: {stats}")
+        return stats
+
+    async def _embed_in_chunks(
+            self,
+            items: list[Any],
+            to_text: Callable[[Any], str]
+    ) -> AsyncIterator[Awaitable[tuple[list[Any], list[list[float]]]]]:
+        """Embebe los items en chunks con concurrencia acotada, en orden de llegada"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def embed_chunk(chunk):
+            async with semaphore:
+                texts = [to_text(item) for item in chunk]
+                return chunk, await self.service.generate_batch_embeddings(texts)
+
+        tasks = [
+            asyncio.create_task(embed_chunk(items[i:i + self.batch_size]))
+            for i in range(0, len(items), self.batch_size)
+        ]
+        for next_done in asyncio.as_completed(tasks):
+            yield next_done
+
+    async def _existing_hashes(self, session: AsyncSession, hashes: list[str]) -> set[str]:
+        if not hashes:
+            return set()
+        # Las filas embebidas con otro modelo/dimensión cuentan como nuevas
+        stmt = select(FAQEmbedding.content_hash).where(
+            FAQEmbedding.content_hash.in_(hashes),
+            not_(self.service.stale_embedding_filter())
+        )
+        return set((await session.execute(stmt)).scalars())
+
+    async def _delete_missing(self, session: AsyncSession, hashes: list[str]) -> int:
+        """Elimina las FAQs cuyo hash no está en el corpus recibido"""
+        stmt = delete(FAQEmbedding).where(or_(
+            FAQEmbedding.content_hash.is_(None),
+            FAQEmbedding.content_hash.not_in(hashes)
+        ))
+        result = await session.execute(stmt)
+        await session.commit()
+        return result.rowcount or 0
+
+    async def _insert_chunk(
+            self,
+            session: AsyncSession,
+            chunk: list[tuple[str, dict[str, str]]],
+            embeddings: list[list[float]]
+    ) -> int:
+        """Un único INSERT multi-fila por chunk; actualiza hashes con embedding viejo"""
+        rows = [
+            {
+                "question": faq["question"],
+                "answer": faq["answer"],
+                "embedding": embedding,
+                "content_hash": content_hash,
+                "embedding_model": self.service.model,
+                "embedding_dimension": self.service.dimension
+            }
+            for (content_hash, faq), embedding in zip(chunk, embeddings)
+        ]
+        stmt = insert(FAQEmbedding).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FAQEmbedding.content_hash],
+            set_={
+                "embedding": stmt.excluded.embedding,
+                "embedding_model": stmt.excluded.embedding_model,
+                "embedding_dimension": stmt.excluded.embedding_dimension,
+                "updated_at": func.now()
+            }
+        )
+        result = await session.execute(stmt)
+        await session.commit()
+        return result.rowcount if result.rowcount and result.rowcount > 0 else 0
+
+    async def reembed_stale(self, session: AsyncSession) -> dict[str, Any]:
+        """Re-embebe solo las FAQs generadas con otro modelo o dimensión"""
+        started = time.perf_counter()
+        stmt = select(
+            FAQEmbedding.id, FAQEmbedding.question, FAQEmbedding.answer
+        ).where(self.service.stale_embedding_filter()).order_by(FAQEmbedding.id)
+        stale = (await session.execute(stmt)).all()
+
+        updated = 0
+        failed = 0
+        async for next_done in self._embed_in_chunks(
+                stale, lambda row: build_faq_embedding_text(row.question, row.answer)):
+            try:
+                chunk, embeddings = await next_done
+                # UPDATE por clave primaria en bloque (executemany)
+                await session.execute(update(FAQEmbedding), [
+                    {
+                        "id": row.id,
+                        "embedding": embedding,
+                        "embedding_model": self.service.model,
+                        "embedding_dimension": self.service.dimension,
+                        "updated_at": datetime.now(timezone.utc)
+                    }
+                    for row, embedding in zip(chunk, embeddings)
+                ])
+                await session.commit()
+                updated += len(chunk)
+            except Exception as e:
+                logger.error(f"Error re-embedding FAQ chunk: {e}")
+                await session.rollback()
+                failed += 1
+
+        if updated:
+            self.service.notify_corpus_changed()
+
+        stats = {
+            "stale": len(stale),
+            "updated": updated,
+            "failed_chunks": failed,
+            "elapsed_seconds": round(time.perf_counter() - started, 3)
+        }
+        logger.info(f"FAQ re-embedding finished: {stats}")
+        return stats
+
+
+# Instancia global del pipeline
+faq_ingestion_pipeline = FAQIngestionPipeline()
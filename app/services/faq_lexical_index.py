@@ -0,0 +1,123 @@
+"""
+Índice léxico BM25 en memoria para FAQs (tokens normalizados sin tildes)
+"""
+
+import logging
+import math
+import re
+import time
+from collections import Counter
+from typing import Any, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.models import FAQEmbedding
+from .text_normalization import normalize_text
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Palabras vacías en español (ya normalizadas, sin tildes)
+SPANISH_STOPWORDS = frozenset("""
+a al algo como con cual cuales cuando de del donde el ella en entre es esa ese
+eso esta este esto estoy hay la las le les lo los me mi mis muy no o para pero
+por que quien se si sin sobre soy su sus te tengo ti tu tus un una uno unos unas
+y ya yo puedo quiero saber sabes hola
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    """Tokens normalizados sin palabras vacías"""
+    return [
+        token for token in _TOKEN_RE.findall(normalize_text(text))
+        if len(token) > 1 and token not in SPANISH_STOPWORDS
+    ]
+
+
+class BM25FAQIndex:
+    """BM25 sobre pregunta + respuesta de cada FAQ"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, check_interval_seconds: float = 30):
+        self.k1 = k1
+        self.b = b
+        self.check_interval_seconds = check_interval_seconds
+        self._docs: list[dict[str, Any]] = []
+        self._term_freqs: list[Counter] = []
+        self._doc_lengths: list[int] = []
+        self._idf: dict[str, float] = {}
+        self._avg_length = 0.0
+        self._signature: Optional[tuple] = None
+        self._stale = True
+        self._last_check = 0.0
+
+    @property
+    def is_ready(self) -> bool:
+        return bool(self._docs)
+
+    def mark_stale(self) -> None:
+        """Fuerza la recarga en la próxima búsqueda"""
+        self._stale = True
+
+    def build(self, docs: list[dict[str, Any]]) -> None:
+        """Construye el índice a partir de dicts con id, question y answer"""
+        term_freqs = [Counter(tokenize(f"{doc['question']} {doc['answer']}")) for doc in docs]
+        doc_lengths = [sum(tf.values()) for tf in term_freqs]
+        document_freq = Counter(term for tf in term_freqs for term in tf)
+        total = len(docs)
+
+        self._idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in document_freq.items()
+        }
+        self._docs = docs
+        self._term_freqs = term_freqs
+        self._doc_lengths = doc_lengths
+        self._avg_length = sum(doc_lengths) / total if total else 0.0
+
+    async def ensure_fresh(self, session: AsyncSession, embedding_service) -> None:
+        """Recarga el índice si está marcado como viejo o si la tabla cambió"""
+        now = time.monotonic()
+        if not self._stale and now - self._last_check < self.check_interval_seconds:
+            return
+        self._last_check = now
+
+        signature = await embedding_service.get_faq_corpus_signature(session)
+        if self._stale or signature != self._signature:
+            stmt = select(FAQEmbedding.id, FAQEmbedding.question, FAQEmbedding.answer)
+            rows = (await session.execute(stmt.order_by(FAQEmbedding.id))).all()
+            self.build([
+                {"id": row.id, "question": row.question, "answer": row.answer}
+                for row in rows
+            ])
+            self._signature = signature
+            self._stale = False
+            logger.info(f"Lexical FAQ index loaded with {len(rows)} FAQs")
+
+    def search(self, query: str, limit: int = 5) -> list[dict[str, Any]]:
+        """Devuelve FAQs ordenadas por BM25 con la cobertura de términos de la query"""
+        terms = set(tokenize(query))
+        if not terms or not self._docs:
+            return []
+
+        results = []
+        for doc, tf, length in zip(self._docs, self._term_freqs, self._doc_lengths):
+            score = 0.0
+            matched = 0
+            for term in terms:
+                freq = tf.get(term)
+                if not freq:
+                    continue
+                matched += 1
+                norm = self.k1 * (1 - self.b + self.b * length / self._avg_length)
+                score += self._idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                results.append({
+                    **doc,
+                    "lexical_score": score,
+                    "coverage": matched / len(terms)
+                })
+
+        results.sort(key=lambda r: r["lexical_score"], reverse=True)
+        return results[:limit]
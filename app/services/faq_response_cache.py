@@ -0,0 +1,198 @@
+"""
+Cache semántico de respuestas FAQ: reutiliza respuestas generadas para consultas
+casi idénticas que recuperan el mismo conjunto de FAQs
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .text_normalization import normalize_text
+
+logger = logging.getLogger(__name__)
+
+FAQSetKey = tuple[int, ...]
+
+
+@dataclass
+class _CachedResponse:
+    embedding: Optional[np.ndarray]  # float32 normalizado; None si no hubo embedding
+    response: str
+    expires_at: float
+
+
+class SemanticResponseCache:
+    """Cache de respuestas por similitud de embedding dentro del mismo set de FAQs"""
+
+    def __init__(
+            self,
+            max_distance: float = 0.05,
+            max_entries: int = 500,
+            ttl_seconds: float = 3600,
+            check_interval_seconds: float = 30
+    ):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.check_interval_seconds = check_interval_seconds
+        # Orden LRU global y entradas agrupadas por set de FAQs
+        self._lru: OrderedDict[tuple[FAQSetKey, str], None] = OrderedDict()
+        self._buckets: dict[FAQSetKey, dict[str, _CachedResponse]] = {}
+        self._corpus_signature: Optional[tuple] = None
+        self._last_check = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def faq_set_key(similar_faqs: Sequence[dict[str, Any]]) -> FAQSetKey:
+        """Clave del set de FAQs recuperadas (independiente del orden)"""
+        return tuple(sorted(int(faq["id"]) for faq in similar_faqs))
+
+    @staticmethod
+    def _normalize_vector(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(
+            self,
+            query: str,
+            query_embedding: Optional[Sequence[float]],
+            similar_faqs: Sequence[dict[str, Any]]
+    ) -> Optional[str]:
+        """
+        Devuelve una respuesta cacheada si hay una consulta cercana con el mismo set.
+        Sin embedding (camino léxico) solo coincide el texto normalizado exacto.
+        """
+        faq_key = self.faq_set_key(similar_faqs)
+        bucket = self._buckets.get(faq_key)
+        if not bucket:
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        normalized_query = normalize_text(query)
+        entry = bucket.get(normalized_query)
+        if entry is not None and entry.expires_at <= now:
+            self._remove(faq_key, normalized_query)
+            entry = None
+        if entry is None and query_embedding is not None:
+            vector = self._normalize_vector(query_embedding)
+            best_distance = self.max_distance
+            for candidate_query, candidate in list(bucket.items()):
+                if candidate.expires_at <= now:
+                    self._remove(faq_key, candidate_query)
+                    continue
+                if candidate.embedding is None:
+                    continue
+                distance = 1.0 - float(np.dot(vector, candidate.embedding))
+                if distance <= best_distance:
+                    best_distance = distance
+                    entry, normalized_query = candidate, candidate_query
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._lru.move_to_end((faq_key, normalized_query))
+        self.hits += 1
+        return entry.response
+
+    def store(
+            self,
+            query: str,
+            query_embedding: Optional[Sequence[float]],
+            similar_faqs: Sequence[dict[str, Any]],
+            response: str
+    ) -> None:
+        """Guarda la respuesta generada para la consulta y el set de FAQs"""
+        faq_key = self.faq_set_key(similar_faqs)
+        normalized_query = normalize_text(query)
+        self._buckets.setdefault(faq_key, {})[normalized_query] = _CachedResponse(
+            embedding=(self._normalize_vector(query_embedding)
+                       if query_embedding is not None else None),
+            response=response,
+            expires_at=time.monotonic() + self.ttl_seconds
+        )
+        self._lru[(faq_key, normalized_query)] = None
+        self._lru.move_to_end((faq_key, normalized_query))
+        self.stores += 1
+
+        while len(self._lru) > self.max_entries:
+            (old_key, old_query), _ = self._lru.popitem(last=False)
+            self._remove(old_key, old_query)
+            self.evictions += 1
+
+    def _remove(self, faq_key: FAQSetKey, normalized_query: str) -> None:
+        bucket = self._buckets.get(faq_key)
+        if bucket is not None:
+            bucket.pop(normalized_query, None)
+            if not bucket:
+                del self._buckets[faq_key]
+        self._lru.pop((faq_key, normalized_query), None)
+
+    def invalidate(self) -> None:
+        """Descarta todas las respuestas (las FAQs cambiaron)"""
+        if self._lru:
+            logger.info(f"Invalidating {len(self._lru)} cached FAQ responses")
+        self._lru.clear()
+        self._buckets.clear()
+        self.invalidations += 1
+
+    async def ensure_fresh(self, session: AsyncSession, embedding_service) -> None:
+        """Invalida el cache si la tabla faq_embeddings cambió (chequeo periódico)"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval_seconds:
+            return
+        self._last_check = now
+
+        try:
+            signature = await embedding_service.get_faq_corpus_signature(session)
+        except Exception as e:
+            logger.warning(f"Could not check FAQ corpus signature: {e}")
+            return
+
+        if self._corpus_signature is not None and signature != self._corpus_signature:
+            self.invalidate()
+        self._corpus_signature = signature
+
+    def get_stats(self) -> dict:
+        """Métricas del cache"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._lru),
+            "faq_sets": len(self._buckets),
+            "max_entries": self.max_entries,
+            "max_distance": self.max_distance,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+def create_response_cache_from_env() -> Optional[SemanticResponseCache]:
+    """Crea el cache según FAQ_RESPONSE_CACHE_* o None si está deshabilitado"""
+    enabled = os.getenv("FAQ_RESPONSE_CACHE_ENABLED", "true").lower()
+    if enabled not in ("1", "true", "yes"):
+        return None
+
+    return SemanticResponseCache(
+        max_distance=float(os.getenv("FAQ_RESPONSE_CACHE_MAX_DISTANCE", "0.05")),
+        max_entries=int(os.getenv("FAQ_RESPONSE_CACHE_MAX_ENTRIES", "500")),
+        ttl_seconds=float(os.getenv("FAQ_RESPONSE_CACHE_TTL_SECONDS", "3600")),
+        check_interval_seconds=float(
+            os.getenv("FAQ_RESPONSE_CACHE_CHECK_INTERVAL", "30"))
+    )
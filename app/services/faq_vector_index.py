@@ -0,0 +1,154 @@
+"""
+Índice vectorial en memoria para FAQs (matriz float32 contigua pre-normalizada).
+PostgreSQL/pgvector sigue siendo el almacenamiento autoritativo.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Sequence
+from typing import Any, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.models import FAQEmbedding
+
+logger = logging.getLogger(__name__)
+
+
+class _IndexSnapshot(NamedTuple):
+    """Contenido inmutable del índice; se reemplaza entero en cada recarga"""
+    ids: tuple[int, ...]
+    questions: tuple[str, ...]
+    answers: tuple[str, ...]
+    matrix: np.ndarray
+
+
+class LocalFAQIndex:
+    """Top-k por producto matriz-vector sobre embeddings de FAQs normalizados"""
+
+    def __init__(self, check_interval_seconds: float = 30):
+        self.check_interval_seconds = check_interval_seconds
+        self._snapshot: Optional[_IndexSnapshot] = None
+        self._signature: Optional[tuple] = None
+        # Una sola recarga a la vez; las búsquedas no lo toman
+        self._reload_lock = asyncio.Lock()
+        self._stale = True
+        self._last_check = 0.0
+        self.loads = 0
+        self.searches = 0
+
+    @property
+    def is_ready(self) -> bool:
+        return self._snapshot is not None
+
+    def mark_stale(self) -> None:
+        """Fuerza la recarga en la próxima búsqueda"""
+        self._stale = True
+
+    async def load(self, session: AsyncSession, signature: Optional[tuple] = None) -> None:
+        """Carga (o recarga) todas las FAQs desde PostgreSQL"""
+        # Se limpia antes de leer: un mark_stale durante la carga fuerza otra recarga
+        self._stale = False
+        stmt = select(
+            FAQEmbedding.id,
+            FAQEmbedding.question,
+            FAQEmbedding.answer,
+            FAQEmbedding.embedding
+        ).where(FAQEmbedding.embedding.is_not(None)).order_by(FAQEmbedding.id)
+        try:
+            rows = (await session.execute(stmt)).all()
+        except Exception:
+            self._stale = True
+            raise
+
+        if rows:
+            matrix = np.ascontiguousarray(
+                np.vstack([np.asarray(row.embedding, dtype=np.float32) for row in rows]))
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+            matrix.flags.writeable = False
+            snapshot = _IndexSnapshot(
+                ids=tuple(row.id for row in rows),
+                questions=tuple(row.question for row in rows),
+                answers=tuple(row.answer for row in rows),
+                matrix=matrix
+            )
+        else:
+            snapshot = None
+
+        # Swap atómico de una sola referencia: cada búsqueda ve el índice viejo o el nuevo
+        self._snapshot = snapshot
+        self._signature = signature
+        self.loads += 1
+        logger.info(f"Local FAQ index loaded with {len(rows)} FAQs")
+
+    async def ensure_fresh(self, session: AsyncSession, embedding_service) -> None:
+        """Recarga el índice si está marcado como viejo o si la tabla cambió"""
+        if not self._needs_check():
+            return
+        async with self._reload_lock:
+            # Otra corrutina pudo recargar mientras esperábamos el lock
+            if not self._needs_check():
+                return
+            self._last_check = time.monotonic()
+
+            signature = await embedding_service.get_faq_corpus_signature(session)
+            if self._stale or signature != self._signature:
+                await self.load(session, signature)
+
+    def _needs_check(self) -> bool:
+        return self._stale or time.monotonic() - self._last_check >= self.check_interval_seconds
+
+    def search(
+            self,
+            query_embedding: Sequence[float],
+            limit: int = 5,
+            similarity_threshold: float = 0.7
+    ) -> list[dict[str, Any]]:
+        """Devuelve las FAQs más similares con el mismo formato que pgvector"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if query.shape[0] != snapshot.matrix.shape[1]:
+            raise ValueError(
+                f"Query dimension {query.shape[0]} does not match index "
+                f"dimension {snapshot.matrix.shape[1]}")
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+
+        scores = snapshot.matrix @ (query / norm)
+        k = min(limit, scores.shape[0])
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        self.searches += 1
+
+        return [
+            {
+                "id": snapshot.ids[i],
+                "question": snapshot.questions[i],
+                "answer": snapshot.answers[i],
+                "similarity": float(scores[i])
+            }
+            for i in top
+            if scores[i] >= similarity_threshold
+        ]
+
+    def get_stats(self) -> dict:
+        """Métricas del índice"""
+        snapshot = self._snapshot
+        return {
+            "faqs": len(snapshot.ids) if snapshot is not None else 0,
+            "dimension": int(snapshot.matrix.shape[1]) if snapshot is not None else None,
+            "stale": self._stale,
+            "loads": self.loads,
+            "searches": self.searches
+        }
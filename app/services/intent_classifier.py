@@ -0,0 +1,295 @@
+"""
+Clasificador local de intención para el supervisor: reglas de palabras clave
+precompiladas (text_matching) y una regresión logística sobre n-gramas de caracteres.
+Solo los mensajes con confianza baja se derivan al LLM.
+"""
+
+import json
+import logging
+import os
+import time
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .text_matching import KeywordMatcher
+from .text_normalization import normalize_text
+
+logger = logging.getLogger(__name__)
+
+UNCLEAR = "unclear"
+
+# Calibrados sobre config/intent_heldout.json (scripts/calibrate_intent_classifier.py)
+DEFAULT_CONFIDENCE_THRESHOLD = 0.7
+DEFAULT_MIN_KNOWN_RATIO = 0.5
+
+# Reglas en orden de prioridad (mismas listas que usaba el supervisor)
+INTENT_RULES: list[tuple[str, list[str]]] = [
+    # Comandos del wizard
+    ("wizard", ["volver", "cancelar"]),
+    # Patrones de postulación
+    ("wizard", [
+        # Acciones directas
+        "postular", "postulación", "inscribirme", "inscripcion", "inscripción",
+        # Intenciones naturales
+        "me quiero postular", "quiero postularme", "tengo una idea", "presentar una idea",
+        "tengo un proyecto", "quiero presentar un proyecto", "quiero aplicar",
+        # Contexto de emprendimiento
+        "emprender", "emprendimiento", "incubadora", "startup", "negocio",
+        # Formularios
+        "formulario"
+    ]),
+    # Patrones de FAQ
+    ("faq", [
+        "pregunta", "consulta", "información", "qué es", "cómo",
+        "cuándo", "dónde", "programa", "curso", "fellows", "minor",
+        "actividades", "contacto", "campus", "costo"
+    ])
+]
+
+# Ejemplos de entrenamiento del modelo (se pueden reemplazar con INTENT_EXAMPLES_PATH).
+# Los saludos y mensajes genéricos van a "faq", igual que el default del router con LLM;
+# los ejemplos de UNCLEAR enseñan al modelo a abstenerse fuera de dominio.
+DEFAULT_TRAINING_EXAMPLES: dict[str, list[str]] = {
+    "wizard": [
+        "quiero postular mi idea", "me gustaría postularme", "quiero anotarme",
+        "cómo hago para anotarme", "quiero registrar mi proyecto", "quiero empezar la postulación",
+        "quiero aplicar a la convocatoria", "tengo una idea y quiero presentarla",
+        "quiero presentar mi startup", "me quiero sumar con mi proyecto",
+        "arranquemos con el formulario", "quiero completar la solicitud",
+        "quisiera inscribir mi emprendimiento", "quiero participar con mi equipo",
+        "vengo a postular", "deseo postularme al programa de incubación",
+        "quiero seguir con la postulación", "retomemos el formulario",
+        "quiero cargar mis datos para postular", "me interesa aplicar con mi idea de negocio",
+        "tenemos un proyecto y queremos que nos acompañen", "quiero que evalúen mi idea",
+        "empecemos", "dale, arranquemos", "quiero anotar a mi equipo"
+    ],
+    "faq": [
+        "qué es ithaka", "qué programas tienen", "cuánto cuesta", "es gratis",
+        "dónde quedan", "en qué campus están", "cómo los contacto", "cuál es el mail",
+        "qué cursos electivos hay", "qué es el programa fellows", "qué ofrece el minor",
+        "cuándo abre la convocatoria", "hay mentorías", "qué actividades hacen",
+        "me podrías explicar qué hacen", "sabés sobre los cursos", "me gustaría saber más",
+        "qué requisitos piden", "quiénes pueden participar", "tienen horarios",
+        "hola", "buenas", "buen día", "gracias", "muchas gracias", "ok", "perfecto",
+        "chau", "necesito información", "tengo una duda", "y el costo",
+        "qué beneficios tiene", "puedo ir si no soy de la ucu"
+    ],
+    # Mensajes fuera de dominio: el modelo no decide y se consulta al LLM
+    UNCLEAR: [
+        "qué tiempo hace mañana", "recomendame una receta", "quiero pedir comida",
+        "cómo arreglo mi computadora", "me hacés la tarea", "quiero vender mi auto",
+        "contame un chiste", "quién ganó el partido", "traducime esto al inglés",
+        "quiero sacar un turno médico", "me olvidé la contraseña del banco",
+        "quiero reservar un hotel", "cuál es la capital de francia", "jaja",
+        "quiero cambiar mi plan de celular", "necesito un abogado"
+    ]
+}
+
+
+@dataclass
+class IntentPrediction:
+    intent: str
+    confidence: float
+    source: str  # "rule", "model" o "none"
+
+
+class CharNgramLogisticRegression:
+    """Regresión logística multiclase sobre n-gramas de caracteres (vocabulario del entrenamiento)"""
+
+    def __init__(self, ngram_range: tuple[int, int] = (2, 4)):
+        self.ngram_range = ngram_range
+        self.classes: list[str] = []
+        self.vocabulary: dict[str, int] = {}
+        self.weights: Optional[np.ndarray] = None
+        self.bias: Optional[np.ndarray] = None
+
+    def _ngram_counts(self, normalized: str) -> Counter:
+        padded = f" {normalized} "
+        low, high = self.ngram_range
+        return Counter(
+            padded[i:i + n]
+            for n in range(low, high + 1)
+            for i in range(len(padded) - n + 1)
+        )
+
+    def _sparse_features(self, normalized: str) -> tuple[np.ndarray, np.ndarray, float]:
+        """
+        Índices y pesos (norma L2 sobre todos los n-gramas) de los n-gramas conocidos
+        y la proporción de n-gramas del texto que están en el vocabulario
+        """
+        counts = self._ngram_counts(normalized)
+        norm = sum(c * c for c in counts.values()) ** 0.5 or 1.0
+        known = [(self.vocabulary[g], c) for g, c in counts.items() if g in self.vocabulary]
+        indices = np.fromiter((i for i, _ in known), dtype=np.int64, count=len(known))
+        values = np.fromiter((c / norm for _, c in known), dtype=np.float64, count=len(known))
+        total = sum(counts.values())
+        known_ratio = sum(c for _, c in known) / total if total else 0.0
+        return indices, values, known_ratio
+
+    def fit(
+            self,
+            examples: dict[str, list[str]],
+            epochs: int = 300,
+            learning_rate: float = 0.5,
+            l2: float = 1e-4
+    ) -> "CharNgramLogisticRegression":
+        self.classes = sorted(examples)
+        texts = [(normalize_text(text), i) for i, label in enumerate(self.classes) for text in examples[label]]
+        for text, _ in texts:
+            for gram in self._ngram_counts(text):
+                self.vocabulary.setdefault(gram, len(self.vocabulary))
+
+        x = np.zeros((len(texts), len(self.vocabulary)))
+        for row, (text, _) in enumerate(texts):
+            indices, values, _ = self._sparse_features(text)
+            x[row, indices] = values
+        targets = np.eye(len(self.classes))[[label for _, label in texts]]
+
+        self.weights = np.zeros((len(self.vocabulary), len(self.classes)))
+        self.bias = np.zeros(len(self.classes))
+        for _ in range(epochs):
+            grad = (self._softmax(x @ self.weights + self.bias) - targets) / len(texts)
+            self.weights -= learning_rate * (x.T @ grad + l2 * self.weights)
+            self.bias -= learning_rate * grad.sum(axis=0)
+        return self
+
+    def predict(self, normalized: str) -> tuple[str, float, float]:
+        """Clase, probabilidad y proporción de n-gramas conocidos para un texto ya normalizado"""
+        # Producto disperso: solo las filas de los n-gramas presentes
+        indices, values, known_ratio = self._sparse_features(normalized)
+        probabilities = self._softmax(values @ self.weights[indices] + self.bias)
+        best = int(np.argmax(probabilities))
+        return self.classes[best], float(probabilities[best]), known_ratio
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class IntentClassifier:
+    """Reglas compiladas primero; si no hay match, el modelo decide si supera el umbral"""
+
+    def __init__(
+            self,
+            rules: list[tuple[str, list[str]]] = INTENT_RULES,
+            examples: Optional[dict[str, list[str]]] = None,
+            confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+            min_known_ratio: float = DEFAULT_MIN_KNOWN_RATIO,
+            model_enabled: bool = True
+    ):
+        self.rules = [(intent, KeywordMatcher(keywords)) for intent, keywords in rules]
+        self.confidence_threshold = confidence_threshold
+        # Por debajo de esta proporción de n-gramas conocidos el texto está fuera de
+        # distribución: la softmax solo reflejaría el bias y no se usa
+        self.min_known_ratio = min_known_ratio
+        self.model: Optional[CharNgramLogisticRegression] = None
+        if model_enabled:
+            started = time.perf_counter()
+            self.model = CharNgramLogisticRegression().fit(examples or DEFAULT_TRAINING_EXAMPLES)
+            logger.info(f"Intent model trained in {(time.perf_counter() - started) * 1000:.1f}ms")
+        self.stats = {"rule": 0, "model": 0, "unclear": 0}
+        self.total_us = 0.0
+
+    def classify(self, message: str) -> IntentPrediction:
+        """Intención del mensaje; "unclear" si ni reglas ni modelo alcanzan el umbral"""
+        started = time.perf_counter()
+        prediction = self._classify(message)
+        self.total_us += (time.perf_counter() - started) * 1_000_000
+        self.stats[prediction.source if prediction.intent != UNCLEAR else "unclear"] += 1
+        return prediction
+
+    def _classify(self, message: str) -> IntentPrediction:
+        normalized = normalize_text(message)
+        for intent, matcher in self.rules:
+            if matcher.match_any(normalized, normalized=True):
+                return IntentPrediction(intent, 1.0, "rule")
+
+        if self.model is None or not normalized:
+            return IntentPrediction(UNCLEAR, 0.0, "none")
+
+        return self._predict_model(normalized, self.confidence_threshold)
+
+    def _predict_model(self, normalized: str, threshold: float) -> IntentPrediction:
+        intent, confidence, known_ratio = self.model.predict(normalized)
+        if known_ratio < self.min_known_ratio or intent == UNCLEAR or confidence < threshold:
+            return IntentPrediction(UNCLEAR, confidence, "model")
+        return IntentPrediction(intent, confidence, "model")
+
+    def calibrate_threshold(
+            self,
+            held_out: dict[str, list[str]],
+            target_precision: float = 0.95,
+            candidates: Iterable[float] = tuple(t / 100 for t in range(50, 100))
+    ) -> list[dict[str, float]]:
+        """
+        Precisión y cobertura del modelo en frases no vistas en el entrenamiento
+        ({"faq": [...], "wizard": [...], "unclear": [...]}) para cada umbral candidato.
+        Una decisión es correcta si coincide con la etiqueta; abstenerse nunca es error.
+        Marca como "recommended" el menor umbral que alcanza target_precision.
+        """
+        if self.model is None:
+            raise ValueError("The intent model is disabled")
+
+        items = [(normalize_text(text), label) for label, texts in held_out.items() for text in texts]
+        table = []
+        for threshold in candidates:
+            decided = correct = 0
+            for normalized, label in items:
+                prediction = self._predict_model(normalized, threshold)
+                if prediction.intent == UNCLEAR:
+                    continue
+                decided += 1
+                correct += prediction.intent == label
+            table.append({
+                "threshold": threshold,
+                "precision": correct / decided if decided else 1.0,
+                "coverage": decided / len(items) if items else 0.0,
+                "recommended": False
+            })
+
+        for row in table:
+            if row["precision"] >= target_precision:
+                row["recommended"] = True
+                break
+        return table
+
+    def get_stats(self) -> dict:
+        total = sum(self.stats.values())
+        return {
+            **self.stats,
+            "total": total,
+            "local_ratio": (total - self.stats["unclear"]) / total if total else 0.0,
+            "avg_us": self.total_us / total if total else 0.0
+        }
+
+
+def _load_examples(path: Optional[str]) -> Optional[dict[str, list[str]]]:
+    if not path:
+        return None
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not load intent examples from {path}: {e}")
+        return None
+
+
+def create_intent_classifier_from_env() -> IntentClassifier:
+    """Crea el clasificador según INTENT_*"""
+    return IntentClassifier(
+        examples=_load_examples(os.getenv("INTENT_EXAMPLES_PATH")),
+        confidence_threshold=float(os.getenv(
+            "INTENT_CONFIDENCE_THRESHOLD", str(DEFAULT_CONFIDENCE_THRESHOLD))),
+        min_known_ratio=float(os.getenv(
+            "INTENT_MIN_KNOWN_NGRAM_RATIO", str(DEFAULT_MIN_KNOWN_RATIO))),
+        model_enabled=os.getenv("INTENT_MODEL_ENABLED", "true").lower() in ("1", "true", "yes")
+    )
+
+
+# Instancia global del clasificador
+intent_classifier = create_intent_classifier_from_env()
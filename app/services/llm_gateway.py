@@ -0,0 +1,320 @@
+"""
+Gateway compartido hacia OpenAI: un solo cliente con pool de conexiones,
+timeouts por tipo de llamada, reintentos con backoff, límite de concurrencia,
+rate limiting y métricas por llamador
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+
+from .tracing import tracer
+from .usage_accounting import usage_accountant
+
+logger = logging.getLogger(__name__)
+
+# LLM_BASE_URL=inprocess usa el servidor falso de OpenAI dentro del mismo proceso
+IN_PROCESS_BASE_URL = "inprocess"
+
+# Timeouts (segundos) por tipo de llamada; se pueden pisar con LLM_TIMEOUT_<TIPO>
+DEFAULT_TIMEOUTS = {
+    "routing": 10.0,
+    "chat": 30.0,
+    "validation": 15.0,
+    "embedding": 15.0,
+    "scoring": 60.0
+}
+
+_RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError
+)
+
+
+class TokenBucket:
+    """Rate limiter de requests por minuto"""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, int(rate_per_minute / 60)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waits = 0
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                self.waits += 1
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class _CallerStats:
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    total_ms: float = 0.0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class LLMGateway:
+    """Punto único de acceso a la API de OpenAI"""
+
+    def __init__(
+            self,
+            api_key: Optional[str] = None,
+            base_url: Optional[str] = None,
+            timeouts: Optional[dict[str, float]] = None,
+            max_retries: int = 3,
+            backoff_base: float = 0.5,
+            backoff_max: float = 8.0,
+            max_concurrency: int = 32,
+            requests_per_minute: float = 0,
+            max_connections: int = 100,
+            max_keepalive_connections: int = 20
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._client: Optional[AsyncOpenAI] = None
+        self._stats: dict[str, _CallerStats] = {}
+        self.in_flight = 0
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Cliente compartido (creado al primer uso); los reintentos los maneja el gateway"""
+        if self._client is None:
+            api_key = self.api_key or os.getenv("OPENAI_API_KEY")
+            base_url = self.base_url
+            transport = None
+            if base_url == IN_PROCESS_BASE_URL:
+                from .fake_openai import create_fake_openai_app_from_env
+
+                transport = httpx.ASGITransport(app=create_fake_openai_app_from_env())
+                base_url = "http://fake-openai/v1"
+                api_key = api_key or "fake"
+                logger.info("LLM gateway using in-process fake OpenAI server")
+
+            self._client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    transport=transport,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_keepalive_connections
+                    ),
+                    timeout=httpx.Timeout(max(self.timeouts.values()), connect=5.0)
+                )
+            )
+        return self._client
+
+    def timeout_for(self, call_type: str) -> float:
+        return self.timeouts.get(call_type, self.timeouts["chat"])
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Respeta el rate limit y el límite global de concurrencia"""
+        if self._bucket is not None:
+            await self._bucket.acquire()
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        # Respetar Retry-After en 429 si viene; si no, backoff exponencial con full jitter
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _call(
+            self,
+            caller: str,
+            call_type: str,
+            request: Callable[[float], Awaitable[Any]],
+            held_slots: Optional[AsyncExitStack] = None
+    ) -> Any:
+        """
+        Ejecuta request con reintentos. Cada intento toma su propio slot (token del
+        rate limit + semáforo), así los reintentos tras un 429 también respetan el
+        rate limit; el backoff corre sin ocupar el slot. Con held_slots (streaming)
+        el slot del intento exitoso queda abierto hasta que se cierre ese stack.
+        """
+        stats = self._stats.setdefault(caller, _CallerStats())
+        stats.calls += 1
+        timeout = self.timeout_for(call_type)
+        started = time.perf_counter()
+
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    async with AsyncExitStack() as attempt_slot:
+                        await attempt_slot.enter_async_context(self._slot())
+                        result = await request(timeout)
+                        if held_slots is not None:
+                            await held_slots.enter_async_context(attempt_slot.pop_all())
+                        return result
+                except _RETRYABLE_ERRORS as e:
+                    if isinstance(e, openai.RateLimitError):
+                        stats.rate_limited += 1
+                    if attempt >= self.max_retries:
+                        raise
+                    stats.retries += 1
+                    delay = self._backoff_delay(attempt, e)
+                    logger.warning(
+                        f"LLM call from {caller} failed ({type(e).__name__}), "
+                        f"retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.total_ms += (time.perf_counter() - started) * 1000
+
+    def _record_usage(self, caller: str, model: Optional[str], usage: Any) -> None:
+        if usage is None:
+            return
+        stats = self._stats.setdefault(caller, _CallerStats())
+        stats.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        stats.cached_tokens += getattr(details, "cached_tokens", 0) or 0
+        stats.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+        # Acumulado por conversación/agente/día para llm_usage
+        usage_accountant.record(caller, model, usage)
+
+    async def chat_completion(self, caller: str, call_type: str = "chat", **params: Any):
+        """chat.completions.create con la política compartida"""
+        with tracer.span(f"llm.{caller}", call_type=call_type, model=params.get("model")):
+            response = await self._call(
+                caller, call_type,
+                lambda timeout: self.client.chat.completions.create(timeout=timeout, **params)
+            )
+        self._record_usage(caller, params.get("model"), response.usage)
+        return response
+
+    async def stream_chat_completion(
+            self,
+            caller: str,
+            call_type: str = "chat",
+            **params: Any
+    ) -> AsyncIterator[Any]:
+        """
+        chat.completions.create en streaming; el slot y el span se liberan al terminar
+        el stream. Si el consumidor corta antes (aclose/cancelación), se cierra la
+        respuesta HTTP y se liberan igual: usar con contextlib.aclosing.
+        """
+        with tracer.span(f"llm.{caller}", call_type=call_type, model=params.get("model")):
+            async with AsyncExitStack() as held_slots:
+                stream = await self._call(
+                    caller, call_type,
+                    lambda timeout: self.client.chat.completions.create(
+                        stream=True,
+                        stream_options={"include_usage": True},
+                        timeout=timeout,
+                        **params
+                    ),
+                    held_slots=held_slots
+                )
+                try:
+                    async for chunk in stream:
+                        if chunk.usage is not None:
+                            self._record_usage(caller, params.get("model"), chunk.usage)
+                        yield chunk
+                except GeneratorExit:
+                    # Corte del consumidor: no cuenta como error del span
+                    logger.debug(f"LLM stream from {caller} closed before completion")
+                finally:
+                    await stream.close()
+
+    async def embeddings(self, caller: str, call_type: str = "embedding", **params: Any):
+        """embeddings.create con la política compartida"""
+        with tracer.span(f"llm.{caller}", call_type=call_type, model=params.get("model")):
+            response = await self._call(
+                caller, call_type,
+                lambda timeout: self.client.embeddings.create(timeout=timeout, **params)
+            )
+        self._record_usage(caller, params.get("model"), response.usage)
+        return response
+
+    def get_stats(self) -> dict:
+        """Métricas globales y por llamador"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "rate_limit_waits": self._bucket.waits if self._bucket else 0,
+            "callers": {
+                caller: {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "retries": stats.retries,
+                    "rate_limited": stats.rate_limited,
+                    "avg_ms": stats.total_ms / stats.calls if stats.calls else 0.0,
+                    "prompt_tokens": stats.prompt_tokens,
+                    "cached_tokens": stats.cached_tokens,
+                    "completion_tokens": stats.completion_tokens
+                }
+                for caller, stats in self._stats.items()
+            }
+        }
+
+
+def create_llm_gateway_from_env() -> LLMGateway:
+    """Crea el gateway según LLM_*"""
+    timeouts = {
+        call_type: float(os.getenv(f"LLM_TIMEOUT_{call_type.upper()}", default))
+        for call_type, default in DEFAULT_TIMEOUTS.items()
+    }
+    return LLMGateway(
+        base_url=os.getenv("LLM_BASE_URL") or os.getenv("OPENAI_BASE_URL"),
+        timeouts=timeouts,
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+        backoff_base=float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5")),
+        backoff_max=float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8")),
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "32")),
+        requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0")),
+        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    )
+
+
+# Instancia global del gateway
+llm_gateway = create_llm_gateway_from_env()
@@ -0,0 +1,178 @@
+"""
+Cache de decisiones de routing del supervisor: evita repetir la llamada al LLM
+para mensajes ambiguos ya vistos en el mismo contexto de conversación
+"""
+
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Protocol
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from ..db.config.database import SessionLocal
+from ..db.models import RoutingCacheEntry
+from .text_normalization import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class RoutingCacheBackend(Protocol):
+    """Backend compartido entre réplicas para las decisiones"""
+
+    async def get(self, key: str, ttl_seconds: float) -> Optional[str]:
+        ...
+
+    async def set(self, key: str, decision: str) -> None:
+        ...
+
+
+class PostgresRoutingCacheBackend:
+    """Backend en la tabla routing_cache de PostgreSQL"""
+
+    async def get(self, key: str, ttl_seconds: float) -> Optional[str]:
+        min_created_at = datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds)
+        async with SessionLocal() as session:
+            stmt = select(RoutingCacheEntry.decision).where(
+                RoutingCacheEntry.cache_key == key,
+                RoutingCacheEntry.created_at >= min_created_at
+            )
+            return (await session.execute(stmt)).scalar_one_or_none()
+
+    async def set(self, key: str, decision: str) -> None:
+        stmt = insert(RoutingCacheEntry).values(cache_key=key, decision=decision)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RoutingCacheEntry.cache_key],
+            set_={"decision": stmt.excluded.decision, "created_at": func.now()}
+        )
+        async with SessionLocal() as session:
+            await session.execute(stmt)
+            await session.commit()
+
+
+class RoutingCache:
+    """Cache LRU con TTL de decisiones, por mensaje normalizado y firma de contexto"""
+
+    def __init__(
+            self,
+            max_entries: int = 2000,
+            ttl_seconds: float = 3600,
+            backend: Optional[RoutingCacheBackend] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def context_signature(state: dict[str, Any]) -> str:
+        """
+        Firma gruesa del contexto: estado del wizard y agente de la última respuesta.
+        El agente sale de la ventana de contexto (historial persistido); current_agent
+        solo sirve si no es "supervisor", el valor inicial de cada turno de ChatService.
+        """
+        wizard_state = state.get("wizard_state") or {}
+        wizard_status = wizard_state.get("wizard_status", "INACTIVE")
+        previous_agent = (state.get("context_window") or {}).get("last_agent")
+        if not previous_agent:
+            current_agent = state.get("current_agent")
+            previous_agent = current_agent if current_agent != "supervisor" else None
+        return f"{wizard_status}|{previous_agent or 'none'}"
+
+    @staticmethod
+    def make_key(message: str, context_signature: str) -> str:
+        """Clave estable a partir del mensaje normalizado y la firma de contexto"""
+        normalized = normalize_text(message)
+        return hashlib.sha256(f"{context_signature}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Decisión cacheada o None si no hay entrada vigente"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, decision = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return decision
+            del self._entries[key]
+
+        if self.backend is not None:
+            try:
+                decision = await self.backend.get(key, self.ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Routing cache backend read failed: {e}")
+                decision = None
+            if decision is not None:
+                self._store_local(key, decision)
+                self.hits += 1
+                self.shared_hits += 1
+                return decision
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, decision: str) -> None:
+        """Guarda la decisión en memoria y, si existe, en el backend compartido"""
+        self._store_local(key, decision)
+        self.stores += 1
+
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, decision)
+            except Exception as e:
+                logger.warning(f"Routing cache backend write failed: {e}")
+
+    def _store_local(self, key: str, decision: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, decision)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Vacía el cache en memoria (no afecta al backend compartido)"""
+        self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """Métricas del cache"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "backend": type(self.backend).__name__ if self.backend else "memory",
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+def create_routing_cache_from_env() -> Optional[RoutingCache]:
+    """Crea el cache según ROUTING_CACHE_* o None si está deshabilitado"""
+    if os.getenv("ROUTING_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+
+    backend_name = os.getenv("ROUTING_CACHE_BACKEND", "memory").lower()
+    backend: Optional[RoutingCacheBackend] = None
+    if backend_name == "postgres":
+        backend = PostgresRoutingCacheBackend()
+    elif backend_name != "memory":
+        logger.warning(f"Unknown ROUTING_CACHE_BACKEND '{backend_name}', using memory")
+
+    return RoutingCache(
+        max_entries=int(os.getenv("ROUTING_CACHE_MAX_ENTRIES", "2000")),
+        ttl_seconds=float(os.getenv("ROUTING_CACHE_TTL_SECONDS", "3600")),
+        backend=backend
+    )
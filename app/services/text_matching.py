@@ -0,0 +1,127 @@
+"""
+Matching de texto compartido entre agentes: palabras clave y opciones se normalizan
+(minúsculas, sin tildes) y se compilan una sola vez, así "inscripcion" e "inscripción"
+matchean igual en el supervisor, los validadores y el wizard
+"""
+
+import re
+from collections.abc import Iterable, Sequence
+from functools import lru_cache
+from typing import Any, Optional
+
+from .text_normalization import normalize_text
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """
+    Regex equivalente a la alternancia de las palabras pero factorizada como trie:
+    el costo de un intento de match depende del largo del texto, no de la lista
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + build(child)
+                     for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Cuantificador greedy: prefiere la palabra más larga cuando una es prefijo de otra
+        if terminal:
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+def compile_keyword_pattern(keywords: Iterable[str]) -> re.Pattern:
+    """
+    Una sola regex sobre las palabras clave normalizadas, con borde de palabra a
+    ambos lados y plural opcional: "curso" matchea "cursos" pero no "idea" en
+    "ideal", "programa" en "programar" ni "como" en "acomodar"
+    """
+    normalized = {normalize_text(k) for k in keywords if k}
+    normalized.discard("")
+    if not normalized:
+        # Nunca matchea
+        return re.compile(r"(?!)")
+    return re.compile(r"\b(?:" + _trie_regex(normalized) + r")(?:e?s)?\b")
+
+
+class KeywordMatcher:
+    """Conjunto de palabras clave precompilado"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(keywords)
+        self.pattern = compile_keyword_pattern(self.keywords)
+
+    def match_any(self, text: str, normalized: bool = False) -> bool:
+        """True si alguna palabra clave aparece en el texto"""
+        return self.pattern.search(text if normalized else normalize_text(text)) is not None
+
+    def find_all(self, text: str, normalized: bool = False) -> set[str]:
+        """Palabras clave (normalizadas, con su plural si apareció así) distintas presentes en el texto"""
+        return set(self.pattern.findall(text if normalized else normalize_text(text)))
+
+
+# Largo mínimo de una respuesta para aceptarla como fragmento de un label
+MIN_PARTIAL_OPTION_LENGTH = 4
+
+
+class OptionMatcher:
+    """Elige la opción (dicts con value y label) que corresponde a la respuesta del usuario"""
+
+    def __init__(self, options: Sequence[dict[str, Any]]):
+        self.options = list(options)
+        self._exact: dict[str, int] = {}
+        for index, option in enumerate(self.options):
+            for key in (option["value"], option["label"]):
+                self._exact.setdefault(normalize_text(key), index)
+        self._labels = [normalize_text(option["label"]) for option in self.options]
+
+    def best_index(self, text: str) -> Optional[int]:
+        """
+        Coincidencia exacta con value o label; si no hay, la primera opción cuyo label
+        contiene la respuesta como palabra(s) completa(s) o, si tiene al menos
+        MIN_PARTIAL_OPTION_LENGTH caracteres, como fragmento ("educ" → "Educación").
+        Letras sueltas como "o" o "e" no eligen ninguna opción.
+        """
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+        index = self._exact.get(normalized)
+        if index is not None:
+            return index
+
+        if len(normalized) >= 2:
+            whole_words = re.compile(r"\b" + re.escape(normalized) + r"\b")
+            index = next((i for i, label in enumerate(self._labels)
+                          if whole_words.search(label)), None)
+            if index is not None:
+                return index
+
+        if len(normalized) >= MIN_PARTIAL_OPTION_LENGTH:
+            return next((i for i, label in enumerate(self._labels) if normalized in label), None)
+        return None
+
+    def best_option(self, text: str) -> Optional[dict[str, Any]]:
+        index = self.best_index(text)
+        return self.options[index] if index is not None else None
+
+
+@lru_cache(maxsize=256)
+def _cached_option_matcher(options: tuple[tuple[str, str], ...]) -> OptionMatcher:
+    return OptionMatcher([{"value": value, "label": label} for value, label in options])
+
+
+def best_option(text: str, options: Sequence[dict[str, Any]]) -> Optional[dict[str, Any]]:
+    """Opción elegida, con el matcher cacheado por lista de opciones (el wizard las arma por nodo)"""
+    matcher = _cached_option_matcher(
+        tuple((option["value"], option["label"]) for option in options))
+    index = matcher.best_index(text)
+    return options[index] if index is not None else None
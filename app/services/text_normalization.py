@@ -0,0 +1,22 @@
+"""
+Normalización de texto compartida (minúsculas, sin tildes, espacios colapsados)
+"""
+
+import re
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def strip_accents(text: str) -> str:
+    """Elimina tildes y diacríticos (NFKD) conservando el resto del texto"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza un texto para comparaciones y claves de cache"""
+    if not text:
+        return ""
+    folded = strip_accents(text).lower()
+    return _WHITESPACE_RE.sub(" ", folded).strip()
@@ -0,0 +1,174 @@
+"""
+Instrumentación por spans del camino caliente (nodos del grafo, llamadas a OpenAI,
+sesiones de base de datos): histogramas de duración en memoria expuestos en /metrics
+con formato Prometheus y, si está habilitado, spans de OpenTelemetry
+"""
+
+import functools
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Buckets (segundos) pensados para el rango de una llamada a DB (ms) hasta un LLM (decenas de s)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_PREFIX = "ithaka"
+
+
+class SpanHistogram:
+    """Histograma acumulativo de duraciones de un span"""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+        self.in_progress = 0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.sum += seconds
+        for i, upper in enumerate(self.buckets):
+            if seconds <= upper:
+                self.counts[i] += 1
+
+
+class Tracer:
+    """Registra spans: siempre en histogramas locales y opcionalmente en OpenTelemetry"""
+
+    def __init__(
+            self,
+            metrics_enabled: bool = True,
+            otel_enabled: bool = False,
+            buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.metrics_enabled = metrics_enabled
+        self.buckets = buckets
+        self._histograms: dict[str, SpanHistogram] = {}
+        self._otel_tracer = None
+        if otel_enabled:
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                logger.warning(
+                    "TRACING_OTEL_ENABLED is set but opentelemetry-api is not installed; "
+                    "spans will only feed /metrics")
+            else:
+                # El exporter lo configura el SDK (p. ej. opentelemetry-instrument)
+                self._otel_tracer = trace.get_tracer("ithaka-backend")
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[None]:
+        """Mide el bloque como un span; sirve tanto en código sync como async"""
+        if not self.metrics_enabled and self._otel_tracer is None:
+            yield
+            return
+
+        histogram = None
+        if self.metrics_enabled:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = SpanHistogram(self.buckets)
+            histogram.in_progress += 1
+
+        otel_span = None
+        if self._otel_tracer is not None:
+            otel_span = self._otel_tracer.start_as_current_span(
+                name, attributes={k: v for k, v in attributes.items() if v is not None})
+            otel_span.__enter__()
+
+        started = time.perf_counter()
+        error: Optional[BaseException] = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if histogram is not None:
+                histogram.in_progress -= 1
+                histogram.observe(time.perf_counter() - started)
+                if error is not None:
+                    histogram.errors += 1
+            if otel_span is not None:
+                # start_as_current_span registra la excepción y marca el status
+                otel_span.__exit__(type(error) if error else None, error,
+                                   error.__traceback__ if error else None)
+
+    def traced(self, name: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+        """Decorador para funciones async (nodos del grafo, métodos con sesión de DB)"""
+
+        def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def get_stats(self) -> dict:
+        """Resumen por span: cantidad, errores y duración media"""
+        return {
+            name: {
+                "count": h.count,
+                "errors": h.errors,
+                "in_progress": h.in_progress,
+                "avg_ms": h.sum / h.count * 1000 if h.count else 0.0
+            }
+            for name, h in self._histograms.items()
+        }
+
+    def render_prometheus(self) -> str:
+        """Histogramas en el formato de exposición de texto de Prometheus"""
+        metric = f"{METRIC_PREFIX}_span_duration_seconds"
+        lines = [
+            f"# HELP {metric} Duración de los spans del camino caliente",
+            f"# TYPE {metric} histogram"
+        ]
+        for name, h in sorted(self._histograms.items()):
+            label = _escape_label(name)
+            for upper, count in zip(h.buckets, h.counts):
+                lines.append(f'{metric}_bucket{{span="{label}",le="{upper}"}} {count}')
+            lines.append(f'{metric}_bucket{{span="{label}",le="+Inf"}} {h.count}')
+            lines.append(f'{metric}_sum{{span="{label}"}} {h.sum}')
+            lines.append(f'{metric}_count{{span="{label}"}} {h.count}')
+
+        errors = f"{METRIC_PREFIX}_span_errors_total"
+        lines += [f"# HELP {errors} Spans terminados con excepción", f"# TYPE {errors} counter"]
+        lines += [f'{errors}{{span="{_escape_label(name)}"}} {h.errors}'
+                  for name, h in sorted(self._histograms.items())]
+
+        in_progress = f"{METRIC_PREFIX}_spans_in_progress"
+        lines += [f"# HELP {in_progress} Spans en curso (p. ej. turnos en vuelo)",
+                  f"# TYPE {in_progress} gauge"]
+        lines += [f'{in_progress}{{span="{_escape_label(name)}"}} {h.in_progress}'
+                  for name, h in sorted(self._histograms.items())]
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def create_tracer_from_env() -> Tracer:
+    """Crea el tracer según TRACING_*"""
+    buckets = os.getenv("TRACING_BUCKETS")
+    return Tracer(
+        metrics_enabled=os.getenv("TRACING_METRICS_ENABLED", "true").lower() in ("1", "true", "yes"),
+        otel_enabled=os.getenv("TRACING_OTEL_ENABLED", "false").lower() in ("1", "true", "yes"),
+        buckets=tuple(sorted(float(b) for b in buckets.split(","))) if buckets else DEFAULT_BUCKETS
+    )
+
+
+# Instancia global del tracer
+tracer = create_tracer_from_env()
@@ -0,0 +1,245 @@
+"""
+Contabilidad de tokens y costo estimado de las llamadas a OpenAI: se agrega en
+memoria por día, conversación, agente y modelo y se vuelca periódicamente a llm_usage
+"""
+
+import asyncio
+import json
+import logging
+import os
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Conversación del turno en curso (la fija ChatService; el gateway la lee al registrar)
+current_conversation_id: ContextVar[Optional[int]] = ContextVar("current_conversation_id", default=None)
+
+# Conversación 0 agrupa las llamadas sin conversación asociada
+NO_CONVERSATION = 0
+
+# Precios en USD por millón de tokens: (input, input cacheado, output)
+DEFAULT_PRICING: dict[str, tuple[float, float, float]] = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "text-embedding-3-small": (0.02, 0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.13, 0.0),
+    "text-embedding-ada-002": (0.10, 0.10, 0.0)
+}
+
+GROUP_BY_COLUMNS = ("agent", "conversation", "day", "model")
+
+
+@dataclass
+class _UsageDelta:
+    calls: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class UsageAccountant:
+    """Acumula el uso en memoria y lo persiste en lote (upsert incremental)"""
+
+    def __init__(
+            self,
+            enabled: bool = True,
+            flush_interval_seconds: float = 30.0,
+            pricing: Optional[dict[str, tuple[float, float, float]]] = None
+    ):
+        self.enabled = enabled
+        self.flush_interval_seconds = flush_interval_seconds
+        self.pricing = {**DEFAULT_PRICING, **(pricing or {})}
+        self._pending: dict[tuple[date, int, str, str], _UsageDelta] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.flush_errors = 0
+
+    def record(self, agent: str, model: Optional[str], usage: Any) -> None:
+        """Registra el usage de una respuesta de OpenAI (chat o embeddings)"""
+        if not self.enabled or usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        key = (
+            datetime.now(timezone.utc).date(),
+            current_conversation_id.get() or NO_CONVERSATION,
+            agent,
+            model or "unknown"
+        )
+        delta = self._pending.setdefault(key, _UsageDelta())
+        delta.calls += 1
+        delta.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+        delta.cached_tokens += getattr(details, "cached_tokens", 0) or 0
+        delta.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def estimate_cost(self, model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+        """Costo estimado en USD (0 si el modelo no tiene precio configurado)"""
+        # Los modelos con fecha (gpt-4o-mini-2024-07-18) usan el precio del prefijo más largo
+        prices = self.pricing.get(model) or next(
+            (self.pricing[name] for name in sorted(self.pricing, key=len, reverse=True)
+             if model.startswith(name)), None)
+        if prices is None:
+            return 0.0
+        input_price, cached_price, output_price = prices
+        uncached = max(prompt_tokens - cached_tokens, 0)
+        return (uncached * input_price + cached_tokens * cached_price
+                + completion_tokens * output_price) / 1_000_000
+
+    async def flush(self) -> int:
+        """Vuelca el uso pendiente a llm_usage; devuelve las filas afectadas"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+
+            from ..db.config.database import SessionLocal
+
+            try:
+                async with SessionLocal() as session:
+                    await session.execute(self._upsert_statement(session, pending))
+                    await session.commit()
+            except Exception as e:
+                logger.error(f"Error flushing LLM usage: {e}")
+                self.flush_errors += 1
+                # Reincorporar lo pendiente para el próximo intento
+                for key, delta in pending.items():
+                    merged = self._pending.setdefault(key, _UsageDelta())
+                    merged.calls += delta.calls
+                    merged.prompt_tokens += delta.prompt_tokens
+                    merged.cached_tokens += delta.cached_tokens
+                    merged.completion_tokens += delta.completion_tokens
+                return 0
+
+            self.flushes += 1
+            return len(pending)
+
+    @staticmethod
+    def _upsert_statement(session, pending: dict[tuple[date, int, str, str], _UsageDelta]):
+        from ..db.models import LLMUsage
+
+        if session.bind.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+
+        rows = [
+            {
+                "day": day,
+                "conversation_id": conversation_id,
+                "agent": agent,
+                "model": model,
+                "calls": delta.calls,
+                "prompt_tokens": delta.prompt_tokens,
+                "cached_tokens": delta.cached_tokens,
+                "completion_tokens": delta.completion_tokens
+            }
+            for (day, conversation_id, agent, model), delta in pending.items()
+        ]
+        stmt = insert(LLMUsage).values(rows)
+        counters = ("calls", "prompt_tokens", "cached_tokens", "completion_tokens")
+        return stmt.on_conflict_do_update(
+            index_elements=["day", "conversation_id", "agent", "model"],
+            set_={
+                **{name: getattr(LLMUsage, name) + getattr(stmt.excluded, name) for name in counters},
+                "updated_at": datetime.now(timezone.utc)
+            }
+        )
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            await self.flush()
+
+    def start(self) -> None:
+        """Arranca el volcado periódico (en el startup de la app)"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        """Detiene el volcado periódico y persiste lo pendiente"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def get_report(self, session, group_by: str = "agent", days: int = 30) -> dict[str, Any]:
+        """Tokens y costo estimado de los últimos días agrupados por agente, conversación, día o modelo"""
+        from sqlalchemy import func, select
+
+        from ..db.models import LLMUsage
+
+        if group_by not in GROUP_BY_COLUMNS:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY_COLUMNS)}")
+
+        since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+        group_column = LLMUsage.conversation_id if group_by == "conversation" else getattr(LLMUsage, group_by)
+        # El costo depende del modelo: se agrupa también por modelo y se suma después
+        stmt = select(
+            group_column.label("key"),
+            LLMUsage.model,
+            func.sum(LLMUsage.calls),
+            func.sum(LLMUsage.prompt_tokens),
+            func.sum(LLMUsage.cached_tokens),
+            func.sum(LLMUsage.completion_tokens)
+        ).where(LLMUsage.day >= since).group_by(group_column, LLMUsage.model)
+
+        groups: dict[Any, dict[str, Any]] = {}
+        for key, model, calls, prompt, cached, completion in await session.execute(stmt):
+            key = key.isoformat() if isinstance(key, date) else key
+            group = groups.setdefault(key, {
+                group_by: key, "calls": 0, "prompt_tokens": 0, "cached_tokens": 0,
+                "completion_tokens": 0, "cost_usd": 0.0
+            })
+            group["calls"] += calls or 0
+            group["prompt_tokens"] += prompt or 0
+            group["cached_tokens"] += cached or 0
+            group["completion_tokens"] += completion or 0
+            group["cost_usd"] += self.estimate_cost(model, prompt or 0, cached or 0, completion or 0)
+
+        rows = sorted(groups.values(), key=lambda g: g["cost_usd"], reverse=True)
+        totals = {
+            name: sum(row[name] for row in rows)
+            for name in ("calls", "prompt_tokens", "cached_tokens", "completion_tokens", "cost_usd")
+        }
+        for row in rows:
+            row["cost_usd"] = round(row["cost_usd"], 6)
+        totals["cost_usd"] = round(totals["cost_usd"], 6)
+        return {"group_by": group_by, "since": since.isoformat(), "rows": rows, "totals": totals}
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending_rows": len(self._pending),
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors
+        }
+
+
+def _load_pricing(path: Optional[str]) -> dict[str, tuple[float, float, float]]:
+    if not path:
+        return {}
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        return {model: tuple(prices) for model, prices in data.items()}
+    except (OSError, ValueError, TypeError) as e:
+        logger.warning(f"Could not load LLM pricing from {path}: {e}")
+        return {}
+
+
+def create_usage_accountant_from_env() -> UsageAccountant:
+    """Crea el contador según LLM_USAGE_*"""
+    return UsageAccountant(
+        enabled=os.getenv("LLM_USAGE_TRACKING_ENABLED", "true").lower() in ("1", "true", "yes"),
+        flush_interval_seconds=float(os.getenv("LLM_USAGE_FLUSH_INTERVAL_SECONDS", "30")),
+        pricing=_load_pricing(os.getenv("LLM_PRICING_PATH"))
+    )
+
+
+# Instancia global del contador
+usage_accountant = create_usage_accountant_from_env()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Benchmark end-to-end del grafo de conversación (IthakaWorkflow) y de ChatService
+con conversaciones grabadas (FAQ, wizard completo de 20 preguntas y tráfico mixto),
+contra SQLite o PostgreSQL y el servidor falso de OpenAI en el mismo proceso.
+
+Reporta latencia p50/p95/p99 por turno, throughput, queries a la base y llamadas
+al LLM por turno y memoria, en JSON para comparar corridas. Termina con error si
+algún escenario no llevó a cada agente la fracción de turnos esperada.
+
+Uso: python scripts/benchmark_workflow.py [--target graph|chat_service|all]
+     [--scenario faq|wizard|mixed|all] [--conversations 20] [--concurrency 4]
+     [--database-url postgresql+asyncpg://...] [--output resultados.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+# Agregar el directorio raíz al path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+DEFAULT_CONVERSATIONS_PATH = project_root / "config" / "benchmark_conversations.json"
+DEFAULT_SQLITE_PATH = Path(tempfile.gettempdir()) / "ithaka_benchmark.sqlite3"
+TARGETS = ["graph", "chat_service"]
+SCENARIOS = ["faq", "wizard", "mixed"]
+INACTIVE_WIZARD_STATE = {"wizard_session_id": None, "wizard_state": "INACTIVE"}
+# Fracción mínima de turnos que cada escenario debe llevar a cada agente (las
+# conversaciones grabadas tienen algún turno del otro agente, p. ej. el cierre del
+# wizard); por debajo la medición no corresponde al escenario
+EXPECTED_AGENT_SHARE = {
+    "faq": {"faq": 0.8},
+    "wizard": {"wizard": 0.9},
+    "mixed": {"faq": 0.3, "wizard": 0.3}
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=TARGETS + ["all"], default="all",
+                        help="Qué se ejercita: el grafo directo, ChatService (con persistencia) o ambos")
+    parser.add_argument("--scenario", choices=SCENARIOS + ["all"], default="all")
+    parser.add_argument("--conversations-file", type=Path, default=DEFAULT_CONVERSATIONS_PATH,
+                        help="JSON con las conversaciones grabadas por escenario")
+    parser.add_argument("--conversations", type=int, default=20,
+                        help="Conversaciones por escenario (se recorren las grabadas en ciclo)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Conversaciones simultáneas")
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="Conversaciones de calentamiento por escenario (no se miden)")
+    parser.add_argument("--database-url", default=None,
+                        help=f"Por defecto SQLite en {DEFAULT_SQLITE_PATH} (se recrea en cada corrida)")
+    parser.add_argument("--llm-base-url", default="inprocess",
+                        help="'inprocess' usa el OpenAI falso en el mismo proceso; o una URL /v1")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0,
+                        help="Latencia simulada del OpenAI falso (FAKE_OPENAI_LATENCY_MS)")
+    parser.add_argument("--llm-distribution", choices=["fixed", "uniform", "lognormal"], default="fixed")
+    parser.add_argument("--llm-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Mide el pico de memoria Python (agrega overhead a la latencia)")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Archivo JSON de salida (por defecto stdout)")
+    return parser.parse_args()
+
+
+def configure_environment(args: argparse.Namespace) -> str:
+    """Fija las variables de entorno antes de importar la app; devuelve la URL de la base"""
+    database_url = args.database_url
+    if not database_url:
+        DEFAULT_SQLITE_PATH.unlink(missing_ok=True)
+        database_url = f"sqlite+aiosqlite:///{DEFAULT_SQLITE_PATH}"
+
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["LLM_BASE_URL"] = args.llm_base_url
+    if args.llm_base_url == "inprocess":
+        # El servidor falso no valida la key, pero los agentes exigen que exista
+        os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ["FAKE_OPENAI_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["FAKE_OPENAI_LATENCY_DISTRIBUTION"] = args.llm_distribution
+    os.environ["FAKE_OPENAI_LATENCY_JITTER_MS"] = str(args.llm_jitter_ms)
+    os.environ["FAKE_OPENAI_SEED"] = str(args.seed)
+    if database_url.startswith("sqlite"):
+        # pgvector no está disponible: búsqueda con el índice en memoria
+        os.environ["FAQ_SEARCH_BACKEND"] = "memory"
+    return database_url
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+    data = np.asarray(values)
+    return {
+        "mean": round(float(data.mean()), 2),
+        "p50": round(float(np.percentile(data, 50)), 2),
+        "p95": round(float(np.percentile(data, 95)), 2),
+        "p99": round(float(np.percentile(data, 99)), 2),
+        "max": round(float(data.max()), 2)
+    }
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def llm_calls_by_caller(stats: dict) -> dict[str, int]:
+    return {caller: data["calls"] for caller, data in stats["callers"].items()}
+
+
+class QueryCounter:
+    """Cuenta las sentencias SQL ejecutadas por el engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        from sqlalchemy import event
+
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *_args, **_kwargs):
+        self.count += 1
+
+
+async def setup_database(engine, database_url: str):
+    """Crea las tablas y carga las FAQs si la base está vacía"""
+    from sqlalchemy import func, select, text
+
+    from app.db.config.database import Base, SessionLocal
+    from app.db.models import FAQEmbedding
+    from app.services.embedding_service import (
+        build_faq_embedding_text,
+        embedding_service,
+        faq_content_hash,
+    )
+    from app.services.faq_ingestion import faq_ingestion_pipeline
+    from scripts.populate_faqs import FAQS_DATA
+
+    async with engine.begin() as conn:
+        if database_url.startswith("postgresql"):
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with SessionLocal() as session:
+        existing = (await session.execute(select(func.count(FAQEmbedding.id)))).scalar_one()
+        if existing:
+            return existing
+
+        if database_url.startswith("postgresql"):
+            stats = await faq_ingestion_pipeline.ingest(FAQS_DATA, session)
+            return stats["inserted"]
+
+        # El INSERT ... ON CONFLICT del pipeline es específico de PostgreSQL
+        embeddings = await embedding_service.generate_batch_embeddings(
+            [build_faq_embedding_text(faq["question"], faq["answer"]) for faq in FAQS_DATA])
+        session.add_all([
+            FAQEmbedding(
+                question=faq["question"],
+                answer=faq["answer"],
+                embedding=embedding,
+                content_hash=faq_content_hash(faq["question"], faq["answer"]),
+                embedding_model=embedding_service.model,
+                embedding_dimension=embedding_service.dimension
+            )
+            for faq, embedding in zip(FAQS_DATA, embeddings)
+        ])
+        await session.commit()
+        embedding_service.notify_corpus_changed()
+        return len(FAQS_DATA)
+
+
+async def run_graph_conversation(messages: list[str], record) -> None:
+    """Conversación contra el grafo, arrastrando el estado del wizard como ChatService"""
+    from app.graph.workflow import ithaka_workflow
+
+    # Sin sesión de wizard previa el supervisor decide por intención (sin estado, el
+    # workflow arranca un wizard nuevo y nunca llegaría al agente de FAQ)
+    wizard_state = INACTIVE_WIZARD_STATE
+    for message in messages:
+        started = time.perf_counter()
+        result = await ithaka_workflow.process_message(message, wizard_state)
+        record(started, result)
+        # ChatService solo recupera sesiones de wizard activas o pausadas
+        if result.get("wizard_state") in ("ACTIVE", "PAUSED"):
+            wizard_state = result
+        else:
+            wizard_state = INACTIVE_WIZARD_STATE
+
+
+async def run_chat_service_conversation(messages: list[str], record, seed_paused_wizard: bool) -> None:
+    """Conversación contra ChatService: incluye historial y persistencia en la base"""
+    from app.services.chat_service import chat_service
+
+    async def save_wizard_state(state: str, current_question: int = 1, responses: dict = None):
+        await chat_service._save_wizard_state(
+            conversation_id=conversation_id,
+            wizard_session_id=None,
+            wizard_state=state,
+            current_question=current_question,
+            wizard_responses=responses or {}
+        )
+
+    conversation_id = None
+    if seed_paused_wizard:
+        # Una conversación nueva sin sesión de wizard arranca el wizard en cada turno:
+        # con una sesión pausada el supervisor decide por intención, como en el grafo
+        conversation_id = await chat_service._create_temporary_conversation()
+        await save_wizard_state("PAUSED")
+    for message in messages:
+        started = time.perf_counter()
+        result = await chat_service.process_message(message, conversation_id=conversation_id)
+        record(started, result)
+        conversation_id = result.get("conversation_id") or conversation_id
+        # El wizard conserva el estado con el que arranca: al postular, la sesión
+        # sembrada pasa a ACTIVE para que los turnos siguientes sigan en el wizard
+        if (seed_paused_wizard and result.get("agent_used") == "wizard"
+                and result.get("wizard_state") == "PAUSED"):
+            saved = await chat_service._get_wizard_state(conversation_id)
+            await save_wizard_state(
+                "ACTIVE", saved["current_question"], saved["wizard_responses"])
+
+
+async def run_scenario(
+        target: str,
+        scenario: str,
+        conversations: list[list[str]],
+        args: argparse.Namespace,
+        query_counter: QueryCounter
+) -> dict[str, Any]:
+    """Corre un escenario para un target y devuelve sus métricas"""
+    from app.services.llm_gateway import llm_gateway
+
+    if target == "graph":
+        run_conversation = run_graph_conversation
+    else:
+        seed_paused_wizard = scenario != "wizard"
+
+        async def run_conversation(messages: list[str], record) -> None:
+            await run_chat_service_conversation(messages, record, seed_paused_wizard)
+
+    for i in range(args.warmup):
+        await run_conversation(conversations[i % len(conversations)], lambda *_: None)
+
+    latencies: list[float] = []
+    agents: Counter = Counter()
+    errors = 0
+
+    def record(started: float, result: dict[str, Any]):
+        nonlocal errors
+        latencies.append((time.perf_counter() - started) * 1000)
+        agents[result.get("agent_used", "unknown")] += 1
+        if result.get("error") or result.get("success") is False:
+            errors += 1
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def bounded(messages: list[str]):
+        async with semaphore:
+            await run_conversation(messages, record)
+
+    llm_before = llm_calls_by_caller(llm_gateway.get_stats())
+    queries_before = query_counter.count
+    if args.tracemalloc:
+        tracemalloc.start()
+    started = time.perf_counter()
+
+    await asyncio.gather(*(
+        bounded(conversations[i % len(conversations)]) for i in range(args.conversations)))
+
+    wall_seconds = time.perf_counter() - started
+    peak_mb = None
+    if args.tracemalloc:
+        peak_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+
+    turns = len(latencies)
+    llm_after = llm_calls_by_caller(llm_gateway.get_stats())
+    llm_calls = {
+        caller: calls - llm_before.get(caller, 0)
+        for caller, calls in llm_after.items()
+        if calls - llm_before.get(caller, 0)
+    }
+    queries = query_counter.count - queries_before
+
+    return {
+        "target": target,
+        "scenario": scenario,
+        "conversations": args.conversations,
+        "concurrency": args.concurrency,
+        "turns": turns,
+        "errors": errors,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_turns_per_second": round(turns / wall_seconds, 2) if wall_seconds else 0.0,
+        "latency_ms": percentiles(latencies),
+        "db_queries_per_turn": round(queries / turns, 2) if turns else 0.0,
+        "llm_calls_per_turn": round(sum(llm_calls.values()) / turns, 2) if turns else 0.0,
+        "llm_calls_by_caller": llm_calls,
+        "agents_used": dict(agents),
+        "agents_expected_min_share": EXPECTED_AGENT_SHARE[scenario],
+        "agent_mix_ok": all(agents[agent] >= share * turns
+                            for agent, share in EXPECTED_AGENT_SHARE[scenario].items()),
+        "memory": {"tracemalloc_peak_mb": peak_mb, "max_rss_mb": max_rss_mb()}
+    }
+
+
+async def main():
+    """Función principal"""
+    args = parse_args()
+    database_url = configure_environment(args)
+
+    from app.db.config.database import engine
+
+    # database.py crea el engine con echo=True
+    engine.echo = False
+    recorded = json.loads(args.conversations_file.read_text(encoding="utf-8"))
+    targets = TARGETS if args.target == "all" else [args.target]
+    scenarios = SCENARIOS if args.scenario == "all" else [args.scenario]
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    print("⏱️  Benchmark del workflow de conversación", file=sys.stderr)
+    print("=" * 50, file=sys.stderr)
+
+    try:
+        faq_count = await setup_database(engine, database_url)
+        query_counter = QueryCounter(engine)
+
+        results = []
+        for target in targets:
+            for scenario in scenarios:
+                print(f"▶️  {target} / {scenario}...", file=sys.stderr)
+                result = await run_scenario(target, scenario, recorded[scenario], args, query_counter)
+                latency = result["latency_ms"]
+                print(f"   ✅ {result['turns']} turnos, p50 {latency['p50']} ms, "
+                      f"p95 {latency['p95']} ms, {result['throughput_turns_per_second']} turnos/s",
+                      file=sys.stderr)
+                if not result["agent_mix_ok"]:
+                    print(f"   ⚠️  Agentes {result['agents_used']}, se esperaba "
+                          f"al menos {result['agents_expected_min_share']}", file=sys.stderr)
+                results.append(result)
+    except Exception as e:
+        print(f"\n❌ Error durante el benchmark: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        await engine.dispose()
+
+    report = {
+        "started_at": started_at,
+        "environment": {
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "llm_base_url": args.llm_base_url,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_distribution": args.llm_distribution,
+            "faq_search_backend": os.getenv("FAQ_SEARCH_BACKEND", "pgvector"),
+            "faqs": faq_count
+        },
+        "results": results
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+        print(f"\n🎉 Resultados guardados en {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if not all(result["agent_mix_ok"] for result in results):
+        print("\n❌ Algún escenario no ejercitó los agentes esperados", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
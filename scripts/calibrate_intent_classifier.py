@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Calibra el umbral de confianza del clasificador local de intención sobre frases
+no usadas en el entrenamiento (config/intent_heldout.json por defecto).
+Uso: python scripts/calibrate_intent_classifier.py [--held-out PATH] [--target-precision 0.95]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.intent_classifier import (  # noqa: E402
+    create_intent_classifier_from_env,
+)
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--held-out", default=str(project_root / "config" / "intent_heldout.json"),
+                        help="JSON con frases etiquetadas faq / wizard / unclear")
+    parser.add_argument("--target-precision", type=float, default=0.95)
+    args = parser.parse_args()
+
+    held_out = json.loads(Path(args.held_out).read_text(encoding="utf-8"))
+    classifier = create_intent_classifier_from_env()
+    table = classifier.calibrate_threshold(held_out, target_precision=args.target_precision)
+
+    print(f"min_known_ratio={classifier.min_known_ratio}")
+    print("umbral  precisión  cobertura")
+    for row in table:
+        marker = "  ← recomendado" if row["recommended"] else ""
+        print(f"{row['threshold']:.2f}    {row['precision']:.3f}      {row['coverage']:.3f}{marker}")
+
+
+if __name__ == "__main__":
+    main()
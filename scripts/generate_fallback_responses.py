@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Genera offline las respuestas por tema para consultas FAQ sin resultados
+Uso: python scripts/generate_fallback_responses.py [--output config/faq_fallback_responses.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.faq_fallbacks import (  # noqa: E402
+    DEFAULT_FALLBACKS_PATH,
+    FALLBACK_TOPICS,
+    GENERAL_TOPIC,
+)
+from app.services.llm_gateway import llm_gateway  # noqa: E402
+
+CONTEXT = """
+CONTEXTO ITHAKA:
+- Centro de emprendimiento de la Universidad Católica del Uruguay
+- Programas: Minor de emprendimiento, Programa Fellows, cursos electivos
+- Servicios: Incubadora de startups, mentorías, capacitaciones
+- Todo gratuito para comunidad UCU, abierto a emprendedores externos
+- Campus: Montevideo, Maldonado, Salto
+- Foco: Innovación, emprendimiento, impacto social
+"""
+
+
+async def generate_response(model: str, topic: str) -> str:
+    """Genera la respuesta genérica para un tema"""
+    if topic == GENERAL_TOPIC:
+        subject = "una consulta que no coincide con ningún tema conocido"
+    else:
+        subject = f"el tema '{topic}' (palabras clave: {', '.join(FALLBACK_TOPICS[topic]['keywords'])})"
+
+    prompt = f"""
+Un usuario hizo una consulta sobre {subject}, pero no encontramos una FAQ que la responda.
+{CONTEXT}
+Escribe una respuesta breve (máximo 80 palabras) que:
+1. Reconozca que no hay una respuesta exacta
+2. Dé información útil de Ithaka sobre ese tema
+3. Invite a hacer una pregunta más específica
+"""
+
+    response = await llm_gateway.chat_completion(
+        caller="fallback_generator",
+        model=model,
+        messages=[
+            {"role": "system", "content": "Eres el asistente de Ithaka. Respondes en español rioplatense, de forma amigable."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.5,
+        max_tokens=200
+    )
+    return response.choices[0].message.content.strip()
+
+
+async def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", type=Path, default=DEFAULT_FALLBACKS_PATH,
+                        help="Archivo JSON de salida")
+    args = parser.parse_args()
+
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+    print("🧩 Generando respuestas por tema...")
+    print("=" * 50)
+
+    try:
+        topics = list(FALLBACK_TOPICS)
+        responses = await asyncio.gather(
+            *(generate_response(model, topic) for topic in topics))
+    except Exception as e:
+        print(f"\n❌ Error generando respuestas: {e}")
+        sys.exit(1)
+
+    args.output.write_text(
+        json.dumps(dict(zip(topics, responses)), ensure_ascii=False, indent=2) + "\n",
+        encoding="utf-8"
+    )
+    for topic in topics:
+        print(f"✅ {topic}")
+    print(f"\n🎉 Respuestas guardadas en {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
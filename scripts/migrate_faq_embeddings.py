@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Script de migración de faq_embeddings:
+- agrega las columnas content_hash / embedding_model / embedding_dimension / updated_at
+- completa hashes faltantes y elimina FAQs duplicadas
+- ajusta la columna vector si cambió EMBEDDING_DIMENSION
+- re-embebe solo las filas generadas con otro modelo o dimensión
+Uso: python scripts/migrate_faq_embeddings.py [--skip-reembed]
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from sqlalchemy import text
+
+# Agregar el directorio raíz al path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.config.embeddings import EMBEDDING_DIMENSION  # noqa: E402
+from app.db.config.database import engine, get_async_session  # noqa: E402
+from app.db.config.faq_schema import (  # noqa: E402
+    TABLE,
+    ensure_faq_embedding_schema,
+    get_embedding_column_dimension,
+)
+from app.db.models import FAQ_EMBEDDING_INDEX_NAME, FAQEmbedding  # noqa: E402
+from app.services.faq_ingestion import faq_ingestion_pipeline  # noqa: E402
+
+
+async def migrate_schema():
+    """Agrega columnas nuevas, deduplica por hash y ajusta la dimensión"""
+
+    async with engine.begin() as conn:
+        added = await ensure_faq_embedding_schema(conn)
+        print(f"🔑 Columnas agregadas: {', '.join(added) or 'ninguna'}")
+
+        current_dimension = await get_embedding_column_dimension(conn)
+        if current_dimension != EMBEDDING_DIMENSION:
+            print(f"📐 Cambiando dimensión {current_dimension} → {EMBEDDING_DIMENSION}")
+            await conn.execute(text(f"DROP INDEX IF EXISTS {FAQ_EMBEDDING_INDEX_NAME}"))
+            # Los embeddings viejos no son convertibles: se re-embeben después
+            await conn.execute(text(
+                f"ALTER TABLE {TABLE} ALTER COLUMN embedding "
+                f"TYPE vector({EMBEDDING_DIMENSION}) USING NULL"
+            ))
+            await conn.execute(text(
+                f"UPDATE {TABLE} SET embedding_model = NULL, embedding_dimension = NULL"
+            ))
+
+
+async def recreate_ann_index():
+    """Crea el índice ANN declarado en el modelo si no existe"""
+    index = next(i for i in FAQEmbedding.__table__.indexes
+                 if i.name == FAQ_EMBEDDING_INDEX_NAME)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: index.create(sync_conn, checkfirst=True))
+
+
+async def migrate(skip_reembed: bool = False):
+    print("🚚 Migrando faq_embeddings...")
+    print("=" * 50)
+
+    await migrate_schema()
+
+    if not skip_reembed:
+        async for session in get_async_session():
+            stats = await faq_ingestion_pipeline.reembed_stale(session)
+            break
+        print(f"🔁 FAQs re-embebidas: {stats['updated']}/{stats['stale']} "
+              f"en {stats['elapsed_seconds']}s")
+        if stats["failed_chunks"]:
+            print(f"   ❌ Lotes con error: {stats['failed_chunks']}")
+
+    await recreate_ann_index()
+    print("\n✅ Migración completada")
+
+
+async def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--skip-reembed", action="store_true",
+                        help="Solo migra el esquema, sin llamar a la API")
+    args = parser.parse_args()
+
+    try:
+        await migrate(skip_reembed=args.skip_reembed)
+    except Exception as e:
+        print(f"\n❌ Error durante la migración: {e}")
+        sys.exit(1)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Script para (re)construir el índice ANN de faq_embeddings
+Uso: python scripts/rebuild_faq_index.py [--type hnsw|ivfflat] [--concurrently]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import func, select, text
+
+# Agregar el directorio raíz al path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.db.config.database import engine  # noqa: E402
+from app.db.models import FAQ_EMBEDDING_INDEX_NAME, FAQEmbedding  # noqa: E402
+
+
+def build_index_sql(
+        index_type: str,
+        concurrently: bool,
+        m: int,
+        ef_construction: int,
+        lists: int
+) -> str:
+    """Genera el CREATE INDEX para el tipo de índice pedido"""
+    if index_type == "hnsw":
+        options = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+    else:
+        options = f"lists = {int(lists)}"
+
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}"
+        f"{FAQ_EMBEDDING_INDEX_NAME} ON {FAQEmbedding.__tablename__} "
+        f"USING {index_type} (embedding vector_cosine_ops) WITH ({options})"
+    )
+
+
+async def rebuild_faq_index(
+        index_type: str = "hnsw",
+        concurrently: bool = False,
+        m: int = 16,
+        ef_construction: int = 64,
+        lists: int = 0
+):
+    """Elimina y vuelve a crear el índice ANN sobre faq_embeddings.embedding"""
+
+    print(f"🔧 Reconstruyendo índice {index_type.upper()} de FAQs...")
+    print("=" * 50)
+
+    # CONCURRENTLY no puede ejecutarse dentro de una transacción
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+
+        total = (await conn.execute(select(func.count(FAQEmbedding.id)))).scalar_one()
+        print(f"📊 FAQs en la tabla: {total}")
+
+        if index_type == "ivfflat" and lists <= 0:
+            # Recomendación de pgvector: filas / 1000 (mínimo 1)
+            lists = max(1, total // 1000)
+
+        drop = "DROP INDEX CONCURRENTLY" if concurrently else "DROP INDEX"
+        await conn.execute(text(f"{drop} IF EXISTS {FAQ_EMBEDDING_INDEX_NAME}"))
+
+        started = time.perf_counter()
+        await conn.execute(text(
+            build_index_sql(index_type, concurrently, m, ef_construction, lists)))
+        await conn.execute(text(f"ANALYZE {FAQEmbedding.__tablename__}"))
+        elapsed = time.perf_counter() - started
+
+    print(f"✅ Índice {FAQ_EMBEDDING_INDEX_NAME} creado en {elapsed:.2f}s")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--type", choices=["hnsw", "ivfflat"], default="hnsw")
+    parser.add_argument("--concurrently", action="store_true",
+                        help="No bloquea escrituras mientras se construye")
+    parser.add_argument("--m", type=int, default=16, help="HNSW: conexiones por nodo")
+    parser.add_argument("--ef-construction", type=int, default=64,
+                        help="HNSW: tamaño de la lista de candidatos al construir")
+    parser.add_argument("--lists", type=int, default=0,
+                        help="IVFFlat: cantidad de listas (0 = filas/1000)")
+    return parser.parse_args()
+
+
+async def main():
+    """Función principal"""
+    args = parse_args()
+    try:
+        await rebuild_faq_index(
+            index_type=args.type,
+            concurrently=args.concurrently,
+            m=args.m,
+            ef_construction=args.ef_construction,
+            lists=args.lists
+        )
+    except Exception as e:
+        print(f"\n❌ Error reconstruyendo el índice: {e}")
+        sys.exit(1)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Levanta el servidor falso compatible con OpenAI para pruebas de carga y CI sin red
+Uso: python scripts/run_fake_openai.py [--port 8099] [--latency-ms 300 --distribution lognormal]
+Luego apuntar la app con LLM_BASE_URL=http://localhost:8099/v1
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import uvicorn
+
+# Agregar el directorio raíz al path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.fake_openai import create_fake_openai_app_from_env  # noqa: E402
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--distribution", choices=["fixed", "uniform", "lognormal"],
+                        help="Distribución de latencia (FAKE_OPENAI_LATENCY_DISTRIBUTION)")
+    parser.add_argument("--latency-ms", type=float,
+                        help="Latencia media por request (FAKE_OPENAI_LATENCY_MS)")
+    parser.add_argument("--jitter-ms", type=float,
+                        help="Rango (uniform) o desvío (lognormal) (FAKE_OPENAI_LATENCY_JITTER_MS)")
+    parser.add_argument("--token-latency-ms", type=float,
+                        help="Demora entre tokens en streaming (FAKE_OPENAI_TOKEN_LATENCY_MS)")
+    parser.add_argument("--seed", type=int, help="Semilla de las latencias (FAKE_OPENAI_SEED)")
+    args = parser.parse_args()
+
+    # Los argumentos pisan las variables de entorno
+    overrides = {
+        "FAKE_OPENAI_LATENCY_DISTRIBUTION": args.distribution,
+        "FAKE_OPENAI_LATENCY_MS": args.latency_ms,
+        "FAKE_OPENAI_LATENCY_JITTER_MS": args.jitter_ms,
+        "FAKE_OPENAI_TOKEN_LATENCY_MS": args.token_latency_ms,
+        "FAKE_OPENAI_SEED": args.seed
+    }
+    for name, value in overrides.items():
+        if value is not None:
+            os.environ[name] = str(value)
+
+    print(f"🤖 Fake OpenAI escuchando en http://{args.host}:{args.port}/v1")
+    uvicorn.run(create_fake_openai_app_from_env(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
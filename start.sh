@@ -3,7 +3,8 @@
 # Wait for database to be ready and create tables
 echo "🔄 Iniciando aplicación..."
 
-# Create database tables
+# Create database tables (y migra columnas nuevas de faq_embeddings en bases existentes;
+# si cambió la dimensión de embeddings falla y pide correr scripts/migrate_faq_embeddings.py)
 echo "📊 Creando tablas de base de datos..."
 python -m app.db.config.create_tables
 
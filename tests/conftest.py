@@ -0,0 +1,18 @@
+"""
+Configuración común de los tests: los módulos de app leen el entorno al importarse,
+así que se define una base SQLite temporal y el servidor falso de OpenAI
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite+aiosqlite:///{Path(tempfile.gettempdir()) / 'ithaka_tests.sqlite3'}")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("LLM_BASE_URL", "inprocess")
+os.environ.setdefault("FAQ_SEARCH_BACKEND", "memory")
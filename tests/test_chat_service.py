@@ -0,0 +1,24 @@
+"""Tests de ChatService"""
+
+import asyncio
+
+import pytest
+
+from app.services.chat_service import ChatService
+
+
+def test_with_session_returns_operation_result():
+    """El resultado de la operación llega al llamador (antes un break en finally lo descartaba)"""
+
+    async def operation(session):
+        return 42
+
+    assert asyncio.run(ChatService()._with_session(operation)) == 42
+
+
+def test_with_session_propagates_errors():
+    async def operation(session):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(ChatService()._with_session(operation))
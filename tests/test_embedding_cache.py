@@ -0,0 +1,28 @@
+"""Tests del cache de embeddings"""
+
+import asyncio
+import sqlite3
+
+from app.services.embedding_cache import EmbeddingCache, SQLiteEmbeddingCacheBackend
+
+
+def test_expired_backend_rows_are_deleted(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+
+    async def run():
+        cache = EmbeddingCache(
+            ttl_seconds=0.2,
+            backend=SQLiteEmbeddingCacheBackend(str(path)),
+            cleanup_interval_seconds=0.1
+        )
+        for i in range(3):
+            await cache.set("model", f"consulta {i}", [0.1, 0.2])
+        await asyncio.sleep(0.3)
+        await cache.set("model", "otra consulta", [0.3, 0.4])
+        return cache
+
+    cache = asyncio.run(run())
+
+    rows = sqlite3.connect(path).execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+    assert rows == 1
+    assert cache.get_stats()["expired_deleted"] == 3
@@ -0,0 +1,56 @@
+"""Tests de la recarga del índice vectorial en memoria"""
+
+import asyncio
+
+import numpy as np
+
+from app.services.faq_vector_index import LocalFAQIndex, _IndexSnapshot
+
+
+class _FakeEmbeddingService:
+    async def get_faq_corpus_signature(self, session):
+        await asyncio.sleep(0)
+        return (1, 1)
+
+
+def _snapshot(ids: tuple[int, ...]) -> _IndexSnapshot:
+    matrix = np.eye(len(ids), 2, dtype=np.float32)
+    matrix.flags.writeable = False
+    return _IndexSnapshot(
+        ids=ids,
+        questions=tuple(f"q{i}" for i in ids),
+        answers=tuple(f"a{i}" for i in ids),
+        matrix=matrix
+    )
+
+
+def test_concurrent_refreshes_load_once():
+    index = LocalFAQIndex(check_interval_seconds=30)
+
+    async def fake_load(session, signature=None):
+        index._stale = False
+        await asyncio.sleep(0.01)
+        index._snapshot = _snapshot((1, 2))
+        index._signature = signature
+        index.loads += 1
+
+    index.load = fake_load
+
+    async def run():
+        await asyncio.gather(*(
+            index.ensure_fresh(None, _FakeEmbeddingService()) for _ in range(10)
+        ))
+
+    asyncio.run(run())
+    assert index.loads == 1
+    assert index.is_ready
+
+
+def test_search_uses_a_single_snapshot():
+    index = LocalFAQIndex()
+    index._snapshot = _snapshot((7, 8))
+
+    results = index.search([0.0, 1.0], limit=1, similarity_threshold=0.5)
+
+    assert results == [{"id": 8, "question": "q8", "answer": "a8", "similarity": 1.0}]
+    assert index.get_stats()["faqs"] == 2
@@ -0,0 +1,32 @@
+"""Tests del streaming del gateway contra el servidor falso en proceso"""
+
+import asyncio
+from contextlib import aclosing
+
+from app.services.llm_gateway import IN_PROCESS_BASE_URL, LLMGateway
+from app.services.tracing import tracer
+
+
+def test_stream_closed_early_releases_slot_and_span():
+    gateway = LLMGateway(base_url=IN_PROCESS_BASE_URL, max_concurrency=1)
+
+    async def run():
+        async with aclosing(gateway.stream_chat_completion(
+                "test_early_close",
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": "¿Qué es Ithaka?"}]
+        )) as chunks:
+            async for _ in chunks:
+                assert gateway.in_flight == 1
+                break
+
+        assert gateway.in_flight == 0
+        # El único slot tiene que estar libre para la siguiente llamada
+        await asyncio.wait_for(gateway._semaphore.acquire(), timeout=1)
+        gateway._semaphore.release()
+
+    asyncio.run(run())
+
+    histogram = tracer._histograms["llm.test_early_close"]
+    assert histogram.in_progress == 0
+    assert histogram.errors == 0
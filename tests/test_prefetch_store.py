@@ -0,0 +1,25 @@
+"""Tests del canal lateral de FAQs especulativas"""
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.graph.prefetch_store import TurnPrefetchStore, current_message_id
+
+
+def test_pop_returns_value_once():
+    store = TurnPrefetchStore()
+    store.put("m1", {"query": "hola"})
+    assert store.pop("m1") == {"query": "hola"}
+    assert store.pop("m1") is None
+
+
+def test_store_is_bounded():
+    store = TurnPrefetchStore(max_entries=2)
+    for message_id in ("m1", "m2", "m3"):
+        store.put(message_id, {})
+    assert len(store) == 2
+    assert store.pop("m1") is None
+
+
+def test_current_message_id_uses_last_user_message():
+    state = {"messages": [HumanMessage(content="hola", id="u1"), AIMessage(content="hola", id="a1")]}
+    assert current_message_id(state) == "u1"
@@ -0,0 +1,31 @@
+"""Tests del cache de decisiones de routing"""
+
+from app.graph.context_window import ensure_context_window
+from app.graph.workflow import ithaka_workflow
+from app.services.routing_cache import RoutingCache
+
+INACTIVE_WIZARD_STATE = {"wizard_session_id": None, "wizard_state": "INACTIVE"}
+
+
+def _state_after(agent: str) -> dict:
+    history = [
+        {"role": "user", "content": "hola"},
+        {"role": "assistant", "content": "¡Hola! ¿En qué te ayudo?", "agent": agent}
+    ]
+    state = ithaka_workflow._create_initial_state("ok", INACTIVE_WIZARD_STATE, history)
+    ensure_context_window(state)
+    return state
+
+
+def test_signature_depends_on_previous_agent():
+    """El mismo texto tras un turno del wizard y tras uno de FAQ no comparte decisión"""
+    after_wizard = RoutingCache.context_signature(_state_after("wizard"))
+    after_faq = RoutingCache.context_signature(_state_after("faq"))
+
+    assert after_wizard != after_faq
+    assert RoutingCache.make_key("ok", after_wizard) != RoutingCache.make_key("ok", after_faq)
+
+
+def test_signature_ignores_initial_supervisor_agent():
+    state = ithaka_workflow._create_initial_state("ok", INACTIVE_WIZARD_STATE)
+    assert RoutingCache.context_signature(state) == "INACTIVE|none"
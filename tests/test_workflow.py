@@ -0,0 +1,20 @@
+"""Tests del workflow de conversación"""
+
+import asyncio
+
+from app.graph.workflow import handle_wizard_flow_good, ithaka_workflow
+
+INACTIVE_WIZARD_STATE = {"wizard_session_id": None, "wizard_state": "INACTIVE"}
+
+
+def test_wizard_entry_from_inactive_state_starts_session():
+    """El supervisor puede rutear al wizard sin sesión previa: se abre una nueva y activa"""
+    state = ithaka_workflow._create_initial_state(
+        "Quiero postular mi emprendimiento", INACTIVE_WIZARD_STATE)
+
+    result = asyncio.run(handle_wizard_flow_good(state))
+
+    wizard_state = result["wizard_state"]
+    assert wizard_state["wizard_session_id"]
+    assert wizard_state["wizard_status"] == "ACTIVE"
+    assert wizard_state["current_question"] == 2